@@ -0,0 +1,137 @@
+import argparse
+import logging
+import os
+import sys
+from typing import Dict, List, Optional
+
+import numpy as np
+import psycopg2
+from psycopg2.extensions import connection
+
+from plot_weather.cache.montharchive import ARCHIVE_COLUMNS, COL_TIME, MonthArchive
+from plot_weather.dao.devicedao import DeviceDao, DeviceRecord
+from plot_weather.dao.weatherdao import WeatherDao
+from plot_weather.log import logsetting
+from plot_weather.settings import MONTH_ARCHIVE_DIR, MONTH_ARCHIVE_GRACE_DAYS, load_dbconf
+
+"""
+確定済み年月の観測データアーカイブの作成・検証スクリプト
+[実行方法] src ディレクトリでアプリと同じ環境変数(MONTH_ARCHIVE_DIR)を設定して実行
+  (1) 未保存の年月を保存: python archive_weather.py
+  (2) 保存済みの年月も再作成: python archive_weather.py --rebuild
+  (3) 保存済みの年月をデータベースと比較: python archive_weather.py --verify
+  ※ --device-name, --year-month で対象を絞り込める
+  ※ 確定後の猶予日数(--grace-days, MONTH_ARCHIVE_GRACE_DAYS)以内の年月は保存しない
+  ※アプリの初期化は行わない (plot_weather.settings のみ読み込む)
+"""
+
+app_logger: logging.Logger = logsetting.get_logger("app_main")
+
+
+def target_devices(conn: connection, device_name: Optional[str]) -> List[DeviceRecord]:
+    """
+    対象デバイスを取得する
+    :param conn: psycopg2 connection
+    :param device_name: デバイス名 ※None なら全デバイス
+    :return: デバイスリスト
+    """
+    devices: List[DeviceRecord] = DeviceDao(conn, logger=app_logger).get_devices()
+    if device_name is not None:
+        devices = [device for device in devices if device.name == device_name]
+        if len(devices) == 0:
+            raise ValueError(f"Device not found: {device_name}")
+    return devices
+
+
+def build_device(conn: connection, archive: MonthArchive, device: DeviceRecord,
+                 year_month: Optional[str], rebuild: bool) -> int:
+    """
+    デバイスの確定済み年月を保存する
+    :param conn: psycopg2 connection
+    :param archive: MonthArchive
+    :param device: 対象デバイス
+    :param year_month: 対象年月 ※None なら全年月
+    :param rebuild: 保存済みの年月も再作成するか
+    :return: 保存した年月の数
+    """
+    dao: WeatherDao = WeatherDao(conn, logger=app_logger)
+    months: List[str] = [year_month] if year_month is not None else dao.getYearMonthsFrom(device.id)
+    saved: int = 0
+    for ym in months:
+        if not archive.is_archivable(ym):
+            continue
+        if archive.exists(device.id, ym) and not rebuild:
+            continue
+
+        columns: Dict[str, np.ndarray] = dao.getMonthColumns(device.id, ym)
+        if archive.write(device.id, ym, columns, overwrite=rebuild):
+            saved += 1
+            print(f"{device.name} {ym}: saved {len(columns[COL_TIME])} rows")
+    return saved
+
+
+def verify_device(conn: connection, archive: MonthArchive, device: DeviceRecord,
+                  year_month: Optional[str]) -> int:
+    """
+    デバイスの保存済み年月をデータベースと比較する
+    :param conn: psycopg2 connection
+    :param archive: MonthArchive
+    :param device: 対象デバイス
+    :param year_month: 対象年月 ※None なら保存済みの全年月
+    :return: 不一致の年月の数
+    """
+    dao: WeatherDao = WeatherDao(conn, logger=app_logger)
+    months: List[str] = [year_month] if year_month is not None else archive.list_months(device.id)
+    mismatches: int = 0
+    for ym in months:
+        archived: Optional[Dict[str, np.ndarray]] = archive.read(device.id, ym)
+        if archived is None:
+            print(f"{device.name} {ym}: NG (not archived)")
+            mismatches += 1
+            continue
+
+        expected: Dict[str, np.ndarray] = dao.getMonthColumns(device.id, ym)
+        diff_columns: List[str] = [
+            name for name in ARCHIVE_COLUMNS
+            if not np.array_equal(archived[name], expected[name],
+                                  equal_nan=(name != COL_TIME))
+        ]
+        if len(diff_columns) > 0:
+            print(f"{device.name} {ym}: NG (archived {len(archived[COL_TIME])} rows,"
+                  f" database {len(expected[COL_TIME])} rows, columns: {diff_columns})")
+            mismatches += 1
+        else:
+            print(f"{device.name} {ym}: OK ({len(expected[COL_TIME])} rows)")
+    return mismatches
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--archive-dir", type=str, default=MONTH_ARCHIVE_DIR,
+                        help="Archive directory (default: MONTH_ARCHIVE_DIR)")
+    parser.add_argument("--device-name", type=str, help="Device name (default: all devices)")
+    parser.add_argument("--year-month", type=str, help="YYYY-mm (default: all closed months)")
+    parser.add_argument("--grace-days", type=int, default=MONTH_ARCHIVE_GRACE_DAYS,
+                        help="Days after month end before archiving (default: MONTH_ARCHIVE_GRACE_DAYS)")
+    parser.add_argument("--rebuild", action="store_true", help="Rewrite archived months")
+    parser.add_argument("--verify", action="store_true", help="Compare archive with database")
+    args: argparse.Namespace = parser.parse_args()
+    if len(args.archive_dir) == 0:
+        parser.error("--archive-dir or MONTH_ARCHIVE_DIR is required")
+
+    month_archive: MonthArchive = MonthArchive(
+        os.path.expanduser(args.archive_dir), grace_days=args.grace_days, logger=app_logger)
+    db_conn: connection = psycopg2.connect(**load_dbconf())
+    # アプリのコネクションプールと同じセッション設定
+    db_conn.set_session(readonly=True, autocommit=True)
+    exit_code: int = 0
+    try:
+        for target in target_devices(db_conn, args.device_name):
+            if args.verify:
+                if verify_device(db_conn, month_archive, target, args.year_month) > 0:
+                    exit_code = 1
+            else:
+                build_device(db_conn, month_archive, target, args.year_month, args.rebuild)
+    finally:
+        db_conn.close()
+    sys.exit(exit_code)
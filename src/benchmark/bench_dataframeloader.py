@@ -0,0 +1,95 @@
+import timeit
+from datetime import datetime, timedelta
+from io import StringIO
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from plot_weather.loader.dataframeloader import (
+    COL_TIME, COL_TEMP_OUT, COL_TEMP_IN, COL_HUMID, COL_PRESSURE, COLUMNS,
+    rowsToDataFrame
+)
+from plot_weather.dao.weatherdao import TimeColumnType
+from plot_weather.util.date_util import FMT_DATETIME_HM
+
+"""
+DataFrame生成ベンチマーク: CSV経由 (旧実装) と 取得レコードからの直接生成
+[実行方法] src ディレクトリで実行
+  python -m benchmark.bench_dataframeloader
+"""
+
+# 1ヶ月分(31日)の10分間隔データ
+DAYS: int = 31
+RECORDS_PER_DAY: int = 144
+REPEAT: int = 20
+
+HEADER: str = f'"{COL_TIME}","{COL_TEMP_OUT}","{COL_TEMP_IN}","{COL_HUMID}","{COL_PRESSURE}"'
+
+
+def make_month_rows() -> List[Tuple[str, float, float, float, float]]:
+    """ WeatherDao.getMonthData() と同じ形式のダミーレコードを生成する """
+    rng = np.random.default_rng(0)
+    size: int = DAYS * RECORDS_PER_DAY
+    start: datetime = datetime(2024, 1, 1)
+    temp_out = np.round(rng.uniform(-10., 30., size), 1)
+    temp_in = np.round(rng.uniform(5., 30., size), 1)
+    humid = np.round(rng.uniform(20., 90., size), 1)
+    pressure = np.round(rng.uniform(980., 1030., size), 1)
+    rows = []
+    for i in range(size):
+        m_time: str = (start + timedelta(minutes=10 * i)).strftime(FMT_DATETIME_HM)
+        rows.append(
+            (m_time, float(temp_out[i]), float(temp_in[i]), float(humid[i]), float(pressure[i]))
+        )
+    return rows
+
+
+def load_with_csv(rows: List[Tuple[str, float, float, float, float]]) -> pd.DataFrame:
+    """ 旧実装: CSV文字列に変換してから pandas.read_csv() でパースする """
+    str_buffer = StringIO()
+    str_buffer.write(HEADER + "\n")
+    for (m_time, temp_out, temp_in, humid, pressure) in rows:
+        str_buffer.write(f'"{m_time}",{temp_out},{temp_in},{humid},{pressure}\n')
+    str_buffer.seek(0)
+    df: pd.DataFrame = pd.read_csv(str_buffer, header=0, parse_dates=[COL_TIME])
+    df.index = df[COL_TIME]
+    return df
+
+
+def load_direct(rows: List[Tuple[str, float, float, float, float]]) -> pd.DataFrame:
+    """ 新実装: 取得レコードから直接生成する """
+    return rowsToDataFrame(rows, COLUMNS, time_type=TimeColumnType.STRING)
+
+
+def to_epoch_rows(
+        rows: List[Tuple[str, float, float, float, float]]
+) -> List[Tuple[int, float, float, float, float]]:
+    """ 測定時刻をエポック秒に変換したレコード (TimeColumnType.EPOCH) """
+    return [
+        (int(pd.Timestamp(row[0]).timestamp()),) + row[1:] for row in rows
+    ]
+
+
+def load_direct_epoch(rows: List[Tuple[int, float, float, float, float]]) -> pd.DataFrame:
+    """ 新実装: 測定時刻がエポック秒の取得レコードから直接生成する """
+    return rowsToDataFrame(rows, COLUMNS, time_type=TimeColumnType.EPOCH)
+
+
+if __name__ == '__main__':
+    month_rows = make_month_rows()
+    epoch_rows = to_epoch_rows(month_rows)
+    # 結果が一致することを確認
+    df_csv: pd.DataFrame = load_with_csv(month_rows)
+    for df_direct in [load_direct(month_rows), load_direct_epoch(epoch_rows)]:
+        pd.testing.assert_frame_equal(
+            df_csv, df_direct, check_names=False, check_index_type=False, check_dtype=False
+        )
+    print(f"records: {len(month_rows)}, repeat: {REPEAT}")
+    results = {}
+    for name, func, data in [("csv", load_with_csv, month_rows),
+                             ("direct", load_direct, month_rows),
+                             ("epoch", load_direct_epoch, epoch_rows)]:
+        elapsed: float = min(timeit.repeat(lambda: func(data), number=1, repeat=REPEAT))
+        results[name] = elapsed
+        print(f"{name:>8}: {elapsed * 1000.:8.2f} ms ({results['csv'] / elapsed:.1f}x)")
@@ -0,0 +1,66 @@
+import argparse
+import timeit
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from plot_weather.loader.dataframeloader import (
+    COL_TIME, COL_TEMP_OUT, COL_TEMP_IN, COL_HUMID, COL_PRESSURE
+)
+from plot_weather.plotter.plottercommon import convert_png_bytes
+from plot_weather.plotter.plotterweather import (
+    PlotDateType, PlotParam, figure_template_pool, gen_plot_png, make_graph
+)
+
+"""
+グラフ描画ベンチマーク: 毎回Figureを生成 (make_graph) と テンプレートの再利用 (gen_plot_png)
+[実行方法] src ディレクトリで実行
+  python -m benchmark.bench_figure_template
+  python -m benchmark.bench_figure_template --phone-image-size 1064x1704x2.75
+"""
+
+# 当日分の10分間隔データ
+RECORDS_PER_DAY: int = 144
+TODAY: str = "2024-01-15"
+
+
+def make_today_frame() -> pd.DataFrame:
+    """ loadTodayDataFrame() と同じ形式のダミーデータを生成する """
+    rng = np.random.default_rng(0)
+    index = pd.date_range(TODAY, periods=RECORDS_PER_DAY, freq="10min", name=COL_TIME)
+    return pd.DataFrame({
+        COL_TEMP_OUT: np.round(rng.uniform(-5., 15., RECORDS_PER_DAY), 1),
+        COL_TEMP_IN: np.round(rng.uniform(10., 25., RECORDS_PER_DAY), 1),
+        COL_HUMID: np.round(rng.uniform(20., 90., RECORDS_PER_DAY), 1),
+        COL_PRESSURE: np.round(rng.uniform(990., 1030., RECORDS_PER_DAY), 1),
+    }, index=index, dtype=np.float32)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--phone-image-size", type=str, help="WxHxDensity (default: PC)")
+    parser.add_argument("--repeat", type=int, default=20, help="Repeat count")
+    args: argparse.Namespace = parser.parse_args()
+    phone_image_size: Optional[str] = args.phone_image_size
+
+    df: pd.DataFrame = make_today_frame()
+    plot_param: PlotParam = PlotParam(
+        plote_date_type=PlotDateType.TODAY, start_date=TODAY, end_date=None, before_days=None
+    )
+
+    def rebuild() -> bytes:
+        return convert_png_bytes(make_graph(df, plot_param, phone_image_size=phone_image_size))
+
+    def reuse() -> bytes:
+        return gen_plot_png(df, plot_param, phone_image_size=phone_image_size)
+
+    print(f"records: {df.shape[0]}, repeat: {args.repeat}")
+    results = {}
+    for name, func in [("rebuild", rebuild), ("template", reuse)]:
+        # 初回はテンプレート生成とフォントのキャッシュを含むため除外する
+        func()
+        elapsed: float = min(timeit.repeat(func, number=1, repeat=args.repeat))
+        results[name] = elapsed
+        print(f"{name:>10}: {elapsed * 1000.:8.2f} ms ({results['rebuild'] / elapsed:.1f}x)")
+    print(f"templates: {figure_template_pool.get_stats()}")
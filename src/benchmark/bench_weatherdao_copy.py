@@ -0,0 +1,81 @@
+import argparse
+import timeit
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import psycopg2
+from psycopg2.extensions import connection
+
+from plot_weather.cache.deviceregistry import DeviceRegistry
+from plot_weather.dao.weatherdao import MeasurementTime, TimeColumnType, WeatherDao
+from plot_weather.loader.dataframeloader import (
+    COLUMNS, epochColumnsToDataFrame, rowsToDataFrame
+)
+from plot_weather.settings import load_dbconf
+
+"""
+月間データ取得ベンチマーク: cursor.fetchall() (getMonthData) と COPY BINARY (getMonthColumns)
+[実行方法] src ディレクトリでアプリと同じ環境変数を設定して実行 ※データベース接続が必要
+  python -m benchmark.bench_weatherdao_copy --device-name esp8266_1 --year-month 2024-01
+"""
+
+
+def load_with_fetchall(dao: WeatherDao, device_id: int, year_month: str) -> pd.DataFrame:
+    """ 従来方式: 行ごとのタプルを取得してからDataFrameを生成する """
+    rows: List[Tuple[MeasurementTime, float, float, float, float]] = dao.getMonthData(
+        device_id, year_month
+    )
+    return rowsToDataFrame(rows, COLUMNS, time_type=TimeColumnType.EPOCH)
+
+
+def load_with_copy(dao: WeatherDao, device_id: int, year_month: str) -> pd.DataFrame:
+    """ COPY BINARY方式: 列ごとのNumPy配列から直接DataFrameを生成する """
+    columns: Dict[str, np.ndarray] = dao.getMonthColumns(device_id, year_month)
+    return epochColumnsToDataFrame(columns)
+
+
+def peak_memory(func: Callable[[], pd.DataFrame]) -> int:
+    """ 関数実行中のPythonヒープの最大使用量(byte) """
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--device-name", type=str, required=True, help="Device name")
+    parser.add_argument("--year-month", type=str, required=True, help="YYYY-mm")
+    parser.add_argument("--repeat", type=int, default=10, help="Repeat count")
+    args: argparse.Namespace = parser.parse_args()
+
+    conn: connection = psycopg2.connect(**load_dbconf())
+    # アプリのコネクションプールと同じセッション設定
+    conn.set_session(readonly=True, autocommit=True)
+    try:
+        device_registry: DeviceRegistry = DeviceRegistry()
+        device_id: Optional[int] = device_registry.get_id(lambda: conn, args.device_name)
+        if device_id is None:
+            raise SystemExit(f"Device not found: {args.device_name}")
+
+        dao_rows: WeatherDao = WeatherDao(conn, time_type=TimeColumnType.EPOCH)
+        dao_copy: WeatherDao = WeatherDao(conn)
+        df_rows: pd.DataFrame = load_with_fetchall(dao_rows, device_id, args.year_month)
+        df_copy: pd.DataFrame = load_with_copy(dao_copy, device_id, args.year_month)
+        # 測定値は float32 に丸めた値で一致することを確認
+        pd.testing.assert_frame_equal(df_rows.astype({c: np.float32 for c in COLUMNS[1:]}),
+                                      df_copy, check_names=False)
+        print(f"records: {df_copy.shape[0]}, repeat: {args.repeat}")
+        for name, dao, func in [("fetchall", dao_rows, load_with_fetchall),
+                                ("copy", dao_copy, load_with_copy)]:
+            def run() -> pd.DataFrame:
+                return func(dao, device_id, args.year_month)
+
+            elapsed: float = min(timeit.repeat(run, number=1, repeat=args.repeat))
+            peak: int = peak_memory(run)
+            print(f"{name:>10}: {elapsed * 1000.:8.2f} ms, peak heap {peak / 1024.:8.1f} KiB")
+    finally:
+        conn.close()
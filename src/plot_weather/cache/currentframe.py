@@ -0,0 +1,136 @@
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+"""
+当日・当月の観測データ(列データ)の差分更新キャッシュ
+[仕様]
+ (1) キーは (ロード種別, デバイスID, 対象期間(当日 or 当月))
+     (ロード種別, デバイスID)ごとに最近参照した対象期間を上限数(既定2)まで保持する
+     ※ブラウザ(最終登録日)とスマホ(システム日付)で対象期間が異なっても互いに追い出さない
+ (2) 初回参照時(保持していない対象期間)は対象期間の全データを読み込む
+ (3) 以降の参照では取得済みの最終測定時刻より後のデータのみ取得して末尾に追加する
+     ※更新コストは時刻(当日)・日(当月)の経過に依存しない
+ (4) 列データは追加ごとに新しい配列を生成する ※返却済みの配列は変更しない
+[前提条件]
+ 観測データは時系列順に追加される ※取得済みの最終測定時刻以前への追加は反映されない
+"""
+
+# 測定時刻カラム (エポック秒)
+COL_TIME: str = "measurement_time"
+# エポック秒の基準時刻 ※測定時刻(timestamp)をUTCとみなしたエポック秒
+_EPOCH_BASE: datetime = datetime(1970, 1, 1)
+
+# 列データの全件読み込み関数
+FullLoader = Callable[[], Dict[str, np.ndarray]]
+# 列データの差分読み込み関数 ※引数は取得済みの最終測定時刻
+AfterLoader = Callable[[datetime], Dict[str, np.ndarray]]
+
+
+@dataclass
+class CurrentFrameStats:
+    """ 差分更新キャッシュの統計情報 """
+    # 全件読み込み回数
+    full_loads: int = 0
+    # 差分読み込み回数
+    incremental_loads: int = 0
+    # 差分読み込みで追加したレコード数
+    appended_rows: int = 0
+
+
+def epochToDatetime(epoch: int) -> datetime:
+    """ エポック秒を測定時刻(timestamp)に変換する """
+    return _EPOCH_BASE + timedelta(seconds=int(epoch))
+
+
+class CurrentFrameCache:
+    def __init__(self, max_periods: int = 2, logger: Optional[logging.Logger] = None):
+        """
+        :param max_periods: (ロード種別, デバイスID)ごとに保持する対象期間の数の上限
+        :param logger: app_logger
+        """
+        self.max_periods: int = max(max_periods, 1)
+        self.logger: Optional[logging.Logger] = logger
+        self._lock: threading.Lock = threading.Lock()
+        # (ロード種別, デバイスID)ごとの対象期間と列データ (末尾が最近参照した対象期間)
+        self._entries: Dict[Tuple[str, int], "OrderedDict[str, Dict[str, np.ndarray]]"] = {}
+        # 同一キーの読み込みは (ロード種別, デバイスID) 単位で直列化する
+        self._key_locks: Dict[Tuple[str, int], threading.Lock] = {}
+        self._stats: CurrentFrameStats = CurrentFrameStats()
+
+    def _keyLock(self, key: Tuple[str, int]) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get_columns(self, kind: str, device_id: int, period: str,
+                    load_full: FullLoader, load_after: AfterLoader) -> Dict[str, np.ndarray]:
+        """
+        対象期間の列データを取得する ※取得済みなら差分のみ読み込んで追加する
+        :param kind: ロード種別
+        :param device_id: デバイスID
+        :param period: 対象期間 (当日: %Y-%m-%d, 当月: %Y-%m)
+        :param load_full: 対象期間の全件読み込み関数
+        :param load_after: 取得済みの最終測定時刻より後の差分読み込み関数
+        :return: カラム名とNumPy配列の辞書 ※レコードなしは長さ0の配列
+        :raise: DatabaseError
+        """
+        key: Tuple[str, int] = (kind, device_id)
+        with self._keyLock(key):
+            with self._lock:
+                cached: Optional[Dict[str, np.ndarray]] = self._entries.get(key, {}).get(period)
+            columns: Dict[str, np.ndarray]
+            if cached is None or len(cached[COL_TIME]) == 0:
+                columns = load_full()
+                with self._lock:
+                    self._stats.full_loads += 1
+            else:
+                last_time: datetime = epochToDatetime(cached[COL_TIME][-1])
+                added: Dict[str, np.ndarray] = load_after(last_time)
+                added_count: int = len(added[COL_TIME])
+                if added_count > 0:
+                    columns = {
+                        name: np.concatenate(
+                            [values, added[name].astype(values.dtype, copy=False)])
+                        for name, values in cached.items()
+                    }
+                else:
+                    columns = cached
+                with self._lock:
+                    self._stats.incremental_loads += 1
+                    self._stats.appended_rows += added_count
+                if self.logger is not None and added_count > 0:
+                    self.logger.debug(
+                        f"CurrentFrameCache{key + (period,)}: appended {added_count} rows")
+            with self._lock:
+                periods: "OrderedDict[str, Dict[str, np.ndarray]]" = \
+                    self._entries.setdefault(key, OrderedDict())
+                periods[period] = columns
+                periods.move_to_end(period)
+                while len(periods) > self.max_periods:
+                    # 最も前に参照した対象期間を破棄する
+                    periods.popitem(last=False)
+        return columns
+
+    def invalidate(self, device_id: Optional[int] = None) -> None:
+        """
+        キャッシュを破棄する ※次回参照時に全件読み込む
+        :param device_id: デバイスID ※None なら全デバイス
+        """
+        with self._lock:
+            for key in [key for key in self._entries if device_id is None or key[1] == device_id]:
+                self._entries.pop(key, None)
+
+    def get_stats(self) -> Dict:
+        """
+        統計情報を取得する
+        :return: 統計情報の辞書 ※キャッシュ件数(entries: 対象期間の数の合計)を含む
+        """
+        with self._lock:
+            result: Dict = asdict(self._stats)
+            result["entries"] = sum(len(periods) for periods in self._entries.values())
+        return result
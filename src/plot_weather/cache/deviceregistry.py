@@ -0,0 +1,146 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List, Optional
+
+from psycopg2.extensions import connection
+
+from plot_weather.dao.devicedao import DeviceDao, DeviceRecord
+
+"""
+センサーデバイスのキャッシュ (デバイス名 → デバイスID)
+[仕様]
+ (1) 起動時に t_deviceテーブルの全レコードを読み込む
+ (2) 有効期限(TTL)を過ぎた場合は次回参照時に再読み込みする
+ (3) 未登録のデバイス名を参照した場合は最短再読み込み間隔を空けて再読み込みする
+     ※デバイス追加直後に参照された場合の対策, 不正なデバイス名による連続再読み込みは抑止する
+[前提条件]
+ t_deviceテーブルの更新はデバイス追加時のみ (ほぼ更新されない)
+"""
+
+
+@dataclass
+class DeviceRegistryStats:
+    """ デバイスキャッシュの統計情報 """
+    # 登録デバイス数
+    devices: int = 0
+    # 参照回数
+    lookups: int = 0
+    # 未登録デバイス名の参照回数
+    misses: int = 0
+    # 再読み込み回数
+    refreshes: int = 0
+
+
+class DeviceRegistry:
+    def __init__(self, ttl_seconds: float = 3600., min_refresh_seconds: float = 10.,
+                 logger: Optional[logging.Logger] = None):
+        """
+        :param ttl_seconds: 有効期限(秒) ※0以下なら期限なし (refresh()でのみ再読み込み)
+        :param min_refresh_seconds: 未登録デバイス名による再読み込みの最短間隔(秒)
+        :param logger: app_logger
+        """
+        self.ttl_seconds: float = ttl_seconds
+        self.min_refresh_seconds: float = min_refresh_seconds
+        self.logger: Optional[logging.Logger] = logger
+        self._lock: threading.Lock = threading.Lock()
+        # 参照は読み込み済みの辞書とリストをそのまま使う (再読み込み時は差し替える)
+        self._devices: List[DeviceRecord] = []
+        self._by_name: Dict[str, DeviceRecord] = {}
+        self._loaded_at: Optional[float] = None
+        self._stats: DeviceRegistryStats = DeviceRegistryStats()
+
+    def refresh(self, conn: connection) -> None:
+        """
+        t_deviceテーブルを再読み込みする
+        :param conn: psycopg2 connection
+        :raise: DatabaseError
+        """
+        devices: List[DeviceRecord] = DeviceDao(conn, logger=self.logger).get_devices()
+        by_name: Dict[str, DeviceRecord] = {device.name: device for device in devices}
+        with self._lock:
+            self._devices = devices
+            self._by_name = by_name
+            self._loaded_at = time.monotonic()
+            self._stats.devices = len(devices)
+            self._stats.refreshes += 1
+        if self.logger is not None:
+            self.logger.info(f"DeviceRegistry loaded: {len(devices)} devices")
+
+    def _isExpired(self) -> bool:
+        if self._loaded_at is None:
+            return True
+        if self.ttl_seconds <= 0:
+            return False
+        return time.monotonic() - self._loaded_at >= self.ttl_seconds
+
+    def get_devices(self, get_conn: Callable[[], connection]) -> List[DeviceRecord]:
+        """
+        全てのデバイスを取得する ※DeviceDao.get_devices()と同じ並び順(id順)
+        :param get_conn: コネクション取得関数 ※再読み込みが必要な場合のみ呼び出す
+        :return: List[DeviceRecord]
+        :raise: DatabaseError
+        """
+        if self._isExpired():
+            self.refresh(get_conn())
+        return self._devices
+
+    def get(self, get_conn: Callable[[], connection], device_name: str) -> Optional[DeviceRecord]:
+        """
+        デバイス名に対応するデバイスを取得する
+        :param get_conn: コネクション取得関数 ※再読み込みが必要な場合のみ呼び出す
+        :param device_name: デバイス名
+        :return: 登録済みなら DeviceRecord, 未登録なら None
+        :raise: DatabaseError
+        """
+        if self._isExpired():
+            self.refresh(get_conn())
+        device: Optional[DeviceRecord] = self._by_name.get(device_name)
+        with self._lock:
+            self._stats.lookups += 1
+            if device is not None:
+                return device
+
+            self._stats.misses += 1
+            need_refresh: bool = (
+                time.monotonic() - self._loaded_at >= self.min_refresh_seconds
+            )
+        if need_refresh:
+            # デバイスが追加された可能性があるので再読み込みする
+            self.refresh(get_conn())
+            device = self._by_name.get(device_name)
+        return device
+
+    def get_id(self, get_conn: Callable[[], connection], device_name: str) -> Optional[int]:
+        """
+        デバイス名に対応するデバイスIDを取得する
+        :param get_conn: コネクション取得関数 ※再読み込みが必要な場合のみ呼び出す
+        :param device_name: デバイス名
+        :return: 登録済みならデバイスID, 未登録なら None
+        :raise: DatabaseError
+        """
+        device: Optional[DeviceRecord] = self.get(get_conn, device_name)
+        return device.id if device is not None else None
+
+    def exists(self, get_conn: Callable[[], connection], device_name: str) -> bool:
+        """
+        デバイス名が登録済みかチェックする ※DeviceDao.exists()の代替
+        :param get_conn: コネクション取得関数 ※再読み込みが必要な場合のみ呼び出す
+        :param device_name: デバイス名
+        :return: 存在したら True
+        :raise: DatabaseError
+        """
+        return self.get(get_conn, device_name) is not None
+
+    def get_stats(self) -> Dict:
+        """
+        統計情報を取得する
+        :return: 統計情報の辞書 ※前回読み込みからの経過秒数(age_seconds)を含む
+        """
+        with self._lock:
+            result: Dict = asdict(self._stats)
+            loaded_at: Optional[float] = self._loaded_at
+        result["age_seconds"] = round(
+            time.monotonic() - loaded_at, 1) if loaded_at is not None else None
+        return result
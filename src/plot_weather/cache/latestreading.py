@@ -0,0 +1,101 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, Optional
+
+from psycopg2.extensions import connection
+
+from plot_weather.dao.weatherstatdao import LastDataWithTempOutStat, TempOutStatDao
+
+"""
+デバイスごとの最新観測データのキャッシュ
+[仕様]
+ (1) 最新レコードと検索日・前日の外気温統計はデバイスIDごとに1回のクエリーで取得する
+     ※最新レコードは主キーの降順スキャン(LIMIT 1)
+ (2) 取得から再確認間隔(秒)以内の参照はキャッシュから返却する
+ (3) 再確認時に測定時刻が新しいレコードが有れば差し替える
+[前提条件]
+ 観測データは他のアプリが一定間隔で登録する ※本アプリは参照のみ
+"""
+
+@dataclass
+class LatestReadingStats:
+    """ 最新観測データキャッシュの統計情報 """
+    # キャッシュから返却した回数
+    hits: int = 0
+    # データベースを再確認した回数
+    rechecks: int = 0
+    # 再確認で新しいレコードに差し替えた回数
+    updates: int = 0
+
+
+@dataclass(frozen=True)
+class _LatestEntry:
+    # 最新レコードと外気温統計 ※レコードなしは None
+    row: Optional[LastDataWithTempOutStat]
+    # データベースを確認した時刻 (time.monotonic())
+    checked_at: float
+
+
+class LatestReadingCache:
+    def __init__(self, recheck_seconds: float = 30.,
+                 logger: Optional[logging.Logger] = None):
+        """
+        :param recheck_seconds: 再確認間隔(秒) ※0以下ならキャッシュしない
+        :param logger: app_logger
+        """
+        self.recheck_seconds: float = recheck_seconds
+        self.logger: Optional[logging.Logger] = logger
+        self._lock: threading.Lock = threading.Lock()
+        self._entries: Dict[int, _LatestEntry] = {}
+        self._stats: LatestReadingStats = LatestReadingStats()
+
+    def get(self, get_conn: Callable[[], connection], device_id: int
+            ) -> Optional[LastDataWithTempOutStat]:
+        """
+        デバイスの最新レコードと検索日・前日の外気温統計を取得する
+        :param get_conn: コネクション取得関数 ※再確認が必要な場合のみ呼び出す
+        :param device_id: デバイスID
+        :return: LastDataWithTempOutStat, レコードなしは None
+        :raise: DatabaseError
+        """
+        with self._lock:
+            entry: Optional[_LatestEntry] = self._entries.get(device_id)
+            if entry is not None and time.monotonic() - entry.checked_at < self.recheck_seconds:
+                self._stats.hits += 1
+                return entry.row
+
+        dao: TempOutStatDao = TempOutStatDao(get_conn(), logger=self.logger)
+        row: Optional[LastDataWithTempOutStat] = dao.get_last_data_with_statistics(device_id)
+        with self._lock:
+            self._stats.rechecks += 1
+            prev: Optional[_LatestEntry] = self._entries.get(device_id)
+            if prev is not None and prev.row is not None and row is not None \
+                    and prev.row.measurement_time != row.measurement_time:
+                self._stats.updates += 1
+            self._entries[device_id] = _LatestEntry(row=row, checked_at=time.monotonic())
+        return row
+
+    def invalidate(self, device_id: Optional[int] = None) -> None:
+        """
+        キャッシュを無効にする
+        :param device_id: デバイスID ※None なら全デバイス
+        """
+        with self._lock:
+            if device_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(device_id, None)
+
+    def get_stats(self) -> Dict:
+        """
+        統計情報を取得する
+        :return: 統計情報の辞書 ※キャッシュ済みデバイス数(devices)とヒット率(hit_rate)を含む
+        """
+        with self._lock:
+            result: Dict = asdict(self._stats)
+            result["devices"] = len(self._entries)
+        total: int = result["hits"] + result["rechecks"]
+        result["hit_rate"] = round(result["hits"] / total, 3) if total > 0 else 0.
+        return result
@@ -0,0 +1,186 @@
+import logging
+import os
+import shutil
+import threading
+import uuid
+from dataclasses import dataclass, asdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from plot_weather.util.date_util import FMT_ISO8601, nextYearMonth
+
+"""
+確定済み年月(当月より前)の観測データのディスク上の列アーカイブ
+[仕様]
+ (1) デバイス・年月ごとのディレクトリに列ごとのNumPy配列ファイル(.npy)を保存する
+     {アーカイブディレクトリ}/{デバイスID}/{年月}/{カラム名}.npy
+     測定時刻(measurement_time): int64 エポック秒, 測定値: float32 (NULLはNaN)
+ (2) 読み込みはメモリマップ(mmap_mode='r') ※ファイル全体を読み込まない
+ (3) 書き込みは一時ディレクトリに保存してから名前を変更する
+     ※年月ディレクトリが存在すれば全カラムが保存済み
+ (4) 当月以降の年月は保存しない (観測データが追加されるため)
+     確定後の猶予日数以内の年月も保存しない ※オフラインだったセンサーが遅れて登録するデータを取り込む
+[前提条件]
+ 確定済み年月の観測データは変更されない
+"""
+
+# 測定時刻カラム (エポック秒)
+COL_TIME: str = "measurement_time"
+# 保存するカラム
+ARCHIVE_COLUMNS: List[str] = [COL_TIME, "temp_out", "temp_in", "humid", "pressure"]
+# カラムごとの保存形式
+ARCHIVE_DTYPES: Dict[str, np.dtype] = {
+    name: np.dtype(np.int64) if name == COL_TIME else np.dtype(np.float32)
+    for name in ARCHIVE_COLUMNS
+}
+
+
+@dataclass
+class MonthArchiveStats:
+    """ 年月アーカイブの統計情報 """
+    # アーカイブから読み込んだ回数
+    hits: int = 0
+    # アーカイブになかった回数
+    misses: int = 0
+    # 保存した年月の数
+    writes: int = 0
+    # 読み込み・保存エラー回数
+    errors: int = 0
+
+
+class MonthArchive:
+    def __init__(self, root_dir: str, grace_days: int = 7,
+                 logger: Optional[logging.Logger] = None):
+        """
+        :param root_dir: アーカイブディレクトリ ※存在しなければ作成する
+        :param grace_days: 確定後に保存するまでの猶予日数 ※猶予期間中はデータベースから取得する
+        :param logger: app_logger
+        """
+        self.root_dir: str = root_dir
+        self.grace_days: int = grace_days
+        self.logger: Optional[logging.Logger] = logger
+        self._lock: threading.Lock = threading.Lock()
+        self._stats: MonthArchiveStats = MonthArchiveStats()
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def month_dir(self, device_id: int, year_month: str) -> str:
+        """ デバイス・年月のディレクトリパス """
+        return os.path.join(self.root_dir, str(device_id), year_month)
+
+    def is_archivable(self, year_month: str, today: Optional[date] = None) -> bool:
+        """
+        保存できる年月かチェックする
+        :param year_month: 年月(%Y-%m)
+        :param today: 当日 ※None ならシステム日付
+        :return: 翌月1日から猶予日数が経過していれば True
+        """
+        if today is None:
+            today = date.today()
+        next_month: date = datetime.strptime(
+            nextYearMonth(f"{year_month}-01"), FMT_ISO8601).date()
+        return today >= next_month + timedelta(days=self.grace_days)
+
+    def exists(self, device_id: int, year_month: str) -> bool:
+        """ 保存済みの年月かチェックする """
+        return os.path.isdir(self.month_dir(device_id, year_month))
+
+    def list_months(self, device_id: int) -> List[str]:
+        """
+        保存済みの年月リストを取得する
+        :param device_id: デバイスID
+        :return: 昇順の年月リスト(%Y-%m)
+        """
+        device_dir: str = os.path.join(self.root_dir, str(device_id))
+        if not os.path.isdir(device_dir):
+            return []
+        return sorted(name for name in os.listdir(device_dir)
+                      if not name.startswith(".") and os.path.isdir(os.path.join(device_dir, name)))
+
+    def read(self, device_id: int, year_month: str,
+             names: Optional[List[str]] = None) -> Optional[Dict[str, np.ndarray]]:
+        """
+        保存済みの年月の列データをメモリマップで読み込む
+        :param device_id: デバイスID
+        :param year_month: 年月(%Y-%m)
+        :param names: 測定値カラム名リスト ※None なら全カラム, 測定時刻は常に含む
+        :return: カラム名と読み取り専用のNumPy配列の辞書, 保存されていない場合は None
+        """
+        month_dir: str = self.month_dir(device_id, year_month)
+        if not os.path.isdir(month_dir):
+            with self._lock:
+                self._stats.misses += 1
+            return None
+
+        columns: List[str] = ARCHIVE_COLUMNS if names is None else [COL_TIME] + names
+        try:
+            result: Dict[str, np.ndarray] = {
+                name: np.load(os.path.join(month_dir, f"{name}.npy"), mmap_mode="r")
+                for name in columns
+            }
+        except (OSError, ValueError) as err:
+            # 破損したアーカイブはデータベースから取得する
+            with self._lock:
+                self._stats.errors += 1
+            if self.logger is not None:
+                self.logger.warning(f"MonthArchive read {month_dir}: {err}")
+            return None
+
+        with self._lock:
+            self._stats.hits += 1
+        return result
+
+    def write(self, device_id: int, year_month: str, columns: Dict[str, np.ndarray],
+              overwrite: bool = False) -> bool:
+        """
+        確定済み年月の列データを保存する
+        :param device_id: デバイスID
+        :param year_month: 年月(%Y-%m)
+        :param columns: カラム名とNumPy配列の辞書 ※ARCHIVE_COLUMNS を全て含む
+        :param overwrite: 保存済みの場合に置き換えるか
+        :return: 保存したら True, 猶予期間内(当月以降を含む)・保存済み・レコードなしは False
+        :raise: OSError
+        """
+        if not self.is_archivable(year_month) or len(columns[COL_TIME]) == 0:
+            return False
+
+        month_dir: str = self.month_dir(device_id, year_month)
+        if os.path.isdir(month_dir) and not overwrite:
+            return False
+
+        device_dir: str = os.path.dirname(month_dir)
+        os.makedirs(device_dir, exist_ok=True)
+        tmp_dir: str = os.path.join(device_dir, f".{year_month}.{uuid.uuid4().hex}")
+        os.makedirs(tmp_dir)
+        try:
+            for name in ARCHIVE_COLUMNS:
+                values: np.ndarray = np.ascontiguousarray(columns[name], dtype=ARCHIVE_DTYPES[name])
+                np.save(os.path.join(tmp_dir, f"{name}.npy"), values)
+            if os.path.isdir(month_dir):
+                shutil.rmtree(month_dir)
+            os.rename(tmp_dir, month_dir)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if os.path.isdir(month_dir) and not overwrite:
+                # 同時に保存された場合は先勝ち
+                return False
+            with self._lock:
+                self._stats.errors += 1
+            raise
+
+        with self._lock:
+            self._stats.writes += 1
+        if self.logger is not None:
+            self.logger.info(f"MonthArchive saved: {month_dir} ({len(columns[COL_TIME])} rows)")
+        return True
+
+    def get_stats(self) -> Dict:
+        """
+        統計情報を取得する
+        :return: 統計情報の辞書 ※アーカイブディレクトリ(root_dir)を含む
+        """
+        with self._lock:
+            result: Dict = asdict(self._stats)
+        result["root_dir"] = self.root_dir
+        return result
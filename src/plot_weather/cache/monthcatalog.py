@@ -0,0 +1,178 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List, Optional, Set
+
+from psycopg2.extensions import connection
+
+from plot_weather.dao.weatherdao import WeatherDao
+
+"""
+デバイスごとの観測年月カタログ
+WeatherDaoの以下のメソッドと同じ結果をメモリから返却する
+  getGroupByMonths(), getPrevYearMonthList(), getFirstRegisterDay(), getLastRegisterDay()
+[仕様]
+ (1) 初回参照時にデバイスの年月リスト, 初回登録日, 最終登録日を読み込む
+ (2) 再確認間隔(秒)を過ぎた参照では最終登録日のみ確認し, 変わっていれば
+     最終年月以降の年月リストのみ追加で読み込む ※変更されるのは最新の年月のみ
+[前提条件]
+ 観測データは時系列順に追加され, 過去データは削除されない
+"""
+
+
+@dataclass
+class MonthCatalogStats:
+    """ 観測年月カタログの統計情報 """
+    # メモリから返却した回数
+    hits: int = 0
+    # 全期間を読み込んだ回数
+    builds: int = 0
+    # 最終登録日を再確認した回数
+    rechecks: int = 0
+    # 再確認で年月リストを追加で読み込んだ回数
+    updates: int = 0
+
+
+@dataclass(frozen=True)
+class _DeviceMonths:
+    # 昇順の年月リスト(%Y-%m)
+    months: List[str]
+    # 初回登録日, 最終登録日(%Y-%m-%d) ※レコードなしは None
+    first_day: Optional[str]
+    last_day: Optional[str]
+    # データベースを確認した時刻 (time.monotonic())
+    checked_at: float
+
+
+def _prevYearMonth(year_month: str) -> str:
+    """ 前年の同月(%Y-%m) """
+    return f"{int(year_month[:4]) - 1:04d}{year_month[4:]}"
+
+
+class MonthCatalog:
+    def __init__(self, recheck_seconds: float = 60.,
+                 logger: Optional[logging.Logger] = None):
+        """
+        :param recheck_seconds: 最終登録日の再確認間隔(秒)
+        :param logger: app_logger
+        """
+        self.recheck_seconds: float = recheck_seconds
+        self.logger: Optional[logging.Logger] = logger
+        self._lock: threading.Lock = threading.Lock()
+        self._entries: Dict[int, _DeviceMonths] = {}
+        self._stats: MonthCatalogStats = MonthCatalogStats()
+
+    def _build(self, dao: WeatherDao, device_id: int) -> _DeviceMonths:
+        """ デバイスの全期間を読み込む """
+        months: List[str] = dao.getYearMonthsFrom(device_id)
+        first_day: Optional[str] = dao.getFirstRegisterDay(device_id)
+        last_day: Optional[str] = dao.getLastRegisterDay(device_id)
+        with self._lock:
+            self._stats.builds += 1
+        return _DeviceMonths(months=months, first_day=first_day, last_day=last_day,
+                             checked_at=time.monotonic())
+
+    def _update(self, dao: WeatherDao, device_id: int, entry: _DeviceMonths) -> _DeviceMonths:
+        """ 最終登録日が変わっていれば最終年月以降の年月リストを読み込む """
+        last_day: Optional[str] = dao.getLastRegisterDay(device_id)
+        with self._lock:
+            self._stats.rechecks += 1
+        if last_day == entry.last_day:
+            return _DeviceMonths(months=entry.months, first_day=entry.first_day,
+                                 last_day=last_day, checked_at=time.monotonic())
+
+        if entry.last_day is None:
+            # 前回はレコードなし
+            return self._build(dao, device_id)
+
+        # 最終年月は重複して取得されるので除いて連結する
+        last_month: str = entry.months[-1]
+        new_months: List[str] = dao.getYearMonthsFrom(device_id, from_year_month=last_month)
+        with self._lock:
+            self._stats.updates += 1
+        return _DeviceMonths(months=entry.months[:-1] + new_months, first_day=entry.first_day,
+                             last_day=last_day, checked_at=time.monotonic())
+
+    def _get(self, get_conn: Callable[[], connection], device_id: int) -> _DeviceMonths:
+        with self._lock:
+            entry: Optional[_DeviceMonths] = self._entries.get(device_id)
+            if entry is not None and time.monotonic() - entry.checked_at < self.recheck_seconds:
+                self._stats.hits += 1
+                return entry
+
+        dao: WeatherDao = WeatherDao(get_conn(), logger=self.logger)
+        if entry is None:
+            entry = self._build(dao, device_id)
+        else:
+            entry = self._update(dao, device_id, entry)
+        with self._lock:
+            self._entries[device_id] = entry
+        return entry
+
+    def get_group_by_months(self, get_conn: Callable[[], connection], device_id: int
+                            ) -> List[str]:
+        """
+        データが存在する年月リストを取得する ※WeatherDao.getGroupByMonths()の代替
+        :param get_conn: コネクション取得関数 ※読み込みが必要な場合のみ呼び出す
+        :param device_id: デバイスID
+        :return: 降順の年月リスト(%Y-%m), 存在しない場合は空のリスト
+        :raise: DatabaseError
+        """
+        return list(reversed(self._get(get_conn, device_id).months))
+
+    def get_prev_year_month_list(self, get_conn: Callable[[], connection], device_id: int
+                                 ) -> List[str]:
+        """
+        前年同月のデータが存在する年月リストを取得する ※WeatherDao.getPrevYearMonthList()の代替
+        :param get_conn: コネクション取得関数 ※読み込みが必要な場合のみ呼び出す
+        :param device_id: デバイスID
+        :return: 降順の年月リスト(%Y-%m), 存在しない場合は空のリスト
+        :raise: DatabaseError
+        """
+        months: List[str] = self._get(get_conn, device_id).months
+        month_set: Set[str] = set(months)
+        return [ym for ym in reversed(months) if _prevYearMonth(ym) in month_set]
+
+    def get_first_register_day(self, get_conn: Callable[[], connection], device_id: int
+                               ) -> Optional[str]:
+        """
+        初回登録日を取得する ※WeatherDao.getFirstRegisterDay()の代替
+        :param get_conn: コネクション取得関数 ※読み込みが必要な場合のみ呼び出す
+        :param device_id: デバイスID
+        :return: 存在する場合は初回登録日, 存在しない場合はNone
+        :raise: DatabaseError
+        """
+        return self._get(get_conn, device_id).first_day
+
+    def get_last_register_day(self, get_conn: Callable[[], connection], device_id: int
+                              ) -> Optional[str]:
+        """
+        最終登録日を取得する ※WeatherDao.getLastRegisterDay()の代替
+        :param get_conn: コネクション取得関数 ※読み込みが必要な場合のみ呼び出す
+        :param device_id: デバイスID
+        :return: 存在する場合は最終登録日, 存在しない場合はNone
+        :raise: DatabaseError
+        """
+        return self._get(get_conn, device_id).last_day
+
+    def invalidate(self, device_id: Optional[int] = None) -> None:
+        """
+        カタログを破棄する ※次回参照時に全期間を読み込む
+        :param device_id: デバイスID ※None なら全デバイス
+        """
+        with self._lock:
+            if device_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(device_id, None)
+
+    def get_stats(self) -> Dict:
+        """
+        統計情報を取得する
+        :return: 統計情報の辞書 ※読み込み済みデバイス数(devices)を含む
+        """
+        with self._lock:
+            result: Dict = asdict(self._stats)
+            result["devices"] = len(self._entries)
+        return result
@@ -0,0 +1,147 @@
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from datetime import date
+from typing import Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+"""
+確定済み年月(当月より前)の観測データDataFrameのキャッシュ
+[仕様]
+ (1) キーは (ロード種別, デバイスID, 年月) ※ロード種別はローダーごとの取得カラムの違い
+ (2) 当月以降の年月はキャッシュしない (観測データが追加されるため)
+ (3) DataFrameのメモリサイズの合計が上限を超えたら最も古く参照されたものから破棄する (LRU)
+ (4) 返却するDataFrameは浅いコピー ※呼び出し側のカラム追加はキャッシュに影響しない
+[前提条件]
+ 確定済み年月の観測データは変更されない
+"""
+
+# キャッシュキー: (ロード種別, デバイスID, 年月(%Y-%m))
+MonthFrameKey = Tuple[str, int, str]
+
+
+@dataclass
+class MonthFrameStats:
+    """ 年月DataFrameキャッシュの統計情報 """
+    # キャッシュから返却した回数
+    hits: int = 0
+    # キャッシュになくロードした回数
+    misses: int = 0
+    # メモリ上限超過で破棄した件数
+    evictions: int = 0
+    # 当月以降のためキャッシュしなかった回数
+    bypasses: int = 0
+
+
+def isClosedMonth(year_month: str, today: Optional[date] = None) -> bool:
+    """
+    確定済み(当月より前)の年月かチェックする
+    :param year_month: 年月(%Y-%m)
+    :param today: 当日 ※None ならシステム日付
+    :return: 当月より前なら True
+    """
+    if today is None:
+        today = date.today()
+    return year_month < today.strftime("%Y-%m")
+
+
+def frameBytes(df: pd.DataFrame) -> int:
+    """ DataFrameのメモリサイズ(インデックスを含む) """
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class MonthFrameCache:
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024,
+                 logger: Optional[logging.Logger] = None):
+        """
+        :param max_bytes: キャッシュするDataFrameのメモリサイズの上限 ※0以下ならキャッシュしない
+        :param logger: app_logger
+        """
+        self.max_bytes: int = max_bytes
+        self.logger: Optional[logging.Logger] = logger
+        self._lock: threading.Lock = threading.Lock()
+        # 参照順 (末尾が最新)
+        self._entries: "OrderedDict[MonthFrameKey, Tuple[pd.DataFrame, int]]" = OrderedDict()
+        self._total_bytes: int = 0
+        self._stats: MonthFrameStats = MonthFrameStats()
+
+    def get_or_load(self, kind: str, device_id: int, year_month: str,
+                    loader: Callable[[], Optional[pd.DataFrame]]) -> Optional[pd.DataFrame]:
+        """
+        年月のDataFrameをキャッシュから取得する ※キャッシュになければロードする
+        :param kind: ロード種別
+        :param device_id: デバイスID
+        :param year_month: 年月(%Y-%m)
+        :param loader: DataFrameのロード関数 ※レコードなしは None
+        :return: DataFrameの浅いコピー, レコードなしは None
+        :raise: DatabaseError
+        """
+        if self.max_bytes <= 0 or not isClosedMonth(year_month):
+            with self._lock:
+                self._stats.bypasses += 1
+            return loader()
+
+        key: MonthFrameKey = (kind, device_id, year_month)
+        with self._lock:
+            entry: Optional[Tuple[pd.DataFrame, int]] = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats.hits += 1
+                return entry[0].copy(deep=False)
+
+            self._stats.misses += 1
+        df: Optional[pd.DataFrame] = loader()
+        if df is None:
+            # レコードなしはキャッシュしない
+            return None
+
+        self._put(key, df)
+        return df.copy(deep=False)
+
+    def _put(self, key: MonthFrameKey, df: pd.DataFrame) -> None:
+        size: int = frameBytes(df)
+        if size > self.max_bytes:
+            if self.logger is not None:
+                self.logger.info(f"MonthFrameCache: {key} too large ({size} bytes)")
+            return
+
+        with self._lock:
+            prev: Optional[Tuple[pd.DataFrame, int]] = self._entries.pop(key, None)
+            if prev is not None:
+                # 同時にロードされた場合は後勝ち
+                self._total_bytes -= prev[1]
+            self._entries[key] = (df, size)
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes:
+                evicted_key: MonthFrameKey
+                evicted: Tuple[pd.DataFrame, int]
+                evicted_key, evicted = self._entries.popitem(last=False)
+                self._total_bytes -= evicted[1]
+                self._stats.evictions += 1
+                if self.logger is not None:
+                    self.logger.debug(f"MonthFrameCache evicted: {evicted_key}")
+
+    def invalidate(self, device_id: Optional[int] = None) -> None:
+        """
+        キャッシュを破棄する
+        :param device_id: デバイスID ※None なら全デバイス
+        """
+        with self._lock:
+            for key in [key for key in self._entries if device_id is None or key[1] == device_id]:
+                self._total_bytes -= self._entries.pop(key)[1]
+
+    def get_stats(self) -> Dict:
+        """
+        統計情報を取得する
+        :return: 統計情報の辞書 ※件数(entries), 使用メモリ(bytes), 上限(max_bytes), ヒット率(hit_rate)を含む
+        """
+        with self._lock:
+            result: Dict = asdict(self._stats)
+            result["entries"] = len(self._entries)
+            result["bytes"] = self._total_bytes
+        result["max_bytes"] = self.max_bytes
+        total: int = result["hits"] + result["misses"]
+        result["hit_rate"] = round(result["hits"] / total, 3) if total > 0 else 0.
+        return result
@@ -0,0 +1,177 @@
+import logging
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, Iterable, List, Optional
+
+from psycopg2.extensions import connection
+
+"""
+全デバイスの当日画像の事前描画スケジューラ
+[仕様]
+ (1) 一定間隔で全デバイスの当日データを確認し, 新しい測定データがあれば当日画像を描画して
+     描画済み画像キャッシュに格納する ※描画済みかどうかの判定はキャッシュのウォーターマーク
+ (2) 描画する画像サイズは PC と, スマホからのリクエストで多く使われている表示領域サイズ(上位N件)
+     記録する表示領域サイズの数は上限までとし, 一定時間(既定1時間)ごとに使用回数を半減して
+     使われなくなったものを破棄する ※確認間隔より十分に長くし, リクエストの少ない時間帯でも残す
+ (3) 描画処理(データ取得と描画・キャッシュ格納)は呼び出し側から関数で受け取る
+[前提条件]
+ 観測データは他のアプリが一定間隔で登録する ※本アプリは参照のみ
+"""
+
+# PCの画像サイズ ※描画済み画像キャッシュのキーと同じ
+PC_IMAGE_SIZE: str = ""
+
+
+@dataclass
+class PrerenderStats:
+    """ 事前描画スケジューラの統計情報 """
+    # 確認した回数
+    runs: int = 0
+    # 描画した画像の数
+    rendered: int = 0
+    # 描画済みのため描画しなかったデバイス数
+    unchanged: int = 0
+    # 描画エラー回数
+    errors: int = 0
+
+
+class TodayImagePrerenderer:
+    def __init__(self, max_phone_sizes: int = 2, max_tracked_sizes: int = 32,
+                 decay_seconds: float = 3600.0, logger: Optional[logging.Logger] = None):
+        """
+        :param max_phone_sizes: 描画するスマホの表示領域サイズの数 (使用回数の多い順)
+        :param max_tracked_sizes: 使用回数を記録する表示領域サイズの数の上限
+        :param decay_seconds: 使用回数を半減する間隔(秒)
+        :param logger: app_logger
+        """
+        self.max_phone_sizes: int = max_phone_sizes
+        self.max_tracked_sizes: int = max(max_tracked_sizes, max_phone_sizes)
+        self.decay_seconds: float = decay_seconds
+        self.logger: Optional[logging.Logger] = logger
+        self._lock: threading.Lock = threading.Lock()
+        self._phone_sizes: Counter = Counter()
+        self._last_decay: float = time.monotonic()
+        self._stats: PrerenderStats = PrerenderStats()
+        self._stop_event: threading.Event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record_phone_size(self, image_size: str) -> None:
+        """
+        スマホからのリクエストの表示領域サイズを記録する
+        :param image_size: 表示領域サイズ情報 (幅x高さx密度) ※正規化済み
+        """
+        with self._lock:
+            if image_size not in self._phone_sizes and \
+                    len(self._phone_sizes) >= self.max_tracked_sizes:
+                # 上限に達している場合は新しいサイズを記録しない ※次回の半減で空きができる
+                return
+            self._phone_sizes[image_size] += 1
+
+    def _decay_phone_sizes(self, now: float) -> None:
+        """
+        半減間隔が経過していれば使用回数を半減し, 0回になった表示領域サイズを破棄する
+        ※最近の使用回数を優先する
+        :param now: 現在時刻 (time.monotonic())
+        """
+        with self._lock:
+            if now - self._last_decay < self.decay_seconds:
+                return
+            self._last_decay = now
+            self._phone_sizes = Counter({
+                size: count // 2 for size, count in self._phone_sizes.items() if count > 1
+            })
+
+    def image_sizes(self) -> List[str]:
+        """
+        描画する画像サイズリストを取得する
+        :return: PC(空文字)と使用回数の多いスマホの表示領域サイズ
+        """
+        with self._lock:
+            common: List[str] = [
+                size for size, _ in self._phone_sizes.most_common(self.max_phone_sizes)
+            ]
+        return [PC_IMAGE_SIZE] + common
+
+    def run(self, conn: Optional[connection], device_ids: Iterable[int],
+            prerender: Callable[[Optional[connection], int, List[str]], int]) -> int:
+        """
+        全デバイスの当日画像を描画する
+        :param conn: psycopg2 connection
+        :param device_ids: デバイスIDリスト
+        :param prerender: デバイスの当日画像の描画関数 ※引数はコネクション, デバイスID, 画像サイズリスト
+            戻り値は描画した画像の数 (描画済み・レコードなしは 0)
+        :return: 描画した画像の数
+        """
+        image_sizes: List[str] = self.image_sizes()
+        self._decay_phone_sizes(time.monotonic())
+        total: int = 0
+        for device_id in device_ids:
+            try:
+                rendered: int = prerender(conn, device_id, image_sizes)
+            except Exception as err:
+                # 他のデバイスは描画する ※次回の確認で再試行する
+                with self._lock:
+                    self._stats.errors += 1
+                if self.logger is not None:
+                    self.logger.warning(f"TodayImagePrerenderer device_id={device_id}: {err}")
+                continue
+
+            with self._lock:
+                if rendered > 0:
+                    self._stats.rendered += rendered
+                else:
+                    self._stats.unchanged += 1
+            total += rendered
+        with self._lock:
+            self._stats.runs += 1
+        return total
+
+    def start(self, get_conn: Callable[[], connection],
+              put_conn: Callable[[connection], None],
+              get_device_ids: Callable[[connection], List[int]],
+              prerender: Callable[[Optional[connection], int, List[str]], int],
+              interval_seconds: float) -> None:
+        """
+        定期描画スレッドを開始する
+        :param get_conn: コネクション取得関数
+        :param put_conn: コネクション返却関数
+        :param get_device_ids: 対象デバイスIDリスト取得関数 ※引数は取得済みのコネクション
+        :param prerender: デバイスの当日画像の描画関数 ※run()と同じ
+        :param interval_seconds: 確認間隔(秒)
+        """
+        def loop() -> None:
+            while not self._stop_event.wait(interval_seconds):
+                try:
+                    conn: connection = get_conn()
+                    try:
+                        self.run(conn, get_device_ids(conn), prerender)
+                    finally:
+                        put_conn(conn)
+                except Exception as err:
+                    # 次回の確認で再試行する
+                    with self._lock:
+                        self._stats.errors += 1
+                    if self.logger is not None:
+                        self.logger.warning(f"TodayImagePrerenderer: {err}")
+
+        self._thread = threading.Thread(target=loop, name="TodayImagePrerenderer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """ 定期描画スレッドを停止する """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def get_stats(self) -> Dict:
+        """
+        統計情報を取得する
+        :return: 統計情報の辞書 ※描画する画像サイズリスト(image_sizes)を含む
+        """
+        with self._lock:
+            result: Dict = asdict(self._stats)
+        result["image_sizes"] = self.image_sizes()
+        return result
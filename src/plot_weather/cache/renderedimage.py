@@ -0,0 +1,154 @@
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+"""
+描画済みグラフ画像(PNG)のキャッシュ
+[仕様]
+ (1) キーは (画像種別, デバイスID, 日付パラメータ, 画像サイズ) ※画像サイズはスマホの表示領域サイズ, ブラウザは空文字
+ (2) 値は描画時のデータの版(ウォーターマーク)とPNGのバイト列
+     ウォーターマークは描画したDataFrameの (最終測定時刻, 件数) ※前年比較は両年のDataFrameの組
+     ウォーターマークが一致すれば再描画しない, 一致しなければ再描画して置き換える
+ (3) 有効期限なし ※確定済み年月はウォーターマークが変わらないためLRUで破棄されるまで保持する
+ (4) PNGのバイト数の合計が上限を超えたら最も古く参照されたものから破棄する (LRU)
+"""
+
+# キャッシュキー: (画像種別, デバイスID, 日付パラメータ, 画像サイズ)
+RenderedImageKey = Tuple[str, int, str, str]
+# データの版: DataFrameごとの (最終測定時刻(ナノ秒), 件数)
+Watermark = Tuple[int, ...]
+
+
+@dataclass
+class RenderedImageStats:
+    """ 描画済み画像キャッシュの統計情報 """
+    # キャッシュから返却した回数
+    hits: int = 0
+    # キャッシュになく描画した回数
+    misses: int = 0
+    # 観測データの追加により再描画した回数 (missesの内数)
+    stale: int = 0
+    # メモリ上限超過で破棄した件数
+    evictions: int = 0
+
+
+def frameWatermark(*frames: pd.DataFrame) -> Watermark:
+    """
+    描画するDataFrameのウォーターマークを取得する
+    :param frames: 測定時刻をインデックスとする昇順のDataFrame ※1件以上
+    :return: DataFrameごとの (最終測定時刻(ナノ秒), 件数) を連結したタプル
+    """
+    result: Tuple[int, ...] = ()
+    for df in frames:
+        result += (int(df.index[-1].value), int(df.shape[0]))
+    return result
+
+
+class RenderedImageCache:
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024,
+                 logger: Optional[logging.Logger] = None):
+        """
+        :param max_bytes: キャッシュするPNGのバイト数の上限 ※0以下ならキャッシュしない
+        :param logger: app_logger
+        """
+        self.max_bytes: int = max_bytes
+        self.logger: Optional[logging.Logger] = logger
+        self._lock: threading.Lock = threading.Lock()
+        # 参照順 (末尾が最新)
+        self._entries: "OrderedDict[RenderedImageKey, Tuple[Watermark, bytes]]" = OrderedDict()
+        self._total_bytes: int = 0
+        self._stats: RenderedImageStats = RenderedImageStats()
+
+    def get_or_render(self, kind: str, device_id: int, params: str, image_size: str,
+                      watermark: Watermark, render: Callable[[], bytes]) -> bytes:
+        """
+        描画済みの画像をキャッシュから取得する ※キャッシュにないかデータが追加されていれば描画する
+        :param kind: 画像種別
+        :param device_id: デバイスID
+        :param params: 日付パラメータ
+        :param image_size: 画像サイズ ※ブラウザは空文字
+        :param watermark: 描画するデータのウォーターマーク
+        :param render: PNGの描画関数
+        :return: PNGのバイト列
+        """
+        if self.max_bytes <= 0:
+            return render()
+
+        key: RenderedImageKey = (kind, device_id, params, image_size)
+        with self._lock:
+            entry: Optional[Tuple[Watermark, bytes]] = self._entries.get(key)
+            if entry is not None and entry[0] == watermark:
+                self._entries.move_to_end(key)
+                self._stats.hits += 1
+                return entry[1]
+
+            self._stats.misses += 1
+            if entry is not None:
+                self._stats.stale += 1
+        png: bytes = render()
+        self._put(key, watermark, png)
+        return png
+
+    def contains(self, kind: str, device_id: int, params: str, image_size: str,
+                 watermark: Watermark) -> bool:
+        """
+        描画済みかチェックする ※統計情報・参照順は変更しない
+        :return: 同じウォーターマークの画像がキャッシュにあれば True
+        """
+        with self._lock:
+            entry: Optional[Tuple[Watermark, bytes]] = self._entries.get(
+                (kind, device_id, params, image_size))
+        return entry is not None and entry[0] == watermark
+
+    def _put(self, key: RenderedImageKey, watermark: Watermark, png: bytes) -> None:
+        size: int = len(png)
+        if size > self.max_bytes:
+            if self.logger is not None:
+                self.logger.info(f"RenderedImageCache: {key} too large ({size} bytes)")
+            return
+
+        with self._lock:
+            prev: Optional[Tuple[Watermark, bytes]] = self._entries.pop(key, None)
+            if prev is not None:
+                if prev[0] > watermark:
+                    # 同時に描画された場合は新しいデータの画像を残す
+                    self._entries[key] = prev
+                    return
+                self._total_bytes -= len(prev[1])
+            self._entries[key] = (watermark, png)
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes:
+                evicted_key: RenderedImageKey
+                evicted: Tuple[Watermark, bytes]
+                evicted_key, evicted = self._entries.popitem(last=False)
+                self._total_bytes -= len(evicted[1])
+                self._stats.evictions += 1
+                if self.logger is not None:
+                    self.logger.debug(f"RenderedImageCache evicted: {evicted_key}")
+
+    def invalidate(self, device_id: Optional[int] = None) -> None:
+        """
+        キャッシュを破棄する
+        :param device_id: デバイスID ※None なら全デバイス
+        """
+        with self._lock:
+            for key in [key for key in self._entries if device_id is None or key[1] == device_id]:
+                self._total_bytes -= len(self._entries.pop(key)[1])
+
+    def get_stats(self) -> Dict:
+        """
+        統計情報を取得する
+        :return: 統計情報の辞書 ※件数(entries), 使用メモリ(bytes), 上限(max_bytes), ヒット率(hit_rate)を含む
+        """
+        with self._lock:
+            result: Dict = asdict(self._stats)
+            result["entries"] = len(self._entries)
+            result["bytes"] = self._total_bytes
+        result["max_bytes"] = self.max_bytes
+        total: int = result["hits"] + result["misses"]
+        result["hit_rate"] = round(result["hits"] / total, 3) if total > 0 else 0.
+        return result
@@ -0,0 +1,285 @@
+import logging
+import threading
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from psycopg2.extensions import connection
+
+from plot_weather.cache.currentframe import epochToDatetime
+from plot_weather.dao.weatherdao import WeatherDao
+from plot_weather.util.date_util import FMT_ISO8601, addDayToString, nextYearMonth
+
+"""
+全デバイスの観測データを保持するインメモリ列ストア
+[仕様]
+ (1) デバイスごとに昇順の測定時刻(int64: エポック秒)と測定値(float32)の配列を保持する
+ (2) 起動時に全期間を読み込み, 以降は定期的に取得済みの最終測定時刻より後のデータのみ追加する
+ (3) 当日・年月・期間の切り出しは測定時刻の二分探索(np.searchsorted)のみ ※データベース参照なし
+ (4) 配列は容量を倍々で確保し, 追加は確保済みの領域の末尾に書き込む
+     ※返却済みの配列(切り出したビュー)の範囲は変更しない
+[前提条件]
+ 観測データは時系列順に追加される ※取得済みの最終測定時刻以前への追加は反映されない
+"""
+
+# 測定時刻カラム (エポック秒)
+COL_TIME: str = "measurement_time"
+# 測定値カラム
+VALUE_COLUMNS: List[str] = ["temp_out", "temp_in", "humid", "pressure"]
+# 配列の初期容量: 約7日分
+_MIN_CAPACITY: int = 1024
+
+
+@dataclass
+class SeriesStoreStats:
+    """ インメモリ列ストアの統計情報 """
+    # 全期間を読み込んだ回数
+    full_loads: int = 0
+    # 差分読み込み回数
+    incremental_loads: int = 0
+    # 差分読み込みで追加したレコード数
+    appended_rows: int = 0
+    # 切り出し回数
+    slices: int = 0
+    # 定期更新のエラー回数
+    refresh_errors: int = 0
+
+
+def dateToEpoch(s_date: str) -> int:
+    """ 日付文字列(ISO8601)の 00:00:00 のエポック秒 ※測定時刻(timestamp)をUTCとみなす """
+    return int(np.datetime64(datetime.strptime(s_date, FMT_ISO8601), "s").astype(np.int64))
+
+
+class _DeviceSeries:
+    """ 1デバイス分の列データ ※更新はストアのロック内のみ """
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        size: int = len(columns[COL_TIME])
+        capacity: int = max(_MIN_CAPACITY, size)
+        self.times: np.ndarray = np.empty(capacity, dtype=np.int64)
+        self.times[:size] = columns[COL_TIME]
+        self.values: Dict[str, np.ndarray] = {}
+        for name in VALUE_COLUMNS:
+            buffer: np.ndarray = np.empty(capacity, dtype=np.float32)
+            buffer[:size] = columns[name]
+            self.values[name] = buffer
+        self.size: int = size
+
+    def append(self, columns: Dict[str, np.ndarray]) -> int:
+        added: int = len(columns[COL_TIME])
+        if added == 0:
+            return 0
+
+        new_size: int = self.size + added
+        if new_size > len(self.times):
+            # 容量不足: 新しい配列に移す ※返却済みのビューは古い配列を参照し続ける
+            capacity: int = max(len(self.times) * 2, new_size)
+            times: np.ndarray = np.empty(capacity, dtype=np.int64)
+            times[:self.size] = self.times[:self.size]
+            self.times = times
+            for name in VALUE_COLUMNS:
+                buffer: np.ndarray = np.empty(capacity, dtype=np.float32)
+                buffer[:self.size] = self.values[name][:self.size]
+                self.values[name] = buffer
+        self.times[self.size:new_size] = columns[COL_TIME]
+        for name in VALUE_COLUMNS:
+            self.values[name][self.size:new_size] = columns[name]
+        self.size = new_size
+        return added
+
+    def nbytes(self) -> int:
+        return self.times.nbytes + sum(buffer.nbytes for buffer in self.values.values())
+
+
+class SeriesStore:
+    def __init__(self, logger: Optional[logging.Logger] = None):
+        """
+        :param logger: app_logger
+        """
+        self.logger: Optional[logging.Logger] = logger
+        self._lock: threading.Lock = threading.Lock()
+        self._series: Dict[int, _DeviceSeries] = {}
+        self._stats: SeriesStoreStats = SeriesStoreStats()
+        self._stop_event: threading.Event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def load(self, conn: connection, device_id: int) -> None:
+        """
+        デバイスの全期間の観測データを読み込む
+        :param conn: psycopg2 connection
+        :param device_id: デバイスID
+        :raise: DatabaseError
+        """
+        dao: WeatherDao = WeatherDao(conn, logger=self.logger)
+        first_day: Optional[str] = dao.getFirstRegisterDay(device_id)
+        columns: Dict[str, np.ndarray]
+        if first_day is None:
+            columns = {COL_TIME: np.empty(0, dtype=np.int64)}
+            columns.update({name: np.empty(0, dtype=np.float32) for name in VALUE_COLUMNS})
+        else:
+            last_day: str = dao.getLastRegisterDay(device_id)
+            columns = dao.getFromToRangeColumns(device_id, first_day, last_day)
+        series: _DeviceSeries = _DeviceSeries(columns)
+        with self._lock:
+            self._series[device_id] = series
+            self._stats.full_loads += 1
+        if self.logger is not None:
+            self.logger.info(f"SeriesStore loaded: device_id={device_id}, rows={series.size}")
+
+    def refresh(self, conn: connection, device_ids: Iterable[int]) -> int:
+        """
+        取得済みの最終測定時刻より後の観測データを追加する ※未読み込みのデバイスは全期間を読み込む
+        :param conn: psycopg2 connection
+        :param device_ids: デバイスIDリスト
+        :return: 追加したレコード数
+        :raise: DatabaseError
+        """
+        dao: WeatherDao = WeatherDao(conn, logger=self.logger)
+        # 開発環境などで測定時刻がシステム日付より先のデータも対象とする
+        exclude_date: str = "9999-12-31"
+        appended: int = 0
+        for device_id in device_ids:
+            with self._lock:
+                series: Optional[_DeviceSeries] = self._series.get(device_id)
+                last_epoch: Optional[int] = int(series.times[series.size - 1]) \
+                    if series is not None and series.size > 0 else None
+            if series is None or last_epoch is None:
+                self.load(conn, device_id)
+                continue
+
+            added: Dict[str, np.ndarray] = dao.getColumnsAfter(
+                device_id, epochToDatetime(last_epoch), exclude_date)
+            with self._lock:
+                added_count: int = series.append(added)
+                self._stats.incremental_loads += 1
+                self._stats.appended_rows += added_count
+            appended += added_count
+        return appended
+
+    def start_refresher(self, get_conn: Callable[[], connection],
+                        put_conn: Callable[[connection], None],
+                        get_device_ids: Callable[[connection], List[int]],
+                        interval_seconds: float) -> None:
+        """
+        定期更新スレッドを開始する
+        :param get_conn: コネクション取得関数
+        :param put_conn: コネクション返却関数
+        :param get_device_ids: 対象デバイスIDリスト取得関数 ※引数は取得済みのコネクション
+            追加されたデバイスは全期間を読み込む
+        :param interval_seconds: 更新間隔(秒)
+        """
+        def run() -> None:
+            while not self._stop_event.wait(interval_seconds):
+                try:
+                    conn: connection = get_conn()
+                    try:
+                        self.refresh(conn, get_device_ids(conn))
+                    finally:
+                        put_conn(conn)
+                except Exception as err:
+                    # 次回の更新で再試行する
+                    with self._lock:
+                        self._stats.refresh_errors += 1
+                    if self.logger is not None:
+                        self.logger.warning(f"SeriesStore refresh: {err}")
+
+        self._thread = threading.Thread(target=run, name="SeriesStoreRefresher", daemon=True)
+        self._thread.start()
+
+    def stop_refresher(self) -> None:
+        """ 定期更新スレッドを停止する """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _snapshot(self, device_id: int) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """ 現時点の列データのビュー ※以降の追加はビューの範囲外に書き込まれる """
+        with self._lock:
+            self._stats.slices += 1
+            series: Optional[_DeviceSeries] = self._series.get(device_id)
+            if series is None:
+                return np.empty(0, dtype=np.int64), {
+                    name: np.empty(0, dtype=np.float32) for name in VALUE_COLUMNS
+                }
+            size: int = series.size
+            return series.times[:size], {
+                name: values[:size] for name, values in series.values.items()
+            }
+
+    def get_range(self, device_id: int, from_date: str, exclude_date: str,
+                  names: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        期間の列データを切り出す
+        :param device_id: デバイスID
+        :param from_date: 開始日(ISO8601) ※この日を含む
+        :param exclude_date: 終了日(ISO8601) ※この日を含まない
+        :param names: 測定値カラム名リスト ※None なら全カラム
+        :return: カラム名とNumPy配列(読み取り専用のビュー)の辞書
+          測定時刻(measurement_time): int64 エポック秒, 測定値: float32 (NULLはNaN)
+          ※未読み込みのデバイス, レコードなしは長さ0の配列
+        """
+        times: np.ndarray
+        values: Dict[str, np.ndarray]
+        times, values = self._snapshot(device_id)
+        start: int = int(np.searchsorted(times, dateToEpoch(from_date), side="left"))
+        stop: int = int(np.searchsorted(times, dateToEpoch(exclude_date), side="left"))
+        result: Dict[str, np.ndarray] = {COL_TIME: times[start:stop]}
+        for name in (names if names is not None else VALUE_COLUMNS):
+            result[name] = values[name][start:stop]
+        return result
+
+    def get_day(self, device_id: int, iso_date: str,
+                names: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        指定日の列データを切り出す ※get_range()と同じ
+        :param iso_date: 日付(ISO8601)
+        """
+        return self.get_range(device_id, iso_date, addDayToString(iso_date), names=names)
+
+    def get_month(self, device_id: int, year_month: str,
+                  names: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        指定年月の列データを切り出す ※get_range()と同じ
+        :param year_month: 年月(%Y-%m)
+        """
+        from_date: str = f"{year_month}-01"
+        return self.get_range(device_id, from_date, nextYearMonth(from_date), names=names)
+
+    def get_last_day(self, device_id: int) -> Optional[str]:
+        """
+        保持している最終測定時刻の日付を取得する
+        :param device_id: デバイスID
+        :return: 最終登録日(ISO8601), レコードなしは None
+        """
+        with self._lock:
+            series: Optional[_DeviceSeries] = self._series.get(device_id)
+            if series is None or series.size == 0:
+                return None
+            last_epoch: int = int(series.times[series.size - 1])
+        return epochToDatetime(last_epoch).strftime(FMT_ISO8601)
+
+    def get_version(self, device_id: int) -> Tuple[int, int]:
+        """
+        保持している列データの版を取得する ※列データを切り出さずに変更有無を判定する
+        :param device_id: デバイスID
+        :return: (最終測定時刻(エポック秒), 件数), レコードなしは (0, 0)
+        """
+        with self._lock:
+            series: Optional[_DeviceSeries] = self._series.get(device_id)
+            if series is None or series.size == 0:
+                return 0, 0
+            return int(series.times[series.size - 1]), series.size
+
+    def get_stats(self) -> Dict:
+        """
+        統計情報を取得する
+        :return: 統計情報の辞書 ※デバイス数(devices), レコード数(rows), 確保済みメモリ(bytes)を含む
+        """
+        with self._lock:
+            result: Dict = asdict(self._stats)
+            result["devices"] = len(self._series)
+            result["rows"] = sum(series.size for series in self._series.values())
+            result["bytes"] = sum(series.nbytes() for series in self._series.values())
+        return result
@@ -5,6 +5,8 @@ from dataclasses import dataclass, asdict
 from psycopg2.extensions import connection, cursor
 from psycopg2 import DatabaseError
 
+from plot_weather.db.prepared import executePrepared
+
 """
 t_deviceテーブルデータ取得クラス
 """
@@ -45,7 +47,7 @@ class DeviceDao(object):
         try:
             cur: cursor
             with self.conn.cursor() as cur:
-                cur.execute(self._QUERY_DEVICES)
+                executePrepared(cur, self._QUERY_DEVICES)
                 rows: List[Tuple[int, str, str]] = cur.fetchall()
                 if self.logger is not None:
                     self.logger.debug(f"rows.size: {len(rows)}")
@@ -67,7 +69,7 @@ class DeviceDao(object):
         try:
             cur: cursor
             with self.conn.cursor() as cur:
-                cur.execute(self._QUERY_EXISTS_DEVICE, {'name': device_name})
+                executePrepared(cur, self._QUERY_EXISTS_DEVICE, {'name': device_name})
                 row: Tuple[int] = cur.fetchone()
                 if self.logger is not None:
                     self.logger.debug(f"row: {row}")
@@ -1,45 +1,129 @@
+import enum
 import logging
-from typing import List, Tuple, Optional, Dict
+import uuid
+from datetime import datetime
+from typing import Iterator, List, Tuple, Optional, Dict, Union
 
+import numpy as np
 from psycopg2.extensions import connection
 
+from plot_weather.db.pgbinary import PG_FLOAT4, PG_INT8, copyToColumns
+from plot_weather.db.prepared import executePrepared
+from plot_weather.dao.weatherrollupdao import (
+    ROLLUP_MEASURES, ROLLUP_STAT_COLUMNS, ROLLUP_TABLES
+)
 from plot_weather.util.date_util import addDayToString, nextYearMonth
 
 """ 気象データDAOクラス """
 
 
+class TimeColumnType(enum.Enum):
+    """ 測定時刻カラムの取得形式 """
+    # 'YYYY-MM-DD HH24:MI'形式の文字列 ※JSONレスポンス用
+    STRING = "to_char(measurement_time,'YYYY-MM-DD HH24:MI')"
+    # timestamp型 ※psycopg2がdatetimeに変換
+    TIMESTAMP = "measurement_time::timestamp"
+    # エポック秒(int) ※DataFrame生成用, サーバー・クライアントともに日付文字列変換なし
+    #  タイムゾーンに依存しないようにローカル時刻(timestamp)のエポック秒とする
+    EPOCH = "EXTRACT(EPOCH FROM measurement_time::timestamp)::BIGINT"
+
+
+# 測定時刻カラムの型
+MeasurementTime = Union[str, datetime, int]
+
+# サーバーサイドカーソルの1回あたりの取得件数 (デフォルト): 約7日分
+DEFAULT_ITERSIZE: int = 1000
+
+# ロールアップデータの取得カラム: 集計単位の開始時刻, 件数, 測定値ごとの集計値
+ROLLUP_COLUMNS: List[str] = ["measurement_time", "rec_count"] + ROLLUP_STAT_COLUMNS
+
+
+def timeColumnExpr(time_type: TimeColumnType, column_name: str) -> str:
+    """
+    測定時刻以外の日時カラムを取得形式に変換するSQL式
+    :param time_type: 取得形式
+    :param column_name: 日時カラム名
+    :return: SQL式
+    """
+    return time_type.value.replace("measurement_time", column_name)
+
+
 class WeatherDao:
     _QUERY_LASTREC: str = """
 SELECT
-  to_char(measurement_time,'YYYY-MM-DD HH24:MI') as measurement_time
+  {time_column} as measurement_time
   , temp_out, temp_in, humid, pressure
 FROM
-  weather.t_weather tw INNER JOIN weather.t_device td ON tw.did = td.id
+  weather.t_weather tw
 WHERE
-  td.name=%(name)s
-  AND
-  measurement_time = (SELECT max(measurement_time) FROM weather.t_weather);
+  tw.did=%(did)s
+-- Latest record only: backward scan of primary key (did, measurement_time)
+ORDER BY measurement_time DESC
+LIMIT 1;
+"""
+
+    # 複数デバイスの最新レコードと最新レコードの日付の外気温の最低・最高
+    #  デバイスごとに主キー(did, measurement_time)の降順スキャンで最新レコードを取得する
+    #  ※DISTINCT ON (did) はテーブル全体をスキャンするため LATERAL を使う
+    #  最低・最高が複数回出現する場合は直近の時刻
+    _QUERY_LASTREC_DEVICES: str = """
+SELECT
+  dev.did
+  , {time_column} as measurement_time
+  , last.temp_out, last.temp_in, last.humid, last.pressure
+  , to_char(date(last.measurement_time), 'YYYY-MM-DD') as find_date
+  , to_char(stat.min_time, 'HH24:MI'), stat.min_temp_out
+  , to_char(stat.max_time, 'HH24:MI'), stat.max_temp_out
+FROM
+  unnest(%(dids)s::INTEGER[]) AS dev(did)
+  CROSS JOIN LATERAL (
+    SELECT
+      measurement_time, temp_out, temp_in, humid, pressure
+    FROM
+      weather.t_weather tw
+    WHERE
+      tw.did = dev.did
+    ORDER BY measurement_time DESC
+    LIMIT 1
+  ) last
+  LEFT JOIN LATERAL (
+    SELECT
+      min(tw.temp_out) AS min_temp_out,
+      (array_agg(tw.measurement_time ORDER BY tw.temp_out, tw.measurement_time DESC))[1]
+        AS min_time,
+      max(tw.temp_out) AS max_temp_out,
+      (array_agg(tw.measurement_time ORDER BY tw.temp_out DESC, tw.measurement_time DESC))[1]
+        AS max_time
+    FROM
+      weather.t_weather tw
+    WHERE
+      tw.did = dev.did
+      AND tw.measurement_time >= date(last.measurement_time)
+      AND tw.measurement_time < date(last.measurement_time) + 1
+      AND tw.temp_out IS NOT NULL
+  ) stat ON true
+ORDER BY dev.did;
 """
 
     _QUERY_GROUPBY_MONTHS: str = """
 SELECT
   to_char(measurement_time, 'YYYY-MM') as groupby_months
 FROM
-  weather.t_weather tw INNER JOIN weather.t_device td ON tw.did = td.id
+  weather.t_weather tw
 WHERE
-  td.name=%(name)s
+  tw.did=%(did)s
   GROUP BY to_char(measurement_time, 'YYYY-MM')
   ORDER BY to_char(measurement_time, 'YYYY-MM') DESC;
 """
 
     _QUERY_RANGE_DATA: str = """
 SELECT
-   to_char(measurement_time,'YYYY-MM-DD HH24:MI') as measurement_time,
+   {time_column} as measurement_time,
    temp_out, temp_in, humid, pressure
 FROM
-  weather.t_weather tw INNER JOIN weather.t_device td ON tw.did = td.id
+  weather.t_weather tw
 WHERE
-   td.name=%(name)s
+   tw.did=%(did)s
    AND (
      measurement_time >= to_timestamp(%(from_date)s, 'YYYY-MM-DD HH24::MI:SS')
      AND
@@ -48,13 +132,71 @@ WHERE
 ORDER BY measurement_time;
 """
 
+    # 指定期間の件数 ※_QUERY_RANGE_DATA と同じ条件
+    _QUERY_RANGE_COUNT: str = """
+SELECT
+   count(*)
+FROM
+  weather.t_weather tw
+WHERE
+   tw.did=%(did)s
+   AND (
+     measurement_time >= to_timestamp(%(from_date)s, 'YYYY-MM-DD HH24:MI:SS')
+     AND
+     measurement_time < to_timestamp(%(exclude_to_date)s, 'YYYY-MM-DD HH24:MI:SS')
+   );
+"""
+
+    # COPY BINARYによる一括取得用 ※固定長にするためNULLはNaNに置き換える
+    _SELECT_RANGE_COLUMNS: str = """
+SELECT
+   {time_column} as measurement_time,
+   COALESCE(temp_out, 'NaN')::REAL as temp_out,
+   COALESCE(temp_in, 'NaN')::REAL as temp_in,
+   COALESCE(humid, 'NaN')::REAL as humid,
+   COALESCE(pressure, 'NaN')::REAL as pressure
+FROM
+  weather.t_weather tw
+WHERE
+   tw.did=%(did)s
+   AND (
+     measurement_time >= to_timestamp(%(from_date)s, 'YYYY-MM-DD HH24::MI:SS')
+     AND
+     measurement_time < to_timestamp(%(exclude_to_date)s, 'YYYY-MM-DD HH24:MI:SS')
+   )
+ORDER BY measurement_time
+""".format(time_column=TimeColumnType.EPOCH.value)
+    # 測定時刻(int8: エポック秒), 測定値(float4)
+    _RANGE_COLUMNS_FIELDS: List[Tuple[str, str]] = [
+        ("measurement_time", PG_INT8),
+        ("temp_out", PG_FLOAT4), ("temp_in", PG_FLOAT4),
+        ("humid", PG_FLOAT4), ("pressure", PG_FLOAT4)
+    ]
+
+    # 指定時刻より後の観測データ (差分取得用) ※測定時刻はエポック秒
+    _QUERY_AFTER_DATA: str = """
+SELECT
+   {time_column} as measurement_time,
+   temp_out, temp_in, humid, pressure
+FROM
+  weather.t_weather tw
+WHERE
+   tw.did=%(did)s
+   AND (
+     measurement_time > %(after_time)s
+     AND
+     measurement_time < to_timestamp(%(exclude_to_date)s, 'YYYY-MM-DD HH24:MI:SS')
+   )
+ORDER BY measurement_time;
+""".format(time_column=TimeColumnType.EPOCH.value)
+
     _QUERY_FIRST_DATE_WITH_DEVICE: str = """
 SELECT
    to_char(min(measurement_time), 'YYYY-MM-DD') as min_measurement_day
 FROM 
-  weather.t_weather tw INNER JOIN weather.t_device td ON tw.did = td.id
+  weather.t_weather tw
 WHERE
-   td.name=%(name)s;
+   tw.did=%(did)s;
 """
 
     _QUERY_PREV_YEAR_MONTH_LIST: str = """
@@ -62,9 +204,9 @@ WITH t_year_month AS(
   SELECT
     did ,to_char(measurement_time, 'YYYYMM') AS year_month
   FROM
-    weather.t_weather tw INNER JOIN weather.t_device td ON tw.did = td.id
+    weather.t_weather tw
   WHERE
-    td.name=%(name)s  
+    tw.did=%(did)s  
   GROUP BY did,year_month
 )
 SELECT
@@ -81,46 +223,147 @@ ORDER BY latest_year_month DESC;
 SELECT
    to_char(max(measurement_time), 'YYYY-MM-DD') as min_measurement_day
 FROM 
-  weather.t_weather tw INNER JOIN weather.t_device td ON tw.did = td.id
+  weather.t_weather tw
+WHERE
+   tw.did=%(did)s;
+"""
+
+    # 指定年月以降のデータが存在する年月リスト
+    #  主キー(did, measurement_time)で翌月以降の最初のレコードへ順に移動する (月数回のインデックス参照)
+    _QUERY_YEAR_MONTHS_FROM: str = """
+WITH RECURSIVE months(month_start) AS (
+  SELECT
+    date_trunc('month', min(measurement_time))
+  FROM
+    weather.t_weather
+  WHERE
+    did=%(did)s
+    AND measurement_time >= to_timestamp(%(from_date)s, 'YYYY-MM-DD')
+  UNION ALL
+  SELECT (
+    SELECT
+      date_trunc('month', min(measurement_time))
+    FROM
+      weather.t_weather
+    WHERE
+      did=%(did)s
+      AND measurement_time >= months.month_start + interval '1 month'
+  )
+  FROM months
+  WHERE months.month_start IS NOT NULL
+)
+SELECT
+  to_char(month_start, 'YYYY-MM') as year_month
+FROM
+  months
 WHERE
-   td.name=%(name)s;
+  month_start IS NOT NULL
+ORDER BY month_start;
 """
 
-    def __init__(self, conn: connection, logger: Optional[logging.Logger] = None):
+    # 時間別・日別集計データ ※集計時刻(出現時刻)カラムは取得形式に変換する
+    _QUERY_ROLLUP_DATA: str = """
+SELECT
+   {time_column} as measurement_time,
+   rec_count,
+   {stat_columns}
+FROM
+  {table_name}
+WHERE
+   did=%(did)s
+   AND (
+     measurement_time >= to_timestamp(%(from_date)s, 'YYYY-MM-DD HH24:MI:SS')
+     AND
+     measurement_time < to_timestamp(%(exclude_to_date)s, 'YYYY-MM-DD HH24:MI:SS')
+   )
+ORDER BY measurement_time;
+"""
+
+    def __init__(self, conn: connection, logger: Optional[logging.Logger] = None,
+                 time_type: TimeColumnType = TimeColumnType.STRING):
+        """
+        :param conn: psycopg2 connection
+        :param logger: app_logger
+        :param time_type: 測定時刻カラムの取得形式 (デフォルト: 文字列)
+        """
         self.conn: connection = conn
         self.logger: Optional[logging.Logger] = logger
         self.logger_debug: bool = False
         if self.logger is not None:
             self.logger_debug = (self.logger.getEffectiveLevel() <= logging.DEBUG)
+        self.time_type: TimeColumnType = time_type
+        # 測定時刻カラムを取得形式に置き換えたクエリー
+        self._query_lastrec: str = self._QUERY_LASTREC.format(time_column=time_type.value)
+        self._query_range_data: str = self._QUERY_RANGE_DATA.format(
+            time_column=time_type.value
+        )
+        self._query_lastrec_devices: str = self._QUERY_LASTREC_DEVICES.format(
+            time_column=timeColumnExpr(time_type, "last.measurement_time")
+        )
+        stat_columns: List[str] = []
+        for measure in ROLLUP_MEASURES:
+            stat_columns.extend([
+                f"{measure}_min",
+                f"{timeColumnExpr(time_type, f'{measure}_min_time')} as {measure}_min_time",
+                f"{measure}_max",
+                f"{timeColumnExpr(time_type, f'{measure}_max_time')} as {measure}_max_time",
+                f"{measure}_avg"
+            ])
+        self._query_rollup_data: Dict[str, str] = {
+            unit: self._QUERY_ROLLUP_DATA.format(
+                time_column=time_type.value, table_name=table_name,
+                stat_columns=",\n   ".join(stat_columns)
+            )
+            for unit, table_name in ROLLUP_TABLES.items()
+        }
 
     def getLastData(self,
-                    device_name: str
-                    ) -> Optional[Tuple[str, float, float, float, float]]:
+                    device_id: int
+                    ) -> Optional[Tuple[MeasurementTime, float, float, float, float]]:
         """観測デバイスの最終レコードを取得する
-        :param device_name: 観測デバイス名
+        :param device_id: 観測デバイスID
         :return
           tuple: (measurement_time, temp_out, temp_in, humid, pressure)
-          ただし観測デバイス名に対応するレコードがない場合は None
+          ただし観測デバイスIDに対応するレコードがない場合は None
         """
         with self.conn.cursor() as cursor:
-            cursor.execute(self._QUERY_LASTREC, {'name': device_name})
-            row: Optional[Tuple[str, float, float, float, float]] = cursor.fetchone()
+            executePrepared(cursor, self._query_lastrec, {'did': device_id})
+            row: Optional[Tuple[MeasurementTime, float, float, float, float]] = cursor.fetchone()
             if self.logger is not None and self.logger_debug:
                 self.logger.debug("row: {}".format(row))
 
         return row
 
-    def getGroupByMonths(self, device_name: str) -> List[str]:
+    def getLastDataList(self, device_ids: List[int]) -> List[Tuple]:
+        """複数の観測デバイスの最終レコードと最終レコードの日付の外気温の最低・最高を取得する
+        ※1回のクエリーで取得する
+        :param device_ids: 観測デバイスIDリスト
+        :return
+          list: [(did, measurement_time, temp_out, temp_in, humid, pressure,
+                  find_date, min_appear_time, min_temp_out, max_appear_time, max_temp_out), ...]
+          観測デバイスID順, ただしレコードがない観測デバイスは含まない
+        """
+        if len(device_ids) == 0:
+            return []
+
+        with self.conn.cursor() as cursor:
+            executePrepared(cursor, self._query_lastrec_devices, {'dids': device_ids})
+            rows: List[Tuple] = cursor.fetchall()
+            if self.logger is not None and self.logger_debug:
+                self.logger.debug("rows: {}".format(rows))
+        return rows
+
+    def getGroupByMonths(self, device_id: int) -> List[str]:
         """観測デバイスのグルーピングSQLに対応した日付リストを取得する
-        :param device_name: 観測デバイス名
+        :param device_id: 観測デバイスID
         :return list: レコードが存在する場合は年月リスト、存在しない場合は空のリスト
         """
         if self.logger is not None and self.logger_debug:
-            self.logger.debug(f"device: {device_name}")
+            self.logger.debug(f"device: {device_id}")
 
-        params: Dict[str, str] = {'name': device_name}
+        params: Dict[str, str] = {'did': device_id}
         with self.conn.cursor() as cursor:
-            cursor.execute(self._QUERY_GROUPBY_MONTHS, params)
+            executePrepared(cursor, self._QUERY_GROUPBY_MONTHS, params)
             # fetchall() return tuple list [(?,), (?,), ..., (?,)]
             tuple_list: List[Tuple[str]] = cursor.fetchall()
             if self.logger is not None and self.logger_debug:
@@ -132,19 +375,35 @@ WHERE
                 result = []
         return result
 
+    def getYearMonthsFrom(self, device_id: int, from_year_month: Optional[str] = None) -> List[str]:
+        """観測デバイスの指定年月以降のデータが存在する年月リストを取得する
+        ※getGroupByMonths()と異なりテーブル全体を集計しない
+        :param device_id: 観測デバイスID
+        :param from_year_month: 検索開始年月(%Y-%m) ※None なら全期間
+        :return list: 昇順の年月リスト(%Y-%m), 存在しない場合は空のリスト
+        """
+        from_date: str = f"{from_year_month}-01" if from_year_month is not None else "1970-01-01"
+        params: Dict = {"did": device_id, "from_date": from_date}
+        with self.conn.cursor() as cursor:
+            executePrepared(cursor, self._QUERY_YEAR_MONTHS_FROM, params)
+            tuple_list: List[Tuple[str]] = cursor.fetchall()
+            if self.logger is not None and self.logger_debug:
+                self.logger.debug("tuple_list: {}".format(tuple_list))
+        return [item for (item,) in tuple_list]
+
     def getTodayData(self,
-                     device_name: str, today_iso8601: str
-                     ) -> List[Tuple[str, float, float, float, float]]:
+                     device_id: int, today_iso8601: str
+                     ) -> List[Tuple[MeasurementTime, float, float, float, float]]:
         if self.logger is not None and self.logger_debug:
-            self.logger.debug(f"device_name: {device_name}, today: {today_iso8601}")
+            self.logger.debug(f"device_id: {device_id}, today: {today_iso8601}")
 
         exclude_date: str = addDayToString(today_iso8601)
         params: Dict = {
-            "name": device_name, "from_date": today_iso8601, "exclude_to_date": exclude_date
+            "did": device_id, "from_date": today_iso8601, "exclude_to_date": exclude_date
         }
-        result: List[Tuple[str, float, float, float, float]]
+        result: List[Tuple[MeasurementTime, float, float, float, float]]
         with self.conn.cursor() as cursor:
-            cursor.execute(self._QUERY_RANGE_DATA, params)
+            executePrepared(cursor, self._query_range_data, params)
             tuple_list = cursor.fetchall()
             rec_count: int = len(tuple_list)
             if self.logger is not None and self.logger_debug:
@@ -156,20 +415,20 @@ WHERE
         return result
 
     def getMonthData(self,
-                     device_name: str, year_month: str
-                     ) -> List[Tuple[str, float, float, float, float]]:
+                     device_id: int, year_month: str
+                     ) -> List[Tuple[MeasurementTime, float, float, float, float]]:
         from_date: str = year_month + "-01"
         exclude_date: str = nextYearMonth(from_date)
         if self.logger is not None and self.logger_debug:
             self.logger.debug(
-                f"device_name: {device_name}, from: {from_date}, to_date: {exclude_date}"
+                f"device_id: {device_id}, from: {from_date}, to_date: {exclude_date}"
             )
         params: Dict = {
-            "name": device_name, "from_date": from_date, "exclude_to_date": exclude_date
+            "did": device_id, "from_date": from_date, "exclude_to_date": exclude_date
         }
-        result: List[Tuple[str, float, float, float, float]]
+        result: List[Tuple[MeasurementTime, float, float, float, float]]
         with self.conn.cursor() as cursor:
-            cursor.execute(self._QUERY_RANGE_DATA, params)
+            executePrepared(cursor, self._query_range_data, params)
             tuple_list = cursor.fetchall()
             rec_count: int = len(tuple_list)
             if self.logger is not None and self.logger_debug:
@@ -181,21 +440,21 @@ WHERE
         return result
 
     def getFromToRangeData(self,
-                           device_name: str,
+                           device_id: int,
                            from_date: str,
                            to_date: str,
-                           ) -> List[Tuple[str, float, float, float, float]]:
+                           ) -> List[Tuple[MeasurementTime, float, float, float, float]]:
         exclude_date: str = addDayToString(to_date)
         if self.logger is not None and self.logger_debug:
             self.logger.debug(
-                f"device_name: {device_name}, from: {from_date}, to_date: {exclude_date}"
+                f"device_id: {device_id}, from: {from_date}, to_date: {exclude_date}"
             )
         params: Dict = {
-            "name": device_name, "from_date": from_date, "exclude_to_date": exclude_date
+            "did": device_id, "from_date": from_date, "exclude_to_date": exclude_date
         }
-        result: List[Tuple[str, float, float, float, float]]
+        result: List[Tuple[MeasurementTime, float, float, float, float]]
         with self.conn.cursor() as cursor:
-            cursor.execute(self._QUERY_RANGE_DATA, params)
+            executePrepared(cursor, self._query_range_data, params)
             tuple_list = cursor.fetchall()
             rec_count: int = len(tuple_list)
             if self.logger is not None and self.logger_debug:
@@ -206,13 +465,195 @@ WHERE
                 result = [rec for rec in tuple_list]
         return result
 
-    def getFirstRegisterDay(self, device_name: str) -> Optional[str]:
+    def getMonthColumns(self, device_id: int, year_month: str) -> Dict[str, np.ndarray]:
+        """指定年月の観測データを COPY BINARY で一括取得する
+        :param device_id: 観測デバイスID
+        :param year_month: 検索年月
+        :return: カラム名とNumPy配列の辞書
+          測定時刻(measurement_time): int64 エポック秒, 測定値: float32 (NULLはNaN)
+        """
+        from_date: str = year_month + "-01"
+        exclude_date: str = nextYearMonth(from_date)
+        return self._getRangeColumns(device_id, from_date, exclude_date)
+
+    def getFromToRangeColumns(self,
+                              device_id: int,
+                              from_date: str,
+                              to_date: str,
+                              ) -> Dict[str, np.ndarray]:
+        """指定期間の観測データを COPY BINARY で一括取得する
+        :param device_id: 観測デバイスID
+        :param from_date: 検索開始日
+        :param to_date: 検索終了日 ※終了日を含む
+        :return: カラム名とNumPy配列の辞書 ※getMonthColumns()と同じ
+        """
+        exclude_date: str = addDayToString(to_date)
+        return self._getRangeColumns(device_id, from_date, exclude_date)
+
+    def getColumnsAfter(self,
+                        device_id: int, after_time: datetime, exclude_to_date: str
+                        ) -> Dict[str, np.ndarray]:
+        """
+        指定時刻より後の観測データを列データで取得する ※追加分のみの差分取得用
+        :param device_id: 観測デバイスID
+        :param after_time: 取得済みの最終測定時刻 ※この時刻を含まない
+        :param exclude_to_date: 検索終了日(この日を含まない) ※ISO8601形式文字列
+        :return: カラム名とNumPy配列の辞書
+          測定時刻(measurement_time): int64 エポック秒, 測定値: float32 (NULLはNaN)
+        """
+        if self.logger is not None and self.logger_debug:
+            self.logger.debug(
+                f"device_id: {device_id}, after: {after_time}, to_date: {exclude_to_date}"
+            )
+        params: Dict = {
+            "did": device_id, "after_time": after_time, "exclude_to_date": exclude_to_date
+        }
+        with self.conn.cursor() as cursor:
+            executePrepared(cursor, self._QUERY_AFTER_DATA, params)
+            tuple_list: List[Tuple] = cursor.fetchall()
+        if self.logger is not None and self.logger_debug:
+            self.logger.debug(f"tuple_list.size {len(tuple_list)}")
+        # 行データを列データに転置する ※NULL(None)は NaN
+        col_values: List[Tuple] = list(zip(*tuple_list))
+        result: Dict[str, np.ndarray] = {}
+        for idx, (name, pg_type) in enumerate(self._RANGE_COLUMNS_FIELDS):
+            dtype = np.int64 if pg_type == PG_INT8 else np.float32
+            values: Tuple = col_values[idx] if len(col_values) > 0 else ()
+            result[name] = np.array(values, dtype=dtype)
+        return result
+
+    def _getRangeColumns(self,
+                         device_id: int, from_date: str, exclude_date: str
+                         ) -> Dict[str, np.ndarray]:
+        if self.logger is not None and self.logger_debug:
+            self.logger.debug(
+                f"device_id: {device_id}, from: {from_date}, to_date: {exclude_date}"
+            )
+        params: Dict = {
+            "did": device_id, "from_date": from_date, "exclude_to_date": exclude_date
+        }
+        result: Dict[str, np.ndarray] = copyToColumns(
+            self.conn, self._SELECT_RANGE_COLUMNS, params, self._RANGE_COLUMNS_FIELDS
+        )
+        if self.logger is not None and self.logger_debug:
+            self.logger.debug(f"rec_count: {len(result['measurement_time'])}")
+        return result
+
+    def getFromToRangeCount(self, device_id: int, from_date: str, to_date: str) -> int:
+        """指定期間の観測データの件数を取得する ※iterFromToRangeData()の格納先の事前確保用
+        :param device_id: 観測デバイスID
+        :param from_date: 検索開始日
+        :param to_date: 検索終了日 ※終了日を含む
+        :return: 件数
+        """
+        params: Dict = {
+            "did": device_id, "from_date": from_date, "exclude_to_date": addDayToString(to_date)
+        }
+        with self.conn.cursor() as cursor:
+            executePrepared(cursor, self._QUERY_RANGE_COUNT, params)
+            row: Tuple[int] = cursor.fetchone()
+        if self.logger is not None and self.logger_debug:
+            self.logger.debug(f"rec_count: {row[0]}")
+        return int(row[0])
+
+    def iterFromToRangeData(self,
+                            device_id: int,
+                            from_date: str,
+                            to_date: str,
+                            itersize: int = DEFAULT_ITERSIZE
+                            ) -> Iterator[Dict[str, np.ndarray]]:
+        """指定期間の観測データをサーバーサイドカーソルで itersize 件ずつ取得する
+        ※取得データは事前に確保した配列に格納するため、メモリ使用量は期間ではなく itersize で決まる
+        :param device_id: 観測デバイスID
+        :param from_date: 検索開始日
+        :param to_date: 検索終了日 ※終了日を含む
+        :param itersize: 1回あたりの取得件数
+        :return: カラム名とNumPy配列(取得件数分のビュー)の辞書のイテレータ
+          測定時刻(measurement_time): int64 エポック秒, 測定値: float32 (NULLはNaN)
+          ※配列は次の取得で上書きされるため、保持する場合は呼び出し側でコピーすること
+        """
+        exclude_date: str = addDayToString(to_date)
+        if self.logger is not None and self.logger_debug:
+            self.logger.debug(
+                f"device_id: {device_id}, from: {from_date}, to_date: {exclude_date},"
+                f" itersize: {itersize}"
+            )
+        params: Dict = {
+            "did": device_id, "from_date": from_date, "exclude_to_date": exclude_date
+        }
+        # 取得用の配列を事前に確保する
+        staging: np.ndarray = np.empty((itersize, 5), dtype=np.float64)
+        times: np.ndarray = np.empty(itersize, dtype=np.int64)
+        values: Dict[str, np.ndarray] = {
+            name: np.empty(itersize, dtype=np.float32)
+            for name in ["temp_out", "temp_in", "humid", "pressure"]
+        }
+        query: str = self._QUERY_RANGE_DATA.format(time_column=TimeColumnType.EPOCH.value)
+        # autocommitモードで名前付きカーソルを使う場合は WITH HOLD が必要
+        cursor_name: str = f"weather_range_{uuid.uuid4().hex}"
+        with self.conn.cursor(name=cursor_name, withhold=True) as cursor:
+            cursor.itersize = itersize
+            cursor.execute(query, params)
+            while True:
+                rows: List[Tuple[int, float, float, float, float]] = cursor.fetchmany(itersize)
+                rec_count: int = len(rows)
+                if rec_count == 0:
+                    break
+
+                if self.logger is not None and self.logger_debug:
+                    self.logger.debug(f"fetch size: {rec_count}")
+                # タプルのリストを一括で配列に格納 ※NULL(None)は NaN
+                staging[:rec_count] = rows
+                times[:rec_count] = staging[:rec_count, 0]
+                chunk: Dict[str, np.ndarray] = {"measurement_time": times[:rec_count]}
+                for col_idx, (name, col_values) in enumerate(values.items(), start=1):
+                    col_values[:rec_count] = staging[:rec_count, col_idx]
+                    chunk[name] = col_values[:rec_count]
+                yield chunk
+
+    def getHourlyRollupData(self, device_id: int, from_date: str, to_date: str) -> List[Tuple]:
+        """観測デバイスの指定期間の時間別集計データを取得する
+        :param device_id: 観測デバイスID
+        :param from_date: 検索開始日
+        :param to_date: 検索終了日 ※終了日を含む
+        :return: 集計時刻の昇順のタプルのリスト ※カラムは ROLLUP_COLUMNS の順
+        """
+        return self._getRollupData("hour", device_id, from_date, to_date)
+
+    def getDailyRollupData(self, device_id: int, from_date: str, to_date: str) -> List[Tuple]:
+        """観測デバイスの指定期間の日別集計データを取得する
+        :param device_id: 観測デバイスID
+        :param from_date: 検索開始日
+        :param to_date: 検索終了日 ※終了日を含む
+        :return: 集計日の昇順のタプルのリスト ※カラムは ROLLUP_COLUMNS の順
+        """
+        return self._getRollupData("day", device_id, from_date, to_date)
+
+    def _getRollupData(self,
+                       unit: str, device_id: int, from_date: str, to_date: str
+                       ) -> List[Tuple]:
+        exclude_date: str = addDayToString(to_date)
+        if self.logger is not None and self.logger_debug:
+            self.logger.debug(
+                f"unit: {unit}, device_id: {device_id}, from: {from_date}, to_date: {exclude_date}"
+            )
+        params: Dict = {
+            "did": device_id, "from_date": from_date, "exclude_to_date": exclude_date
+        }
+        with self.conn.cursor() as cursor:
+            executePrepared(cursor, self._query_rollup_data[unit], params)
+            tuple_list: List[Tuple] = cursor.fetchall()
+            if self.logger is not None and self.logger_debug:
+                self.logger.debug(f"tuple_list.size {len(tuple_list)}")
+        return tuple_list
+
+    def getFirstRegisterDay(self, device_id: int) -> Optional[str]:
         """観測デバイスの初回登録日を取得する
-        :param device_name: 観測デバイス名
+        :param device_id: 観測デバイスID
         :return 存在する場合は初回登録日, 存在しない場合はNone
         """
         with self.conn.cursor() as cursor:
-            cursor.execute(self._QUERY_FIRST_DATE_WITH_DEVICE, {'name': device_name})
+            executePrepared(cursor, self._QUERY_FIRST_DATE_WITH_DEVICE, {'did': device_id})
             row = cursor.fetchone()
             if self.logger is not None and self.logger_debug:
                 self.logger.debug("row: {}".format(row))
@@ -223,14 +664,14 @@ WHERE
         # レコードなし
         return None
 
-    def getPrevYearMonthList(self, device_name: str) -> List[str]:
+    def getPrevYearMonthList(self, device_id: int) -> List[str]:
         """観測デバイスの前年度データが存在する年月リストを取得する
-        :param device_name: 観測デバイス名
+        :param device_id: 観測デバイスID
         :return 対応する観測データが存在する場合は降順の年月リスト(%Y-%m),
                 存在しない場合は空のリスト
         """
         with self.conn.cursor() as cursor:
-            cursor.execute(self._QUERY_PREV_YEAR_MONTH_LIST, {'name': device_name})
+            executePrepared(cursor, self._QUERY_PREV_YEAR_MONTH_LIST, {'did': device_id})
             # fetchall() return tuple list [(?,), (?,), ..., (?,)]
             tuple_list: List[Tuple[str]] = cursor.fetchall()
             if self.logger is not None and self.logger_debug:
@@ -244,13 +685,13 @@ WHERE
 
         return []
 
-    def getLastRegisterDay(self, device_name: str) -> Optional[str]:
+    def getLastRegisterDay(self, device_id: int) -> Optional[str]:
         """観測デバイスの最終登録日を取得する
-        :param device_name: 観測デバイス名
+        :param device_id: 観測デバイスID
         :return 存在する場合は最終登録日, 存在しない場合はNone
         """
         with self.conn.cursor() as cursor:
-            cursor.execute(self._QUERY_LAST_DATE_WITH_DEVICE, {'name': device_name})
+            executePrepared(cursor, self._QUERY_LAST_DATE_WITH_DEVICE, {'did': device_id})
             row = cursor.fetchone()
             if self.logger is not None and self.logger_debug:
                 self.logger.debug("row: {}".format(row))
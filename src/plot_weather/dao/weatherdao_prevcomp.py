@@ -1,6 +1,10 @@
 import logging
 from typing import Dict, List, Optional, Tuple
+import numpy as np
 from psycopg2.extensions import connection
+from .weatherdao import MeasurementTime, TimeColumnType
+from ..db.pgbinary import PG_FLOAT4, PG_INT8, copyToColumns
+from ..db.prepared import executePrepared
 from ..util.date_util import nextYearMonth
 
 """
@@ -12,12 +16,12 @@ from ..util.date_util import nextYearMonth
 class WeatherPrevCompDao:
     _QUERY: str = """
 SELECT
-   to_char(measurement_time,'YYYY-MM-DD HH24:MI') as measurement_time,
+   {time_column} as measurement_time,
    temp_out, humid, pressure
 FROM
-   weather.t_weather tw INNER JOIN weather.t_device td ON tw.did = td.id
+   weather.t_weather tw
 WHERE
-   td.name=%(name)s
+   tw.did=%(did)s
    AND (
      measurement_time >= to_timestamp(%(from_date)s, 'YYYY-MM-DD HH24::MI:SS')
      AND
@@ -26,28 +30,55 @@ WHERE
 ORDER BY measurement_time;
 """
 
-    def __init__(self, conn: connection, logger: Optional[logging.Logger] = None):
+    # COPY BINARYによる一括取得用 ※固定長にするためNULLはNaNに置き換える
+    _SELECT_COLUMNS: str = """
+SELECT
+   {time_column} as measurement_time,
+   COALESCE(temp_out, 'NaN')::REAL as temp_out,
+   COALESCE(humid, 'NaN')::REAL as humid,
+   COALESCE(pressure, 'NaN')::REAL as pressure
+FROM
+   weather.t_weather tw
+WHERE
+   tw.did=%(did)s
+   AND (
+     measurement_time >= to_timestamp(%(from_date)s, 'YYYY-MM-DD HH24::MI:SS')
+     AND
+     measurement_time < to_timestamp(%(exclude_to_date)s, 'YYYY-MM-DD HH24:MI:SS')
+   )
+ORDER BY measurement_time
+""".format(time_column=TimeColumnType.EPOCH.value)
+    # 測定時刻(int8: エポック秒), 測定値(float4)
+    _COLUMNS_FIELDS: List[Tuple[str, str]] = [
+        ("measurement_time", PG_INT8),
+        ("temp_out", PG_FLOAT4), ("humid", PG_FLOAT4), ("pressure", PG_FLOAT4)
+    ]
+
+    def __init__(self, conn: connection, logger: Optional[logging.Logger] = None,
+                 time_type: TimeColumnType = TimeColumnType.STRING):
         self.conn: connection = conn
         self.logger: Optional[logging.Logger] = logger
         self.logger_debug: bool = False
         if self.logger is not None:
             self.logger_debug = (self.logger.getEffectiveLevel() <= logging.DEBUG)
+        # 測定時刻カラムを取得形式に置き換えたクエリー
+        self._query: str = self._QUERY.format(time_column=time_type.value)
 
     def getMonthData(self,
-                     device_name: str, year_month: str
-                     ) -> List[Tuple[str, float, float, float]]:
+                     device_id: int, year_month: str
+                     ) -> List[Tuple[MeasurementTime, float, float, float]]:
         from_date: str = year_month + "-01"
         exclude_date: str = nextYearMonth(from_date)
         if self.logger is not None and self.logger_debug:
             self.logger.debug(
-                f"device_name: {device_name}, from: {from_date}, to_date: {exclude_date}"
+                f"device_id: {device_id}, from: {from_date}, to_date: {exclude_date}"
             )
         params: Dict = {
-            "name": device_name, "from_date": from_date, "exclude_to_date": exclude_date
+            "did": device_id, "from_date": from_date, "exclude_to_date": exclude_date
         }
-        result: List[Tuple[str, float, float, float]]
+        result: List[Tuple[MeasurementTime, float, float, float]]
         with self.conn.cursor() as cursor:
-            cursor.execute(self._QUERY, params)
+            executePrepared(cursor, self._query, params)
             tuple_list = cursor.fetchall()
             rec_count: int = len(tuple_list)
             if self.logger is not None and self.logger_debug:
@@ -57,3 +88,27 @@ ORDER BY measurement_time;
             else:
                 result = [rec for rec in tuple_list]
         return result
+
+    def getMonthColumns(self, device_id: int, year_month: str) -> Dict[str, np.ndarray]:
+        """
+        指定年月の観測データを COPY BINARY で一括取得する
+        :param device_id: 観測デバイスID
+        :param year_month: 検索年月
+        :return: カラム名とNumPy配列の辞書
+          測定時刻(measurement_time): int64 エポック秒, 測定値: float32 (NULLはNaN)
+        """
+        from_date: str = year_month + "-01"
+        exclude_date: str = nextYearMonth(from_date)
+        if self.logger is not None and self.logger_debug:
+            self.logger.debug(
+                f"device_id: {device_id}, from: {from_date}, to_date: {exclude_date}"
+            )
+        params: Dict = {
+            "did": device_id, "from_date": from_date, "exclude_to_date": exclude_date
+        }
+        result: Dict[str, np.ndarray] = copyToColumns(
+            self.conn, self._SELECT_COLUMNS, params, self._COLUMNS_FIELDS
+        )
+        if self.logger is not None and self.logger_debug:
+            self.logger.debug(f"rec_count: {len(result['measurement_time'])}")
+        return result
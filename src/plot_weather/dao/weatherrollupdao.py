@@ -0,0 +1,225 @@
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from psycopg2.extensions import connection
+
+"""
+気象データの時間別・日別集計(ロールアップ)テーブル更新DAOクラス
+[集計項目] 外気温, 室内気温, 湿度, 気圧 ごとの 最小値と出現時刻, 最大値と出現時刻, 平均値
+[仕様]
+ (1) デバイスごとに集計済みの最終測定時刻(ウォーターマーク)を保持する
+ (2) 更新時はウォーターマークを含む日以降の集計単位のみ再集計する
+ (3) 最小値・最大値が複数回出現する場合の出現時刻は直近とする
+[前提条件]
+ (1) 観測データは時系列順に追加される ※ウォーターマーク以前への追加は反映されない
+ (2) 更新には書き込み可能なコネクションが必要 ※アプリのコネクションプールは readonly
+"""
+
+# 集計対象の測定値カラム
+ROLLUP_MEASURES: List[str] = ["temp_out", "temp_in", "humid", "pressure"]
+# 集計値の種類: 最小値, 最小値の出現時刻, 最大値, 最大値の出現時刻, 平均値
+ROLLUP_STATS: List[str] = ["min", "min_time", "max", "max_time", "avg"]
+# 集計カラム名: temp_out_min, temp_out_min_time, ..., pressure_avg
+ROLLUP_STAT_COLUMNS: List[str] = [
+    f"{measure}_{stat}" for measure in ROLLUP_MEASURES for stat in ROLLUP_STATS
+]
+# 集計単位 (date_truncの単位) と テーブル名
+ROLLUP_TABLES: Dict[str, str] = {
+    "hour": "weather.t_weather_hourly",
+    "day": "weather.t_weather_daily",
+}
+
+
+def _statColumnsDDL() -> str:
+    lines: List[str] = []
+    for measure in ROLLUP_MEASURES:
+        lines.append(f"  {measure}_min REAL,")
+        lines.append(f"  {measure}_min_time TIMESTAMP,")
+        lines.append(f"  {measure}_max REAL,")
+        lines.append(f"  {measure}_max_time TIMESTAMP,")
+        lines.append(f"  {measure}_avg REAL,")
+    return "\n".join(lines)
+
+
+def _statColumnsSelect() -> str:
+    lines: List[str] = []
+    for measure in ROLLUP_MEASURES:
+        # 同値の場合は直近の測定時刻
+        lines.append(f"  min({measure}),")
+        lines.append(
+            f"  (array_agg(measurement_time ORDER BY {measure}, measurement_time DESC)"
+            f" FILTER (WHERE {measure} IS NOT NULL))[1],"
+        )
+        lines.append(f"  max({measure}),")
+        lines.append(
+            f"  (array_agg(measurement_time ORDER BY {measure} DESC, measurement_time DESC)"
+            f" FILTER (WHERE {measure} IS NOT NULL))[1],"
+        )
+        lines.append(f"  avg({measure})::REAL,")
+    # 末尾のカンマを除く
+    return "\n".join(lines)[:-1]
+
+
+@dataclass(frozen=True)
+class RollupResult:
+    """ ロールアップ更新結果 """
+    did: int
+    # 再集計した期間 ※更新なしは None
+    from_time: Optional[datetime]
+    to_time: Optional[datetime]
+    # 更新した集計単位の件数
+    hourly_count: int
+    daily_count: int
+
+
+class WeatherRollupDao:
+    _DDL_ROLLUP_TABLE: str = """
+CREATE TABLE IF NOT EXISTS {table_name} (
+  did INTEGER NOT NULL,
+  measurement_time TIMESTAMP NOT NULL,
+  rec_count INTEGER NOT NULL,
+{stat_columns}
+  PRIMARY KEY (did, measurement_time)
+);
+"""
+
+    _DDL_WATERMARK_TABLE: str = """
+CREATE TABLE IF NOT EXISTS weather.t_rollup_watermark (
+  did INTEGER NOT NULL PRIMARY KEY,
+  last_measurement_time TIMESTAMP NOT NULL,
+  updated_at TIMESTAMP NOT NULL DEFAULT now()
+);
+"""
+
+    _QUERY_WATERMARK: str = """
+SELECT last_measurement_time FROM weather.t_rollup_watermark WHERE did=%(did)s;
+"""
+
+    _QUERY_LAST_MEASUREMENT_TIME: str = """
+SELECT max(measurement_time) FROM weather.t_weather WHERE did=%(did)s;
+"""
+
+    # 指定期間を集計単位ごとに再集計する ※集計済みの単位は置き換える
+    _UPSERT_ROLLUP: str = """
+INSERT INTO {table_name} (
+  did, measurement_time, rec_count,
+  {stat_column_names}
+)
+SELECT
+  did,
+  date_trunc('{unit}', measurement_time) AS bucket,
+  count(*),
+{stat_columns}
+FROM
+  weather.t_weather
+WHERE
+  did=%(did)s
+  AND measurement_time >= %(from_time)s AND measurement_time <= %(to_time)s
+GROUP BY did, bucket
+ON CONFLICT (did, measurement_time) DO UPDATE SET
+  rec_count = EXCLUDED.rec_count,
+  {update_columns};
+"""
+
+    _UPSERT_WATERMARK: str = """
+INSERT INTO weather.t_rollup_watermark (did, last_measurement_time, updated_at)
+VALUES (%(did)s, %(to_time)s, now())
+ON CONFLICT (did) DO UPDATE SET
+  last_measurement_time = EXCLUDED.last_measurement_time,
+  updated_at = EXCLUDED.updated_at;
+"""
+
+    def __init__(self, conn: connection, logger: Optional[logging.Logger] = None):
+        """
+        :param conn: 書き込み可能な psycopg2 connection ※autocommit=False
+        :param logger: app_logger
+        """
+        self.conn: connection = conn
+        self.logger: Optional[logging.Logger] = logger
+        self.logger_debug: bool = False
+        if self.logger is not None:
+            self.logger_debug = (self.logger.getEffectiveLevel() <= logging.DEBUG)
+        self._upsert_queries: Dict[str, str] = {
+            unit: self._UPSERT_ROLLUP.format(
+                table_name=table_name, unit=unit,
+                stat_column_names=",\n  ".join(ROLLUP_STAT_COLUMNS),
+                stat_columns=_statColumnsSelect(),
+                update_columns=",\n  ".join(
+                    [f"{col} = EXCLUDED.{col}" for col in ROLLUP_STAT_COLUMNS]
+                )
+            )
+            for unit, table_name in ROLLUP_TABLES.items()
+        }
+
+    def createTables(self) -> None:
+        """
+        ロールアップテーブルとウォーターマークテーブルを作成する ※作成済みなら何もしない
+        :raise: DatabaseError
+        """
+        with self.conn.cursor() as cursor:
+            for table_name in ROLLUP_TABLES.values():
+                cursor.execute(self._DDL_ROLLUP_TABLE.format(
+                    table_name=table_name, stat_columns=_statColumnsDDL()
+                ))
+            cursor.execute(self._DDL_WATERMARK_TABLE)
+        self.conn.commit()
+
+    def getWatermark(self, device_id: int) -> Optional[datetime]:
+        """
+        集計済みの最終測定時刻を取得する
+        :param device_id: 観測デバイスID
+        :return: 最終測定時刻, 未集計なら None
+        """
+        with self.conn.cursor() as cursor:
+            cursor.execute(self._QUERY_WATERMARK, {"did": device_id})
+            row: Optional[Tuple[datetime]] = cursor.fetchone()
+        return row[0] if row is not None else None
+
+    def refresh(self, device_id: int) -> RollupResult:
+        """
+        ウォーターマーク以降の観測データを含む集計単位を再集計する
+        ※1トランザクションで更新する
+        :param device_id: 観測デバイスID
+        :return: RollupResult
+        :raise: DatabaseError
+        """
+        watermark: Optional[datetime] = self.getWatermark(device_id)
+        with self.conn.cursor() as cursor:
+            cursor.execute(self._QUERY_LAST_MEASUREMENT_TIME, {"did": device_id})
+            to_time: Optional[datetime] = cursor.fetchone()[0]
+        if to_time is None or (watermark is not None and to_time <= watermark):
+            # 新しい観測データなし
+            self.conn.rollback()
+            return RollupResult(did=device_id, from_time=None, to_time=None,
+                                hourly_count=0, daily_count=0)
+
+        # ウォーターマークを含む日の先頭から再集計する (日別の集計単位を含むため)
+        from_time: datetime
+        if watermark is not None:
+            from_time = watermark.replace(hour=0, minute=0, second=0, microsecond=0)
+        else:
+            from_time = datetime(1970, 1, 1)
+        params: Dict = {"did": device_id, "from_time": from_time, "to_time": to_time}
+        if self.logger is not None and self.logger_debug:
+            self.logger.debug(f"params: {params}")
+        counts: Dict[str, int] = {}
+        try:
+            with self.conn.cursor() as cursor:
+                for unit, query in self._upsert_queries.items():
+                    cursor.execute(query, params)
+                    counts[unit] = cursor.rowcount
+                cursor.execute(self._UPSERT_WATERMARK, params)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+        result: RollupResult = RollupResult(
+            did=device_id, from_time=from_time, to_time=to_time,
+            hourly_count=counts["hour"], daily_count=counts["day"]
+        )
+        if self.logger is not None:
+            self.logger.info(f"{result}")
+        return result
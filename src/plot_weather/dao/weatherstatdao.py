@@ -4,6 +4,8 @@ from dataclasses import dataclass, asdict
 from typing import Dict, List, Optional, Tuple
 from psycopg2.extensions import connection, cursor
 
+from plot_weather.db.prepared import executePrepared
+
 """ 気象データの外気温統計取得DAOクラス """
 
 FMT_ISO8601_DATE: str = "%Y-%m-%d"
@@ -15,6 +17,24 @@ class TempOut:
     temper: Optional[float]
 
 
+@dataclass(frozen=True)
+class LastDataWithTempOutStat:
+    """ 最新レコードと検索日(最新レコードの日付)・前日の外気温統計 """
+    measurement_time: str
+    temp_out: Optional[float]
+    temp_in: Optional[float]
+    humid: Optional[float]
+    pressure: Optional[float]
+    # 検索日(ISO8601)と外気温の最低・最高 ※asdict(TempOut)
+    find_date: str
+    today_min: Dict
+    today_max: Dict
+    # 前日(ISO8601)と外気温の最低・最高 ※レコードなしは値が None の TempOut
+    before_date: str
+    before_min: Dict
+    before_max: Dict
+
+
 class TempOutStatDao:
     _QUERY: str = """
 WITH find_records AS (
@@ -31,9 +51,9 @@ WITH find_records AS (
       THEN temp_out
     END AS max_temp_out
   FROM
-    weather.t_weather tw INNER JOIN weather.t_device td ON tw.did = td.id
+    weather.t_weather tw
   WHERE
-    td.name = %(name)s
+    tw.did = %(did)s
     AND (
       measurement_time >= %(from_date)s AND measurement_time < %(exclude_to_date)s
     )
@@ -69,6 +89,56 @@ SELECT * FROM min_temp_out_record
 UNION ALL
 SELECT * FROM max_temp_out_record
 ;
+"""
+
+    # 最新レコード と 最新レコードの日付(検索日)・前日の外気温の最低・最高を1回で取得する
+    #  最低・最高が複数回出現する場合は直近の時刻 (_QUERYと同じ)
+    _QUERY_LAST_WITH_STAT: str = """
+WITH latest AS (
+  SELECT
+    measurement_time, temp_out, temp_in, humid, pressure
+  FROM
+    weather.t_weather
+  WHERE
+    did = %(did)s
+  ORDER BY measurement_time DESC
+  LIMIT 1
+),
+day_stats AS (
+  SELECT
+    date(tw.measurement_time) AS find_date,
+    min(tw.temp_out) AS min_temp_out,
+    (array_agg(tw.measurement_time ORDER BY tw.temp_out, tw.measurement_time DESC))[1]
+      AS min_time,
+    max(tw.temp_out) AS max_temp_out,
+    (array_agg(tw.measurement_time ORDER BY tw.temp_out DESC, tw.measurement_time DESC))[1]
+      AS max_time
+  FROM
+    weather.t_weather tw, latest
+  WHERE
+    tw.did = %(did)s
+    AND (
+      -- The day before and the day of the latest record
+      tw.measurement_time >= date(latest.measurement_time) - 1
+      AND tw.measurement_time < date(latest.measurement_time) + 1
+    )
+    AND tw.temp_out IS NOT NULL
+  GROUP BY date(tw.measurement_time)
+)
+SELECT
+  to_char(l.measurement_time,'YYYY-MM-DD HH24:MI'),
+  l.temp_out, l.temp_in, l.humid, l.pressure,
+  to_char(date(l.measurement_time), 'YYYY-MM-DD'),
+  to_char(today.min_time,'HH24:MI'), today.min_temp_out,
+  to_char(today.max_time,'HH24:MI'), today.max_temp_out,
+  to_char(date(l.measurement_time) - 1, 'YYYY-MM-DD'),
+  to_char(before.min_time,'HH24:MI'), before.min_temp_out,
+  to_char(before.max_time,'HH24:MI'), before.max_temp_out
+FROM
+  latest l
+  LEFT JOIN day_stats today ON today.find_date = date(l.measurement_time)
+  LEFT JOIN day_stats before ON before.find_date = date(l.measurement_time) - 1
+;
 """
 
     def __init__(self, conn: connection,
@@ -77,12 +147,12 @@ SELECT * FROM max_temp_out_record
         self.logger: Optional[logging.Logger] = logger
         self.is_debug_out: bool = is_debug_out
 
-    def get_statistics(self, device_name: str, from_date: str) -> List[Dict]:
+    def get_statistics(self, device_id: int, from_date: str) -> List[Dict]:
         dt: datetime = datetime.strptime(from_date, FMT_ISO8601_DATE)
         dt += timedelta(days=1)
         exclude_to_date: str = dt.strftime(FMT_ISO8601_DATE)
         params: Dict = {
-            "name": device_name, "from_date": from_date, "exclude_to_date": exclude_to_date
+            "did": device_id, "from_date": from_date, "exclude_to_date": exclude_to_date
         }
         if self.logger is not None and self.is_debug_out:
             self.logger.debug(f"params: {params}")
@@ -90,7 +160,7 @@ SELECT * FROM max_temp_out_record
         result: List[Dict] = []
         curr: cursor
         with self.conn.cursor() as curr:
-            curr.execute(self._QUERY, params)
+            executePrepared(curr, self._QUERY, params)
             rows: List[Tuple[str, float]] = curr.fetchall()
             record_size: int = len(rows)
             if self.logger is not None and self.is_debug_out:
@@ -103,3 +173,32 @@ SELECT * FROM max_temp_out_record
             return result
         else:
             return result
+
+    def get_last_data_with_statistics(self, device_id: int) -> Optional[LastDataWithTempOutStat]:
+        """
+        最新レコードと検索日(最新レコードの日付)・前日の外気温統計を1回のクエリーで取得する
+        :param device_id: デバイスID
+        :return: LastDataWithTempOutStat, レコードなしは None
+        """
+        if self.logger is not None and self.is_debug_out:
+            self.logger.debug(f"device_id: {device_id}")
+
+        curr: cursor
+        with self.conn.cursor() as curr:
+            executePrepared(curr, self._QUERY_LAST_WITH_STAT, {"did": device_id})
+            row: Optional[Tuple] = curr.fetchone()
+            if self.logger is not None and self.is_debug_out:
+                self.logger.debug(f"row: {row}")
+        if row is None:
+            return None
+
+        return LastDataWithTempOutStat(
+            measurement_time=row[0],
+            temp_out=row[1], temp_in=row[2], humid=row[3], pressure=row[4],
+            find_date=row[5],
+            today_min=asdict(TempOut(row[6], row[7])),
+            today_max=asdict(TempOut(row[8], row[9])),
+            before_date=row[10],
+            before_min=asdict(TempOut(row[11], row[12])),
+            before_max=asdict(TempOut(row[13], row[14]))
+        )
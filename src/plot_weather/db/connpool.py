@@ -0,0 +1,294 @@
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Callable, Deque, Dict, List, Optional
+
+import psycopg2
+from psycopg2.extensions import connection, TRANSACTION_STATUS_IDLE
+from psycopg2.pool import PoolError
+
+"""
+スレッドセーフなPostgreSQLコネクションプール
+[仕様]
+ (1) 最大接続数を超えた場合は到着順(FIFO)にタイムアウト付きで待機する
+ (2) 起動時に最小接続数分の接続を事前に確立する
+ (3) 取得時に切断済みのコネクションを検出し再接続する (DB再起動対策)
+ (4) セッション設定(readonly, autocommit)は接続確立時に1回のみ実行する
+"""
+
+
+class PoolTimeoutError(PoolError):
+    """ コネクション取得待ちタイムアウト """
+    pass
+
+
+@dataclass
+class PoolStats:
+    """ コネクションプールの統計情報 """
+    # 最大接続数
+    max_size: int
+    # 確立済み接続数
+    opened: int = 0
+    # 貸出中の接続数
+    in_use: int = 0
+    # 貸出中の最大接続数
+    max_in_use: int = 0
+    # 取得回数
+    checkouts: int = 0
+    # 待機が発生した取得回数
+    waits: int = 0
+    # 待機時間の合計・最大 (ミリ秒)
+    total_wait_ms: float = 0.
+    max_wait_ms: float = 0.
+    # 取得待ちタイムアウト回数
+    timeouts: int = 0
+    # 現在の待機数
+    waiting: int = 0
+    # 切断を検出して再接続した回数
+    replaced: int = 0
+
+
+class BlockingConnectionPool:
+    def __init__(self, minconn: int, maxconn: int,
+                 timeout: float = 10., check_idle_seconds: float = 60.,
+                 logger: Optional[logging.Logger] = None, **kwargs):
+        """
+        :param minconn: 最小接続数 ※起動時に確立する
+        :param maxconn: 最大接続数
+        :param timeout: 取得待ちタイムアウト(秒)
+        :param check_idle_seconds: この秒数以上未使用のコネクションは取得時に疎通確認する
+        :param logger: app_logger
+        :param kwargs: psycopg2.connect() の接続パラメータ
+        """
+        self.minconn: int = minconn
+        self.maxconn: int = maxconn
+        self.timeout: float = timeout
+        self.check_idle_seconds: float = check_idle_seconds
+        self.logger: Optional[logging.Logger] = logger
+        self._kwargs: Dict = kwargs
+        self._lock: threading.Lock = threading.Lock()
+        # 未使用のコネクションと返却時刻
+        self._idle: Deque[connection] = deque()
+        self._idle_since: Dict[int, float] = {}
+        # 取得待ちスレッドのキュー (到着順)
+        self._waiters: Deque[threading.Event] = deque()
+        self._opened: int = 0
+        self._closed: bool = False
+        self._stats: PoolStats = PoolStats(max_size=maxconn)
+        # コネクション破棄時のコールバック
+        self._discard_listeners: List[Callable[[connection], None]] = []
+        # 最小接続数分を事前に確立
+        for _ in range(minconn):
+            conn: connection = self._new_connection()
+            self._idle.append(conn)
+            self._idle_since[id(conn)] = time.monotonic()
+            self._opened += 1
+        self._stats.opened = self._opened
+
+    def _new_connection(self) -> connection:
+        """ 新規に接続しセッションを設定する ※セッション設定は接続ごとに1回のみ """
+        conn: connection = psycopg2.connect(**self._kwargs)
+        conn.set_session(readonly=True, autocommit=True)
+        return conn
+
+    def _discard(self, conn: connection, release_slot: bool = True) -> None:
+        """
+        コネクションを破棄する
+        :param conn: 破棄するコネクション
+        :param release_slot: 接続枠を解放するか ※再接続する場合は False
+        """
+        for listener in self._discard_listeners:
+            listener(conn)
+        try:
+            if not conn.closed:
+                conn.close()
+        except psycopg2.Error:
+            pass
+        with self._lock:
+            self._idle_since.pop(id(conn), None)
+            if release_slot:
+                self._opened -= 1
+                self._stats.opened = self._opened
+
+    def add_discard_listener(self, listener: Callable[[connection], None]) -> None:
+        """ コネクション破棄時に呼び出すコールバックを登録する """
+        self._discard_listeners.append(listener)
+
+    def _is_alive(self, conn: connection, idle_since: Optional[float]) -> bool:
+        """ コネクションが利用可能か確認する """
+        if conn.closed:
+            return False
+        if idle_since is not None and time.monotonic() - idle_since < self.check_idle_seconds:
+            return True
+        # 一定時間未使用のコネクションは疎通確認する
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _acquire_slot(self) -> Optional[connection]:
+        """
+        未使用のコネクションか新規接続枠を取得する ※ロック内で呼び出す
+        :return: 未使用のコネクション, 新規接続枠を確保した場合は None
+        """
+        if len(self._idle) > 0:
+            return self._idle.popleft()
+        # 新規接続枠を確保 (実際の接続はロック外で実行)
+        self._opened += 1
+        return None
+
+    def getconn(self) -> connection:
+        """
+        コネクションを取得する ※空きがない場合は到着順に待機する
+        :return: psycopg2 connection
+        :raise PoolTimeoutError: 待機タイムアウト, PoolError: プールクローズ済み
+        """
+        start: float = time.monotonic()
+        waited: bool = False
+        conn: Optional[connection]
+        with self._lock:
+            if self._closed:
+                raise PoolError("connection pool is closed")
+            # 待機スレッドが居る場合は追い越さない
+            if len(self._waiters) == 0 and (len(self._idle) > 0 or self._opened < self.maxconn):
+                conn = self._acquire_slot()
+            else:
+                waited = True
+                event: threading.Event = threading.Event()
+                self._waiters.append(event)
+                self._stats.waiting = len(self._waiters)
+                conn = None
+        if waited:
+            conn = self._wait_for_slot(event, start)
+        return self._checkout(conn, start, waited)
+
+    def _wait_for_slot(self, event: threading.Event, start: float) -> Optional[connection]:
+        """ 先頭の待機スレッドになり空きが出るまで待機する """
+        while True:
+            remain: float = self.timeout - (time.monotonic() - start)
+            signaled: bool = event.wait(timeout=max(remain, 0.))
+            with self._lock:
+                if self._closed:
+                    self._remove_waiter(event)
+                    raise PoolError("connection pool is closed")
+                if self._waiters[0] is event and (
+                        len(self._idle) > 0 or self._opened < self.maxconn):
+                    self._waiters.popleft()
+                    self._stats.waiting = len(self._waiters)
+                    conn: Optional[connection] = self._acquire_slot()
+                    # 後続の待機スレッドにも空きがあれば通知
+                    self._notify_next()
+                    return conn
+                if not signaled or remain <= 0.:
+                    self._remove_waiter(event)
+                    self._stats.timeouts += 1
+                    raise PoolTimeoutError(
+                        f"connection pool exhausted: waited {self.timeout} seconds"
+                    )
+                event.clear()
+
+    def _remove_waiter(self, event: threading.Event) -> None:
+        """ 待機キューから除外する ※ロック内で呼び出す """
+        try:
+            self._waiters.remove(event)
+        except ValueError:
+            pass
+        self._stats.waiting = len(self._waiters)
+        self._notify_next()
+
+    def _notify_next(self) -> None:
+        """ 空きがあれば先頭の待機スレッドに通知する ※ロック内で呼び出す """
+        if len(self._waiters) > 0 and (len(self._idle) > 0 or self._opened < self.maxconn):
+            self._waiters[0].set()
+
+    def _checkout(self, conn: Optional[connection], start: float, waited: bool) -> connection:
+        """ 取得したコネクションの疎通確認と統計情報の更新 """
+        if conn is not None:
+            with self._lock:
+                idle_since: Optional[float] = self._idle_since.pop(id(conn), None)
+            if not self._is_alive(conn, idle_since):
+                # DB再起動などで切断済みなので再接続する
+                if self.logger is not None:
+                    self.logger.warning(f"Replace broken connection: {conn}")
+                # 接続枠はそのまま再接続に使う
+                self._discard(conn, release_slot=False)
+                with self._lock:
+                    self._stats.replaced += 1
+                conn = None
+        if conn is None:
+            # 確保済みの枠で新規に接続する
+            try:
+                conn = self._new_connection()
+            except psycopg2.Error:
+                with self._lock:
+                    self._opened -= 1
+                    self._notify_next()
+                raise
+            with self._lock:
+                self._stats.opened = self._opened
+
+        wait_ms: float = (time.monotonic() - start) * 1000.
+        with self._lock:
+            stats: PoolStats = self._stats
+            stats.checkouts += 1
+            stats.in_use += 1
+            stats.max_in_use = max(stats.max_in_use, stats.in_use)
+            if waited:
+                stats.waits += 1
+                stats.total_wait_ms += wait_ms
+                stats.max_wait_ms = max(stats.max_wait_ms, wait_ms)
+        return conn
+
+    def putconn(self, conn: connection, close: bool = False) -> None:
+        """
+        コネクションを返却する
+        :param conn: getconn()で取得したコネクション
+        :param close: Trueなら返却時に破棄する
+        """
+        with self._lock:
+            self._stats.in_use -= 1
+        # 切断済み, トランザクション中のまま(エラー含む)のコネクションは破棄する
+        if close or self._closed or conn.closed or \
+                conn.info.transaction_status != TRANSACTION_STATUS_IDLE:
+            self._discard(conn)
+            with self._lock:
+                self._notify_next()
+            return
+
+        with self._lock:
+            self._idle.append(conn)
+            self._idle_since[id(conn)] = time.monotonic()
+            self._notify_next()
+
+    def closeall(self) -> None:
+        """ 全ての未使用コネクションを閉じる """
+        with self._lock:
+            self._closed = True
+            idle_list: List[connection] = list(self._idle)
+            self._idle.clear()
+            for event in self._waiters:
+                event.set()
+        for conn in idle_list:
+            self._discard(conn)
+
+    def get_stats(self) -> Dict:
+        """
+        統計情報を取得する
+        :return: 統計情報の辞書 ※平均待機時間(avg_wait_ms)と使用率(utilization)を含む
+        """
+        with self._lock:
+            result: Dict = asdict(self._stats)
+        result["avg_wait_ms"] = round(
+            result["total_wait_ms"] / result["waits"], 3) if result["waits"] > 0 else 0.
+        result["total_wait_ms"] = round(result["total_wait_ms"], 3)
+        result["max_wait_ms"] = round(result["max_wait_ms"], 3)
+        result["utilization"] = round(result["in_use"] / result["max_size"], 3)
+        return result
+
+    def __repr__(self) -> str:
+        return f"BlockingConnectionPool(min={self.minconn}, max={self.maxconn}," \
+               f" timeout={self.timeout}, opened={self._opened})"
@@ -0,0 +1,94 @@
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from psycopg2.extensions import connection, cursor
+
+"""
+PostgreSQL COPY ... TO STDOUT WITH BINARY 形式のデコードユーティリティ
+[前提条件]
+ (1) 全てのフィールドが固定長 (int8, float4 など)
+ (2) NULLを含まない ※クエリーで COALESCE(col, 'NaN') 等に置き換えておく
+ 上記の前提により1行のバイト数が固定となるため, 構造化dtypeでストリーム全体を
+ 一括でNumPy配列に変換する (行ごとのPythonオブジェクトを生成しない)
+"""
+
+# ファイルヘッダー: シグネチャ(11byte) + フラグ(int32) + ヘッダー拡張領域長(int32)
+COPY_SIGNATURE: bytes = b"PGCOPY\n\xff\r\n\x00"
+_FIXED_HEADER_SIZE: int = len(COPY_SIGNATURE) + 4 + 4
+# ファイルトレーラー: フィールド数 -1 (int16)
+_TRAILER_SIZE: int = 2
+
+# COPY BINARYの型 (ネットワークバイトオーダー)
+PG_INT8: str = ">i8"
+PG_FLOAT4: str = ">f4"
+PG_FLOAT8: str = ">f8"
+
+
+def _makeRecordDtype(fields: List[Tuple[str, str]]) -> np.dtype:
+    """
+    1行分の構造化dtypeを生成する
+    [形式] フィールド数(int16), [フィールド長(int32), フィールド値] * フィールド数
+    """
+    dtype_list: List[Tuple[str, str]] = [("_field_count", ">i2")]
+    for idx, (name, pg_type) in enumerate(fields):
+        dtype_list.append((f"_field_len{idx}", ">i4"))
+        dtype_list.append((name, pg_type))
+    return np.dtype(dtype_list)
+
+
+def decodeCopyBinary(buffer: bytes, fields: List[Tuple[str, str]]) -> Dict[str, np.ndarray]:
+    """
+    COPY BINARY形式のバイト列を列ごとのNumPy配列にデコードする
+    :param buffer: COPY BINARY形式のバイト列
+    :param fields: (カラム名, 型) のリスト ※型は PG_INT8, PG_FLOAT4 など
+    :return: カラム名とネイティブバイトオーダーの配列の辞書
+    :raise ValueError: 形式不正, 可変長データ・NULLを含む場合
+    """
+    if buffer[:len(COPY_SIGNATURE)] != COPY_SIGNATURE:
+        raise ValueError("Invalid COPY BINARY signature")
+
+    ext_size: int = int(
+        np.frombuffer(buffer, dtype=">i4", count=1, offset=_FIXED_HEADER_SIZE - 4)[0]
+    )
+    offset: int = _FIXED_HEADER_SIZE + ext_size
+    rec_dtype: np.dtype = _makeRecordDtype(fields)
+    body_size: int = len(buffer) - offset - _TRAILER_SIZE
+    if body_size < 0 or body_size % rec_dtype.itemsize != 0:
+        raise ValueError(f"Invalid COPY BINARY body size: {body_size}")
+
+    rec_count: int = body_size // rec_dtype.itemsize
+    records: np.ndarray = np.frombuffer(buffer, dtype=rec_dtype, count=rec_count, offset=offset)
+    # 全行のフィールド数とフィールド長が想定通りか (NULLはフィールド長 -1)
+    if rec_count > 0:
+        if np.any(records["_field_count"] != len(fields)):
+            raise ValueError("Unexpected field count in COPY BINARY data")
+        for idx, (name, pg_type) in enumerate(fields):
+            if np.any(records[f"_field_len{idx}"] != np.dtype(pg_type).itemsize):
+                raise ValueError(f"Unexpected field length (NULL?) in column: {name}")
+
+    # ネイティブバイトオーダーの連続配列に変換
+    return {
+        name: records[name].astype(np.dtype(pg_type).newbyteorder("="))
+        for name, pg_type in fields
+    }
+
+
+def copyToColumns(conn: connection, select_query: str, params: Optional[Dict],
+                  fields: List[Tuple[str, str]]) -> Dict[str, np.ndarray]:
+    """
+    SELECT文の結果を COPY BINARY で一括取得し列ごとのNumPy配列として返却する
+    :param conn: psycopg2 connection
+    :param select_query: SELECT文 ※末尾のセミコロンなし, パラメータは pyformat形式
+    :param params: クエリーパラメータ
+    :param fields: (カラム名, 型) のリスト ※SELECT句の並び順
+    :return: カラム名とNumPy配列の辞書
+    :raise DatabaseError, ValueError
+    """
+    buffer: BytesIO = BytesIO()
+    curr: cursor
+    with conn.cursor() as curr:
+        # COPYはパラメータバインド不可のため事前にパラメータを埋め込む
+        query: bytes = curr.mogrify(f"COPY ({select_query}) TO STDOUT WITH BINARY", params)
+        curr.copy_expert(query, buffer)
+    return decodeCopyBinary(buffer.getbuffer(), fields)
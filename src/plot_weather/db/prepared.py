@@ -0,0 +1,224 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+import weakref
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from psycopg2 import errors
+from psycopg2.extensions import connection, cursor
+
+"""
+プリペアドステートメント管理クラス
+[仕様]
+ (1) DAOのクエリー(pyformat形式)をコネクションごとに初回のみ PREPARE し, 以降は EXECUTE で実行する
+     ※クエリーの構文解析・実行計画の作成を毎回行わない
+ (2) コネクションプールからコネクションが破棄された場合は管理情報を削除する
+ (3) サーバー側にステートメントが存在しない場合(DB再起動, DEALLOCATE等)は再度 PREPARE して実行する
+ (4) ステートメントごとの実行回数と実行時間を記録する
+[前提条件]
+ (1) コネクションは autocommit モード ※エラー時に再実行するため
+ (2) 名前付きカーソル(DECLARE)と COPY は EXECUTE を使えないため対象外
+"""
+
+# pyformat形式のパラメータ %(name)s と リテラルの %%
+_PARAM_PATTERN: re.Pattern = re.compile(r"%\((\w+)\)s|%%")
+
+# ステートメント名の接頭辞
+STATEMENT_PREFIX: str = "pw_"
+
+
+@dataclass(frozen=True)
+class PreparedStatement:
+    """ クエリーから変換したプリペアドステートメント """
+    # ステートメント名
+    name: str
+    # PREPARE文 ※パラメータは $1, $2, ...
+    prepare_sql: str
+    # EXECUTE文 ※パラメータは psycopg2 の位置パラメータ(%s)
+    execute_sql: str
+    # $n に対応するパラメータ名
+    param_names: Tuple[str, ...]
+
+
+@dataclass
+class StatementStats:
+    """ ステートメントごとの統計情報 """
+    # クエリーの先頭部分 ※識別用
+    query: str
+    # 実行回数
+    executions: int = 0
+    # PREPARE回数 (コネクションごとに1回)
+    prepares: int = 0
+    # サーバー側にステートメントが存在せず再PREPAREした回数
+    reprepares: int = 0
+    # 実行時間の合計・最大 (ミリ秒)
+    total_ms: float = 0.
+    max_ms: float = 0.
+
+
+def toPreparedStatement(query: str, prefix: str = STATEMENT_PREFIX) -> PreparedStatement:
+    """
+    pyformat形式のクエリーをプリペアドステートメントに変換する
+    ※同じパラメータ名は同じ番号($n)を使う
+    :param query: pyformat形式のクエリー
+    :param prefix: ステートメント名の接頭辞
+    :return: PreparedStatement
+    """
+    param_names: List[str] = []
+
+    def replace(matched: re.Match) -> str:
+        param_name: Optional[str] = matched.group(1)
+        if param_name is None:
+            # %% はそのまま % とする
+            return "%"
+        if param_name not in param_names:
+            param_names.append(param_name)
+        return f"${param_names.index(param_name) + 1}"
+
+    # 末尾のセミコロンは除く
+    body: str = _PARAM_PATTERN.sub(replace, query.strip().rstrip(";"))
+    # クエリー文字列が同一なら同じステートメント名
+    name: str = prefix + hashlib.sha1(query.encode("utf-8")).hexdigest()[:16]
+    execute_sql: str = f"EXECUTE {name}"
+    if len(param_names) > 0:
+        execute_sql += " (" + ", ".join(["%s"] * len(param_names)) + ")"
+    return PreparedStatement(
+        name=name, prepare_sql=f"PREPARE {name} AS {body}",
+        execute_sql=execute_sql, param_names=tuple(param_names)
+    )
+
+
+class PreparedStatementRegistry:
+    def __init__(self, enabled: bool = True, logger: Optional[logging.Logger] = None):
+        """
+        :param enabled: False の場合は PREPARE せずにクエリーをそのまま実行する
+        :param logger: app_logger
+        """
+        self.enabled: bool = enabled
+        self.logger: Optional[logging.Logger] = logger
+        self._lock: threading.Lock = threading.Lock()
+        # クエリー文字列とステートメント
+        self._statements: Dict[str, PreparedStatement] = {}
+        # コネクションごとの PREPARE 済みステートメント名
+        #  ※プール外で破棄されたコネクションは自動で削除される
+        self._prepared: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._stats: Dict[str, StatementStats] = {}
+
+    def _getStatement(self, query: str) -> PreparedStatement:
+        with self._lock:
+            stmt: Optional[PreparedStatement] = self._statements.get(query)
+            if stmt is None:
+                stmt = toPreparedStatement(query)
+                self._statements[query] = stmt
+                self._stats[stmt.name] = StatementStats(
+                    query=" ".join(query.split())[:80]
+                )
+        return stmt
+
+    def _preparedNames(self, conn: connection) -> Set[str]:
+        with self._lock:
+            names: Optional[Set[str]] = self._prepared.get(conn)
+            if names is None:
+                names = set()
+                self._prepared[conn] = names
+        return names
+
+    def _prepare(self, cur: cursor, stmt: PreparedStatement, names: Set[str]) -> None:
+        try:
+            cur.execute(stmt.prepare_sql)
+        except errors.DuplicatePreparedStatement:
+            # 管理情報のみ失われた場合 ※サーバー側は PREPARE 済み
+            if not cur.connection.autocommit:
+                raise
+        names.add(stmt.name)
+        with self._lock:
+            self._stats[stmt.name].prepares += 1
+        if self.logger is not None:
+            self.logger.debug(f"PREPARE {stmt.name}: {self._stats[stmt.name].query}")
+
+    def execute(self, cur: cursor, query: str, params: Optional[Dict] = None) -> None:
+        """
+        cursor.execute(query, params) と同等の処理を EXECUTE で実行する
+        ※コネクションで未 PREPARE なら先に PREPARE する
+        :param cur: psycopg2 cursor ※名前付きカーソルは不可
+        :param query: pyformat形式のクエリー
+        :param params: クエリーパラメータ
+        :raise DatabaseError
+        """
+        if not self.enabled:
+            cur.execute(query, params)
+            return
+
+        stmt: PreparedStatement = self._getStatement(query)
+        names: Set[str] = self._preparedNames(cur.connection)
+        if stmt.name not in names:
+            self._prepare(cur, stmt, names)
+        args: Tuple = tuple(params[name] for name in stmt.param_names)
+        reprepared: bool = False
+        start: float = time.perf_counter()
+        try:
+            cur.execute(stmt.execute_sql, args)
+        except errors.InvalidSqlStatementName:
+            # サーバー側にステートメントが存在しない (DB再起動, DEALLOCATE など)
+            names.discard(stmt.name)
+            if not cur.connection.autocommit:
+                # トランザクション中はエラーで中断されているため再実行できない
+                raise
+            if self.logger is not None:
+                self.logger.warning(f"Re-prepare statement: {stmt.name}")
+            self._prepare(cur, stmt, names)
+            reprepared = True
+            cur.execute(stmt.execute_sql, args)
+        elapsed_ms: float = (time.perf_counter() - start) * 1000.
+        with self._lock:
+            stats: StatementStats = self._stats[stmt.name]
+            stats.executions += 1
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            if reprepared:
+                stats.reprepares += 1
+
+    def discard(self, conn: connection) -> None:
+        """
+        コネクションの管理情報を削除する ※コネクションプールの破棄時コールバック
+        :param conn: 破棄するコネクション
+        """
+        with self._lock:
+            self._prepared.pop(conn, None)
+
+    def get_stats(self) -> Dict:
+        """
+        統計情報を取得する
+        :return: ステートメント名と統計情報(平均実行時間 avg_ms を含む)の辞書
+        """
+        with self._lock:
+            stats_list: List[Tuple[str, Dict]] = [
+                (name, asdict(stats)) for name, stats in self._stats.items()
+            ]
+            connections: int = len(self._prepared)
+        result: Dict = {"enabled": self.enabled, "connections": connections, "statements": {}}
+        for name, stats in stats_list:
+            stats["avg_ms"] = round(
+                stats["total_ms"] / stats["executions"], 3) if stats["executions"] > 0 else 0.
+            stats["total_ms"] = round(stats["total_ms"], 3)
+            stats["max_ms"] = round(stats["max_ms"], 3)
+            result["statements"][name] = stats
+        return result
+
+
+# アプリ全体で共有するレジストリ ※DAOから利用する
+default_registry: PreparedStatementRegistry = PreparedStatementRegistry()
+
+
+def executePrepared(cur: cursor, query: str, params: Optional[Dict] = None) -> None:
+    """
+    共有レジストリで cursor.execute(query, params) と同等の処理を実行する
+    :param cur: psycopg2 cursor
+    :param query: pyformat形式のクエリー
+    :param params: クエリーパラメータ
+    :raise DatabaseError
+    """
+    default_registry.execute(cur, query, params)
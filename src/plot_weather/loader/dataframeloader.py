@@ -1,13 +1,21 @@
 import logging
 from datetime import datetime, timedelta
-from io import StringIO
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
 from psycopg2.extensions import connection
 
-from plot_weather.dao.weatherdao import WeatherDao
-from plot_weather.util.date_util import FMT_ISO8601
+from plot_weather.cache.currentframe import CurrentFrameCache
+from plot_weather.cache.montharchive import MonthArchive
+from plot_weather.cache.monthframe import MonthFrameCache, isClosedMonth
+from plot_weather.cache.seriesstore import SeriesStore
+from plot_weather.dao.weatherdao import (
+    DEFAULT_ITERSIZE, MeasurementTime, TimeColumnType, WeatherDao
+)
+from plot_weather.util.date_util import (
+    FMT_ISO8601, FMT_DATETIME_HM, addDayToString, nextYearMonth
+)
 
 """　WeatherDaoからDataFrameを生成するモジュール　"""
 
@@ -17,97 +25,278 @@ COL_TEMP_OUT: str = "temp_out"
 COL_TEMP_IN: str = "temp_in"
 COL_HUMID: str = "humid"
 COL_PRESSURE: str = "pressure"
-# CSVバッファのヘッダー
-HEADER: str = f'"{COL_TIME}","{COL_TEMP_OUT}","{COL_TEMP_IN}","{COL_HUMID}","{COL_PRESSURE}"'
+# 取得カラム: 測定時刻,外気温,室内気温,湿度,気圧
+COLUMNS: List[str] = [COL_TIME, COL_TEMP_OUT, COL_TEMP_IN, COL_HUMID, COL_PRESSURE]
+# 年月DataFrameキャッシュのロード種別
+FRAME_KIND_MONTH: str = "month"
+# 差分更新キャッシュのロード種別 (当日)
+FRAME_KIND_TODAY: str = "today"
 
 
-def _csvToStringIO(
-        tuple_list: List[Tuple[str, float, float, float, float]]) -> StringIO:
-    str_buffer = StringIO()
-    str_buffer.write(HEADER + "\n")
+def columnsToDataFrame(
+        times: pd.DatetimeIndex, columns: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """
+    列データ(測定時刻インデックスと測定値配列)から読み取り専用のDataFrameを生成する
+    [形式]
+     (1) 測定時刻はインデックス(DatetimeIndex)のみ ※測定時刻列は持たない
+     (2) 測定値は float32 の1つの2次元配列 ※カラムごとに連続したメモリ配置
+     (3) 配列は書き込み不可 ※キャッシュ共有のため, 変更する場合は呼び出し側でコピーする
+    :param times: 測定時刻のDatetimeIndex
+    :param columns: カラム名と測定値配列の辞書 ※測定時刻列を除く
+    :return: 測定時刻をインデックスとするDataFrame
+    """
+    names: List[str] = list(columns.keys())
+    block: np.ndarray = np.empty((len(names), len(times)), dtype=np.float32)
+    for row, name in enumerate(names):
+        block[row] = columns[name]
+    return blockToDataFrame(times, names, block)
+
+
+def blockToDataFrame(
+        times: pd.DatetimeIndex, names: List[str], block: np.ndarray) -> pd.DataFrame:
+    """
+    (カラム数, 件数)の float32 の2次元配列をコピーせずに読み取り専用のDataFrameにする
+    :param times: 測定時刻のDatetimeIndex
+    :param names: カラム名リスト ※配列の行の順
+    :param block: 測定値の2次元配列 ※書き込み不可に変更する
+    :return: 測定時刻をインデックスとするDataFrame
+    """
+    time_index: pd.DatetimeIndex = pd.DatetimeIndex(times, name=COL_TIME)
+    block.flags.writeable = False
+    # (カラム数, 件数)の配列の転置を渡すとpandasはコピーせずにそのまま保持する
+    return pd.DataFrame(block.T, index=time_index, columns=names, copy=False)
+
+
+def epochColumnsToDataFrame(columns: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """
+    COPY BINARYで一括取得した列データ(測定時刻はエポック秒)からDataFrameを生成する
+    :param columns: カラム名とNumPy配列の辞書 ※測定時刻列を含む
+    :return: 測定時刻をインデックスとするDataFrame
+    """
+    times: pd.DatetimeIndex = toDatetimeIndex(columns[COL_TIME], TimeColumnType.EPOCH)
+    value_columns: Dict[str, np.ndarray] = {
+        name: values for name, values in columns.items() if name != COL_TIME
+    }
+    return columnsToDataFrame(times, value_columns)
+
+
+def toDatetimeIndex(
+        times: Sequence[MeasurementTime],
+        time_type: TimeColumnType = TimeColumnType.EPOCH) -> pd.DatetimeIndex:
+    """
+    測定時刻の列データをDatetimeIndexに一括変換する
+    :param times: 測定時刻の列データ
+    :param time_type: 測定時刻カラムの取得形式 (デフォルト: エポック秒)
+    :return: DatetimeIndex
+    """
+    if time_type == TimeColumnType.EPOCH:
+        # 日付文字列のパースなし
+        epoch: np.ndarray = np.asarray(times, dtype=np.int64)
+        return pd.DatetimeIndex(epoch.astype("datetime64[s]").astype("datetime64[ns]"))
+    elif time_type == TimeColumnType.TIMESTAMP:
+        return pd.DatetimeIndex(times)
+    else:
+        return pd.DatetimeIndex(pd.to_datetime(times, format=FMT_DATETIME_HM))
+
 
-    for (m_time, temp_in, temp_out, humid, pressure) in tuple_list:
-        line = f'"{m_time}",{temp_in},{temp_out},{humid},{pressure}\n'
-        str_buffer.write(line)
+def rowsToDataFrame(
+        tuple_list: Sequence[Tuple], columns: List[str],
+        time_type: TimeColumnType = TimeColumnType.EPOCH) -> pd.DataFrame:
+    """
+    DAOの取得レコード(タプルのリスト)からCSVを経由せずに直接DataFrameを生成する
+    :param tuple_list: 取得レコード ※先頭は測定時刻
+    :param columns: カラム名リスト ※先頭は測定時刻列
+    :param time_type: 測定時刻カラムの取得形式 (デフォルト: エポック秒)
+    :return: 測定時刻をインデックスとするDataFrame
+    """
+    # 行データを列データに転置する
+    col_values: List[Tuple] = list(zip(*tuple_list))
+    # 測定時刻は一括でDatetimeIndexに変換
+    times: pd.DatetimeIndex = toDatetimeIndex(col_values[0], time_type)
+    # 測定値は型付き配列に変換 ※NULL(None)は NaN
+    value_columns: Dict[str, np.ndarray] = {
+        name: np.array(values, dtype=np.float32)
+        for name, values in zip(columns[1:], col_values[1:])
+    }
+    return columnsToDataFrame(times, value_columns)
 
-    # StringIO need Set first position
-    str_buffer.seek(0)
-    return str_buffer
+
+def loadArchivedMonthColumns(
+        conn: connection, device_id: int, year_month: str, archive: MonthArchive,
+        names: Optional[List[str]] = None, logger: Optional[logging.Logger] = None
+) -> Dict[str, np.ndarray]:
+    """
+    指定年月の列データを年月アーカイブから取得する
+    ※アーカイブにない場合は COPY BINARY で取得し, 猶予期間が経過した確定済み年月ならアーカイブに保存する
+    :param conn: psycopg2 connection
+    :param device_id: デバイスID
+    :param year_month: 検索年月
+    :param archive: 確定済み年月のアーカイブ
+    :param names: 測定値カラム名リスト ※None なら全カラム, 測定時刻は常に含む
+    :param logger: app_logger
+    :return: カラム名とNumPy配列の辞書 ※測定時刻はエポック秒
+    :raise: DatabaseError
+    """
+    columns: Optional[Dict[str, np.ndarray]] = archive.read(device_id, year_month, names=names)
+    if columns is not None:
+        return columns
+
+    # アーカイブは全カラムで保存する
+    columns = WeatherDao(conn, logger=logger).getMonthColumns(device_id, year_month)
+    try:
+        archive.write(device_id, year_month, columns)
+    except OSError as err:
+        # 保存できなくても取得したデータは返却する
+        if logger is not None:
+            logger.warning(f"MonthArchive write: {err}")
+    if names is None:
+        return columns
+    return {name: columns[name] for name in [COL_TIME] + names}
+
+
+def _columnsToResult(
+        columns: Dict[str, np.ndarray],
+        logger: Optional[logging.Logger] = None, logger_debug: bool = False
+) -> Tuple[int, Optional[pd.DataFrame]]:
+    """ 列データ(測定時刻はエポック秒)からローダーの戻り値を生成する """
+    rec_count: int = len(columns[COL_TIME])
+    if rec_count == 0:
+        return rec_count, None
+
+    df: pd.DataFrame = epochColumnsToDataFrame(columns)
+    if logger is not None and logger_debug:
+        logger.debug(f"{df}")
+    return rec_count, df
 
 
 def loadTodayDataFrame(
-        conn: connection, device_name: str, today_iso8601: str,
+        conn: Optional[connection], device_id: int, today_iso8601: str,
         logger: Optional[Optional[logging.Logger]] = None,
-        logger_debug: bool = False
+        logger_debug: bool = False,
+        current_cache: Optional[CurrentFrameCache] = None,
+        series_store: Optional[SeriesStore] = None
 ) -> Tuple[int, Optional[pd.DataFrame]]:
     """
     当日の観測データのDataFrameを取得
-    :param conn: psycopg2 connection
-    :param device_name: デバイス名
+    :param conn: psycopg2 connection ※series_store 指定時は未使用 (None可)
+    :param device_id: デバイスID
     :param today_iso8601: 当日(最終登録日) ※ISO8601形式の文字列
     :param logger: app_logger
     :param logger_debug: デバック出力可否 default False
+    :param current_cache: 当日・当月の差分更新キャッシュ ※None なら毎回全件取得する
+    :param series_store: インメモリ列ストア ※指定時はデータベースを参照しない
     :return: レコード有り(件数, DataFrame), レコード無し(0, None)
     """
-    dao: WeatherDao = WeatherDao(conn, logger=logger)
-    data_list: List[Tuple[str, float, float, float, float]] = dao.getTodayData(
-        device_name, today_iso8601
+    if series_store is not None:
+        return _columnsToResult(
+            series_store.get_day(device_id, today_iso8601), logger, logger_debug)
+
+    dao: WeatherDao = WeatherDao(conn, logger=logger, time_type=TimeColumnType.EPOCH)
+    if current_cache is not None:
+        # 取得済みの最終測定時刻より後のデータのみ取得して追加する
+        exclude_date: str = addDayToString(today_iso8601)
+        columns: Dict[str, np.ndarray] = current_cache.get_columns(
+            FRAME_KIND_TODAY, device_id, today_iso8601,
+            lambda: dao.getFromToRangeColumns(device_id, today_iso8601, today_iso8601),
+            lambda after_time: dao.getColumnsAfter(device_id, after_time, exclude_date)
+        )
+        return _columnsToResult(columns, logger, logger_debug)
+
+    data_list: List[Tuple[MeasurementTime, float, float, float, float]] = dao.getTodayData(
+        device_id, today_iso8601
     )
     rec_count: int = len(data_list)
     if rec_count == 0:
         # 該当レコード無し
         return rec_count, None
 
-    csv_buffer: StringIO = _csvToStringIO(data_list)
-    df: pd.DataFrame = pd.read_csv(csv_buffer, header=0, parse_dates=[COL_TIME])
     # 測定時刻をデータフレームのインデックスに設定
-    df.index = df[COL_TIME]
+    df: pd.DataFrame = rowsToDataFrame(data_list, COLUMNS)
     if logger is not None and logger_debug:
         logger.debug(f"{df}")
     return rec_count, df
 
 
 def loadMonthDataFrame(
-        conn: connection, device_name: str, year_month: str,
-        logger: Optional[logging.Logger] = None, logger_debug: bool = False
+        conn: Optional[connection], device_id: int, year_month: str,
+        logger: Optional[logging.Logger] = None, logger_debug: bool = False,
+        frame_cache: Optional[MonthFrameCache] = None,
+        current_cache: Optional[CurrentFrameCache] = None,
+        series_store: Optional[SeriesStore] = None,
+        month_archive: Optional[MonthArchive] = None
 ) -> Tuple[int, Optional[pd.DataFrame]]:
     """
     指定された検索年月の観測データのDataFrameを取得
-    :param conn: psycopg2 connection
-    :param device_name: デバイス名
+    :param conn: psycopg2 connection ※series_store 指定時は未使用 (None可)
+    :param device_id: デバイスID
     :param year_month: 検索年月
     :param logger: app_logger
     :param logger_debug: デバック出力可否 default False
+    :param frame_cache: 確定済み年月のDataFrameキャッシュ ※None ならキャッシュしない
+    :param current_cache: 当日・当月の差分更新キャッシュ ※当月以降の年月のみ使用
+    :param series_store: インメモリ列ストア ※指定時はデータベースを参照しない
+    :param month_archive: 確定済み年月のアーカイブ ※None ならデータベースから取得する
     :return: レコード有り(件数, DataFrame)、レコード無し(0, None)
     """
-    dao: WeatherDao = WeatherDao(conn, logger=logger)
-    data_list: List[Tuple[str, float, float, float, float]] = dao.getMonthData(
-        device_name, year_month
-    )
-    rec_count: int = len(data_list)
-    if rec_count == 0:
-        return rec_count, None
+    if series_store is not None:
+        return _columnsToResult(
+            series_store.get_month(device_id, year_month), logger, logger_debug)
+
+    if current_cache is not None and not isClosedMonth(year_month):
+        # 当月は取得済みの最終測定時刻より後のデータのみ取得して追加する
+        month_dao: WeatherDao = WeatherDao(conn, logger=logger)
+        exclude_date: str = nextYearMonth(f"{year_month}-01")
+        columns: Dict[str, np.ndarray] = current_cache.get_columns(
+            FRAME_KIND_MONTH, device_id, year_month,
+            lambda: month_dao.getMonthColumns(device_id, year_month),
+            lambda after_time: month_dao.getColumnsAfter(device_id, after_time, exclude_date)
+        )
+        return _columnsToResult(columns, logger, logger_debug)
+
+    def load() -> Optional[pd.DataFrame]:
+        columns: Dict[str, np.ndarray]
+        if month_archive is not None:
+            columns = loadArchivedMonthColumns(
+                conn, device_id, year_month, month_archive, logger=logger)
+        else:
+            dao: WeatherDao = WeatherDao(conn, logger=logger)
+            # 月間データは件数が多いので COPY BINARY で一括取得する
+            columns = dao.getMonthColumns(device_id, year_month)
+        if len(columns[COL_TIME]) == 0:
+            return None
+
+        return epochColumnsToDataFrame(columns)
+
+    df: Optional[pd.DataFrame]
+    if frame_cache is not None:
+        df = frame_cache.get_or_load(FRAME_KIND_MONTH, device_id, year_month, load)
+    else:
+        df = load()
+    if df is None:
+        return 0, None
 
-    csv_buffer: StringIO = _csvToStringIO(data_list)
-    df: pd.DataFrame = pd.read_csv(csv_buffer, header=0, parse_dates=[COL_TIME])
-    df.index = df[COL_TIME]
     if logger is not None and logger_debug:
         logger.debug(f"{df}")
-    return rec_count, df
+    return len(df), df
 
 
 def loadBeforeDaysRangeDataFrame(
-        conn: connection, device_name: str, end_date: str, before_days: int,
-        logger: Optional[logging.Logger] = None, logger_debug: bool = False
+        conn: Optional[connection], device_id: int, end_date: str, before_days: int,
+        logger: Optional[logging.Logger] = None, logger_debug: bool = False,
+        itersize: int = DEFAULT_ITERSIZE,
+        series_store: Optional[SeriesStore] = None
 ) -> Tuple[int, Optional[pd.DataFrame]]:
     """
     指定された期間の観測データのDataFrameを取得
-    :param conn: psycopg2 connection
-    :param device_name: デバイス名
+    ※件数を取得して配列を確保し, サーバーサイドカーソルで itersize 件ずつ取得して格納する
+    :param conn: psycopg2 connection ※series_store 指定時は未使用 (None可)
+    :param device_id: デバイスID
     :param end_date: 検索終了日 ※ISO8601形式文字列
     :param before_days: N日 ※検索終了日からN日以前
     :param logger: app_logger
     :param logger_debug: デバック出力可否 default False
+    :param itersize: サーバーサイドカーソルの1回あたりの取得件数
+    :param series_store: インメモリ列ストア ※指定時はデータベースを参照しない
     :return: レコード有り(件数, DataFrame)、レコード無し(0, None)
     """
     dt_end: datetime = datetime.strptime(end_date, FMT_ISO8601)
@@ -116,18 +305,45 @@ def loadBeforeDaysRangeDataFrame(
     to_date: str = dt_end.strftime(FMT_ISO8601)
     if logger is not None and logger_debug:
         logger.debug(f"from_date: {from_date}, to_date: {to_date}")
+    if series_store is not None:
+        return _columnsToResult(
+            series_store.get_range(device_id, from_date, addDayToString(to_date)),
+            logger, logger_debug)
 
     dao: WeatherDao = WeatherDao(conn, logger=logger)
-    data_list: List[Tuple[str, float, float, float, float]] = dao.getFromToRangeData(
-        device_name, from_date, to_date
-    )
-    rec_count: int = len(data_list)
-    if rec_count == 0:
-        return rec_count, None
+    # 件数を先に取得し, 最終的なDataFrameの配列を確保してチャンクごとに直接格納する
+    capacity: int = dao.getFromToRangeCount(device_id, from_date, to_date)
+    if capacity == 0:
+        return 0, None
 
-    csv_buffer: StringIO = _csvToStringIO(data_list)
-    df: pd.DataFrame = pd.read_csv(csv_buffer, header=0, parse_dates=[COL_TIME])
-    df.index = df[COL_TIME]
+    names: List[str] = COLUMNS[1:]
+    times: np.ndarray = np.empty(capacity, dtype=np.int64)
+    block: np.ndarray = np.empty((len(names), capacity), dtype=np.float32)
+    filled: int = 0
+    chunk: Dict[str, np.ndarray]
+    for chunk in dao.iterFromToRangeData(device_id, from_date, to_date, itersize=itersize):
+        size: int = len(chunk[COL_TIME])
+        if filled + size > capacity:
+            # 件数取得後に登録されたデータ分を拡張する ※通常は発生しない
+            capacity = filled + size
+            times = np.resize(times, capacity)
+            block = np.concatenate(
+                [block[:, :filled], np.empty((len(names), capacity - filled), dtype=np.float32)],
+                axis=1
+            )
+        times[filled:filled + size] = chunk[COL_TIME]
+        for row, name in enumerate(names):
+            block[row, filled:filled + size] = chunk[name]
+        filled += size
+    if filled == 0:
+        return 0, None
+
+    # エポック秒をその場でナノ秒に変換してdatetime64[ns]として参照する
+    epoch_ns: np.ndarray = times[:filled]
+    np.multiply(epoch_ns, 1_000_000_000, out=epoch_ns)
+    df: pd.DataFrame = blockToDataFrame(
+        pd.DatetimeIndex(epoch_ns.view("datetime64[ns]")), names, block[:, :filled]
+    )
     if logger is not None and logger_debug:
         logger.debug(f"{df}")
-    return rec_count, df
+    return filled, df
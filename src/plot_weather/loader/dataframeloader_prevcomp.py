@@ -1,15 +1,18 @@
 import logging
-from io import StringIO
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from psycopg2.extensions import connection
 
+import numpy as np
 import pandas as pd
 from pandas.core.frame import DataFrame
 
 from .dataframeloader import (
-    COL_TIME, COL_TEMP_OUT, COL_HUMID, COL_PRESSURE
+    COL_TIME, epochColumnsToDataFrame, loadArchivedMonthColumns
 )
+from plot_weather.cache.montharchive import MonthArchive
+from plot_weather.cache.monthframe import MonthFrameCache
+from plot_weather.cache.seriesstore import SeriesStore
 from plot_weather.dao.weatherdao_prevcomp import WeatherPrevCompDao
 
 from plot_weather.util.date_util import toPreviousYearMonth
@@ -19,73 +22,90 @@ from plot_weather.util.date_util import toPreviousYearMonth
 ※室内気温は未使用
 """
 
-# 取得カラム: 測定時刻,外気温,湿度,気圧
-HEADER: str = f'"{COL_TIME}","{COL_TEMP_OUT}","{COL_HUMID}","{COL_PRESSURE}"'
-
-
-def _csvToStringIO(
-        tuple_list: List[Tuple[str, float, float, float]]) -> StringIO:
-    str_buffer = StringIO()
-    str_buffer.write(HEADER + "\n")
-
-    for (m_time, temp_out, humid, pressure) in tuple_list:
-        line = f'"{m_time}",{temp_out},{humid},{pressure}\n'
-        str_buffer.write(line)
-
-    # StringIO need Set first position
-    str_buffer.seek(0)
-    return str_buffer
+# 年月DataFrameキャッシュのロード種別 ※室内気温を除く
+FRAME_KIND_PREVCOMP: str = "prevcomp"
+# インメモリ列ストア・年月アーカイブから取得する測定値カラム ※室内気温を除く
+STORE_COLUMNS: List[str] = ["temp_out", "humid", "pressure"]
 
 
 def _load_dataframe(
-        dao: WeatherPrevCompDao, device_name: str, year_month: str,
-        logger: Optional[logging.Logger] = None, log_debug: bool = False
+        dao: Optional[WeatherPrevCompDao], device_id: int, year_month: str,
+        logger: Optional[logging.Logger] = None, log_debug: bool = False,
+        frame_cache: Optional[MonthFrameCache] = None,
+        series_store: Optional[SeriesStore] = None,
+        month_archive: Optional[MonthArchive] = None
 ) -> Tuple[int, Optional[pd.DataFrame]]:
     """
     指定された検索年月の観測データのDataFrameを取得 ※室内気温を除く
-    :param dao: WeatherPrevCompDao
-    :param device_name: デバイス名
+    :param dao: WeatherPrevCompDao ※series_store 指定時は未使用 (None可)
+    :param device_id: デバイスID
     :param year_month: 今年の年月
     :param logger: アプリロガー
     :param log_debug: デバック出力可否 default False
+    :param frame_cache: 確定済み年月のDataFrameキャッシュ ※None ならキャッシュしない
+    :param series_store: インメモリ列ストア ※指定時はデータベースを参照しない
+    :param month_archive: 確定済み年月のアーカイブ ※None ならデータベースから取得する
     :return: レコード有り(件数, DataFrame), レコード無し(0, None)
     """
-    data_list: List[Tuple[str, float, float, float]] = dao.getMonthData(
-        device_name, year_month
-    )
-    rec_count: int = len(data_list)
-    if rec_count == 0:
-        return rec_count, None
+    def load() -> Optional[pd.DataFrame]:
+        columns: Dict[str, np.ndarray]
+        if series_store is not None:
+            columns = series_store.get_month(device_id, year_month, names=STORE_COLUMNS)
+        elif month_archive is not None:
+            columns = loadArchivedMonthColumns(
+                dao.conn, device_id, year_month, month_archive, names=STORE_COLUMNS,
+                logger=logger)
+        else:
+            # COPY BINARY で一括取得する
+            columns = dao.getMonthColumns(device_id, year_month)
+        if len(columns[COL_TIME]) == 0:
+            return None
+
+        return epochColumnsToDataFrame(columns)
+
+    df: Optional[pd.DataFrame]
+    if frame_cache is not None and series_store is None:
+        df = frame_cache.get_or_load(FRAME_KIND_PREVCOMP, device_id, year_month, load)
+    else:
+        df = load()
+    if df is None:
+        return 0, None
 
-    csv_buffer: StringIO = _csvToStringIO(data_list)
-    df: pd.DataFrame = pd.read_csv(csv_buffer, header=0, parse_dates=[COL_TIME])
-    df.index = df[COL_TIME]
     if logger is not None and log_debug:
         logger.debug(f"{df}")
-    return rec_count, df
+    return len(df), df
 
 
 def loadPrevCompDataFrames(
-        conn: connection, device_name: str, year_month,
-        logger: Optional[logging.Logger] = None, logger_debug: bool = False
+        conn: Optional[connection], device_id: int, year_month,
+        logger: Optional[logging.Logger] = None, logger_debug: bool = False,
+        frame_cache: Optional[MonthFrameCache] = None,
+        series_store: Optional[SeriesStore] = None,
+        month_archive: Optional[MonthArchive] = None
 ) -> Tuple[Optional[DataFrame], Optional[DataFrame]]:
     """
     指定された年月の気象データのDataFrameを取得する
-    :param conn: psycopg2.connection
-    :param device_name: デバイス名
+    :param conn: psycopg2.connection ※series_store 指定時は未使用 (None可)
+    :param device_id: デバイスID
     :param year_month: 検索年月
     :param logger: app_logger
     :param logger_debug: デバック出力可否 default False
+    :param frame_cache: 確定済み年月のDataFrameキャッシュ ※None ならキャッシュしない
+    :param series_store: インメモリ列ストア ※指定時はデータベースを参照しない
+    :param month_archive: 確定済み年月のアーカイブ ※None ならデータベースから取得する
     :return: レコードあり(今年DataFrame, 前年のDataFrame, 前年月)
      レコードなし (None, None)
     """
-    dao = WeatherPrevCompDao(conn, logger=logger)
+    dao: Optional[WeatherPrevCompDao] = None
+    if series_store is None:
+        dao = WeatherPrevCompDao(conn, logger=logger)
     try:
         rec_count: int
         df_curr: Optional[DataFrame]
         # 今年の年月テータ取得
         rec_count, df_curr = _load_dataframe(
-            dao, device_name, year_month, logger=logger, log_debug=logger_debug)
+            dao, device_id, year_month, logger=logger, log_debug=logger_debug,
+            frame_cache=frame_cache, series_store=series_store, month_archive=month_archive)
         if rec_count == 0:
             return None, None
 
@@ -93,7 +113,8 @@ def loadPrevCompDataFrames(
         # 前年計算
         prev_year_month: str = toPreviousYearMonth(year_month)
         rec_count, df_prev = _load_dataframe(
-            dao, device_name, prev_year_month, logger=logger, log_debug=logger_debug)
+            dao, device_id, prev_year_month, logger=logger, log_debug=logger_debug,
+            frame_cache=frame_cache, series_store=series_store, month_archive=month_archive)
         if rec_count > 0:
             return df_curr, df_prev
         else:
@@ -1,14 +1,13 @@
 import logging
 from dataclasses import dataclass
-from datetime import datetime
 from typing import Optional
 
 import numpy as np
 import pandas as pd
 from pandas.core.frame import DataFrame
-from pandas.core.series import Series
 
-from .dataframeloader import COL_TIME, COL_TEMP_OUT
+from .dataframeloader import COL_TEMP_OUT
+from .statkernel import Occurrence, ValueStat, valueStat
 
 """
 外気温統計情報計算モジュール for pandas
@@ -38,41 +37,42 @@ class TempOutStat:
 
 
 def get_temp_out_stat(df_desc: DataFrame,
-                      logger: Optional[logging.Logger] = None, logger_debug=False
+                      logger: Optional[logging.Logger] = None, logger_debug=False,
+                      occurrence: Occurrence = Occurrence.FIRST
                       ) -> TempOutStat:
-    """ 外気温の統計情報 ([最低気温|最高気温] の気温とその出現時刻) を取得する """
+    """
+    外気温の統計情報 ([最低気温|最高気温] の気温とその出現時刻) を取得する
+    :param df_desc: 観測データのDataFrame
+    :param logger: app_logger
+    :param logger_debug: デバック出力可否 default False
+    :param occurrence: 最低・最高気温が複数ある場合の出現時刻 ※デフォルトは先頭のレコード
+    :return: TempOutStat
+    :raise ValueError: 外気温が全て欠測
+    """
 
-    def get_measurement_time(pd_timestamp: pd.Timestamp) -> str:
-        py_datetime: datetime = pd_timestamp.to_pydatetime()
+    def get_measurement_time(index: int) -> str:
+        pd_timestamp: pd.Timestamp = pd.Timestamp(times[index])
         # 時刻部分は "時:分"までとする
-        return py_datetime.strftime("%Y-%m-%d %H:%M")
+        return pd_timestamp.strftime("%Y-%m-%d %H:%M")
+
+    # 測定時刻インデックスと外気温列の配列 ※DataFrameのコピーは生成しない
+    times: np.ndarray = df_desc.index.to_numpy()
+    stat: Optional[ValueStat] = valueStat(df_desc[COL_TEMP_OUT].to_numpy(), occurrence)
+    if stat is None:
+        raise ValueError(f"{COL_TEMP_OUT} has no values")
 
-    # 外気温列
-    temp_out_ser: Series = df_desc[COL_TEMP_OUT]
-    # 外気温列から最低・最高・平均気温を取得
-    min_temper: np.float64 = temp_out_ser.min()
-    max_temper: np.float64 = temp_out_ser.max()
-    avg_temper: np.float64 = temp_out_ser.mean()
-    # 全ての最低気温を取得する
-    df_min_all: DataFrame = df_desc[temp_out_ser <= min_temper]
-    # 全ての最高気温を取得する
-    df_max_all: pd.DataFrame = df_desc[temp_out_ser >= max_temper]
     if logger is not None and logger_debug:
-        logger.debug(f"df_min_all:\n{df_min_all}")
-        logger.debug(f"df_max_all:\n{df_max_all}")
-    # それぞれ直近の１レコードのみ取得
-    min_first: Series = df_min_all.iloc[0]
-    max_first: Series = df_max_all.iloc[0]
+        logger.debug(f"temp_out stat: {stat}")
     # 最低気温情報
-    min_measurement_datetime: str = get_measurement_time(min_first[COL_TIME])
+    min_measurement_datetime: str = get_measurement_time(stat.min_index)
     #   測定日は先頭 10桁分(年月日)
     measurement_day: str = min_measurement_datetime[:10]
-    temp_out_min: TempOut = TempOut(min_measurement_datetime, float(min_first[COL_TEMP_OUT]))
+    temp_out_min: TempOut = TempOut(min_measurement_datetime, stat.min_value)
     # 最高気温情報
-    max_measurement_datetime: str = get_measurement_time(max_first[COL_TIME])
-    temp_out_max: TempOut = TempOut(max_measurement_datetime, float(max_first[COL_TEMP_OUT]))
+    max_measurement_datetime: str = get_measurement_time(stat.max_index)
+    temp_out_max: TempOut = TempOut(max_measurement_datetime, stat.max_value)
     # 平均気温は小数点第一位に四捨五入した値を設定
     return TempOutStat(
-        measurement_day, average_temper=round(avg_temper, 1),
+        measurement_day, average_temper=round(stat.mean, 1),
         min=temp_out_min, max=temp_out_max
-    )
\ No newline at end of file
+    )
@@ -0,0 +1,76 @@
+import enum
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+"""
+測定値の統計情報計算カーネル (最小値・最大値とその位置, 平均値)
+[使用箇所] pandas_statistics, windowfunc_statistics
+[仕様]
+ (1) 測定値の配列を直接参照し, DataFrameのコピーやマスク済みDataFrameを生成しない
+ (2) 欠測(NaN)は除外する ※全て欠測なら None
+ (3) 最小値・最大値が複数ある場合は配列の先頭側(FIRST)または末尾側(LAST)の位置を返す
+     ※配列が測定時刻の昇順なら LAST が直近
+"""
+
+
+class Occurrence(enum.Enum):
+    """ 最小値・最大値が複数ある場合に採用する位置 """
+    # 配列の先頭側
+    FIRST = 0
+    # 配列の末尾側
+    LAST = 1
+
+
+@dataclass(frozen=True)
+class ValueStat:
+    """ 測定値の統計情報 """
+    # 最小値とその位置
+    min_value: float
+    min_index: int
+    # 最大値とその位置
+    max_value: float
+    max_index: int
+    # 平均値 ※丸めなし
+    mean: float
+    # 欠測を除く件数
+    count: int
+
+
+def _argExtreme(values: np.ndarray, occurrence: Occurrence, use_max: bool) -> int:
+    arg_func = np.argmax if use_max else np.argmin
+    if occurrence == Occurrence.FIRST:
+        return int(arg_func(values))
+    # 逆順のビューで先頭側を探す ※コピーなし
+    return len(values) - 1 - int(arg_func(values[::-1]))
+
+
+def valueStat(values, occurrence: Occurrence = Occurrence.FIRST) -> Optional[ValueStat]:
+    """
+    測定値の最小値・最大値とその位置, 平均値を取得する
+    :param values: 測定値の配列 (float32|float64, Series可)
+    :param occurrence: 最小値・最大値が複数ある場合に採用する位置
+    :return: ValueStat, 有効な測定値がない場合は None
+    """
+    arr: np.ndarray = np.asarray(values)
+    valid: np.ndarray = ~np.isnan(arr)
+    count: int = int(np.count_nonzero(valid))
+    if count == 0:
+        return None
+
+    low: np.ndarray = arr
+    high: np.ndarray = arr
+    if count < len(arr):
+        # 欠測は最小値・最大値の候補にならない値に置き換える
+        low = np.where(valid, arr, np.inf)
+        high = np.where(valid, arr, -np.inf)
+    min_index: int = _argExtreme(low, occurrence, use_max=False)
+    max_index: int = _argExtreme(high, occurrence, use_max=True)
+    # float32 でも合計は float64 で計算する
+    total: float = float(np.sum(arr, where=valid, dtype=np.float64))
+    return ValueStat(
+        min_value=float(arr[min_index]), min_index=min_index,
+        max_value=float(arr[max_index]), max_index=max_index,
+        mean=total / count, count=count
+    )
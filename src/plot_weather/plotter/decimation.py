@@ -0,0 +1,68 @@
+from typing import Tuple
+
+import numpy as np
+from matplotlib.figure import Figure
+
+"""
+プロット前の観測データ間引きモジュール (ピクセル列ごとの最小・最大値)
+[仕様]
+ (1) X軸(測定時刻)の範囲を図の幅(ピクセル数)で等分し, 区間ごとに最小値・最大値の点のみ残す
+     ※描画される線の形状と真の最低・最高値は変わらない
+ (2) 区間内に欠測(NaN)があれば最初の欠測点を残す ※線の途切れを維持する
+ (3) 先頭・末尾の点は常に残す
+ (4) 点の数が図の幅の2倍以下なら間引かない
+"""
+
+
+def figureWidthPixels(fig: Figure) -> int:
+    """ 図の幅(ピクセル数) ※プロット領域の幅より大きいので間引きの上限として使う """
+    return int(fig.get_size_inches()[0] * fig.dpi)
+
+
+def _firstIndexPerBin(positions: np.ndarray, bin_ids: np.ndarray) -> np.ndarray:
+    """ 昇順の位置リストから区間ごとに最初の位置を取得する """
+    if len(positions) == 0:
+        return positions
+    _, first = np.unique(bin_ids[positions], return_index=True)
+    return positions[first]
+
+
+def minMaxDecimate(times, values, width_px: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    時系列データをピクセル列ごとの最小・最大値に間引く
+    :param times: 昇順の測定時刻 (datetime64 に変換可能な配列, Series)
+    :param values: 測定値 (times と同じ長さ)
+    :param width_px: 図の幅(ピクセル数)
+    :return: 間引き後の(測定時刻: datetime64[ns], 測定値)
+    """
+    x: np.ndarray = np.asarray(times, dtype="datetime64[ns]")
+    y: np.ndarray = np.asarray(values)
+    size: int = len(y)
+    if width_px <= 0 or size <= 2 * width_px:
+        return x, y
+
+    # 区間番号 ※測定時刻は昇順なので区間番号も昇順
+    x_int: np.ndarray = x.view(np.int64)
+    span: float = float(x_int[-1] - x_int[0])
+    if span <= 0:
+        return x, y
+    pixel: np.ndarray = np.minimum(
+        ((x_int - x_int[0]) * (width_px / span)).astype(np.int64), width_px - 1)
+    # 点が存在する区間のみの連番に変換
+    bin_starts: np.ndarray = np.flatnonzero(np.r_[True, pixel[1:] != pixel[:-1]])
+    bin_ids: np.ndarray = np.cumsum(np.r_[True, pixel[1:] != pixel[:-1]]) - 1
+
+    valid: np.ndarray = ~np.isnan(y)
+    # 区間ごとの最小・最大値 ※全て欠測の区間は NaN
+    with np.errstate(invalid="ignore"):
+        bin_min: np.ndarray = np.fmin.reduceat(y, bin_starts)
+        bin_max: np.ndarray = np.fmax.reduceat(y, bin_starts)
+    min_pos: np.ndarray = _firstIndexPerBin(
+        np.flatnonzero(valid & (y == bin_min[bin_ids])), bin_ids)
+    max_pos: np.ndarray = _firstIndexPerBin(
+        np.flatnonzero(valid & (y == bin_max[bin_ids])), bin_ids)
+    nan_pos: np.ndarray = _firstIndexPerBin(np.flatnonzero(~valid), bin_ids)
+
+    keep: np.ndarray = np.unique(np.concatenate(
+        [[0, size - 1], min_pos, max_pos, nan_pos]).astype(np.int64))
+    return x[keep], y[keep]
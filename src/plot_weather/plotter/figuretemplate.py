@@ -0,0 +1,110 @@
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, Generic, Hashable, Iterator, List, TypeVar
+
+"""
+描画済みの枠組み(Figure, サブプロット, 軸, 凡例など)を再利用するためのテンプレートプール
+[仕様]
+ (1) キーは図のサイズとグラフ種別 ※キーが同じテンプレートはデータの差し替えのみで再利用できる
+ (2) 貸し出し中のテンプレートは他のスレッドに貸し出さない ※なければ新規に生成する
+ (3) 返却されたテンプレートの合計が上限を超えたら最も古く使われたキーのものから破棄する
+ (4) 描画中に例外が発生したテンプレートは状態が不定のため返却せずに破棄する
+"""
+
+T = TypeVar("T")
+
+
+@dataclass
+class FigureTemplateStats:
+    """ テンプレートプールの統計情報 """
+    # 新規に生成した回数
+    created: int = 0
+    # 再利用した回数
+    reused: int = 0
+    # 上限超過または例外で破棄した件数
+    discarded: int = 0
+
+
+class FigureTemplatePool(Generic[T]):
+    def __init__(self, max_idle: int = 8):
+        """
+        :param max_idle: 保持する未使用テンプレートの上限 ※0以下なら再利用しない
+        """
+        self.max_idle: int = max_idle
+        self._lock: threading.Lock = threading.Lock()
+        # キーの使用順 (末尾が最新)
+        self._idle: "OrderedDict[Hashable, List[T]]" = OrderedDict()
+        self._idle_count: int = 0
+        self._stats: FigureTemplateStats = FigureTemplateStats()
+
+    @contextmanager
+    def borrow(self, key: Hashable, factory: Callable[[], T]) -> Iterator[T]:
+        """
+        テンプレートを借りる ※with ブロックを抜けると返却する
+        :param key: 図のサイズとグラフ種別
+        :param factory: テンプレートの生成関数
+        :return: テンプレート
+        """
+        template: T = self._acquire(key, factory)
+        try:
+            yield template
+        except BaseException:
+            with self._lock:
+                self._stats.discarded += 1
+            raise
+        self._release(key, template)
+
+    def _acquire(self, key: Hashable, factory: Callable[[], T]) -> T:
+        with self._lock:
+            templates: List[T] = self._idle.get(key, [])
+            if len(templates) > 0:
+                self._idle_count -= 1
+                self._stats.reused += 1
+                template: T = templates.pop()
+                if len(templates) == 0:
+                    del self._idle[key]
+                return template
+
+            self._stats.created += 1
+        return factory()
+
+    def _release(self, key: Hashable, template: T) -> None:
+        if self.max_idle <= 0:
+            return
+
+        with self._lock:
+            self._idle.setdefault(key, []).append(template)
+            self._idle.move_to_end(key)
+            self._idle_count += 1
+            while self._idle_count > self.max_idle:
+                oldest_key: Hashable = next(iter(self._idle))
+                templates: List[T] = self._idle[oldest_key]
+                templates.pop(0)
+                if len(templates) == 0:
+                    del self._idle[oldest_key]
+                self._idle_count -= 1
+                self._stats.discarded += 1
+
+    def reset(self) -> None:
+        """
+        未使用テンプレート・ロック・統計情報を初期化する
+        ※描画ワーカープロセスの起動時に呼び出す (親プロセスから継承した状態を使わない)
+        """
+        self._lock = threading.Lock()
+        self._idle = OrderedDict()
+        self._idle_count = 0
+        self._stats = FigureTemplateStats()
+
+    def get_stats(self) -> Dict:
+        """
+        統計情報を取得する
+        :return: 統計情報の辞書 ※未使用テンプレート数(idle), キー数(keys), 上限(max_idle)を含む
+        """
+        with self._lock:
+            result: Dict = asdict(self._stats)
+            result["idle"] = self._idle_count
+            result["keys"] = len(self._idle)
+        result["max_idle"] = self.max_idle
+        return result
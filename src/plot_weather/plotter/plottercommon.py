@@ -1,6 +1,10 @@
 import base64
+import hashlib
+import json
 import os
 from io import BytesIO
+
+import matplotlib
 from matplotlib.figure import Figure
 
 import plot_weather.util.file_util as fu
@@ -12,6 +16,25 @@ _base_dir: str = os.path.abspath(os.path.dirname(__file__))
 _conf_path: str = os.path.join(_base_dir, "conf")
 PLOT_CONF = fu.read_json(os.path.join(_conf_path, "plot_weather.json"))
 
+
+def _render_version() -> str:
+    """
+    描画結果の版: プロット設定, 描画モジュールのソース, matplotlibのバージョンのハッシュ
+    ※デプロイ・プロット設定の変更で変わる
+    """
+    digest = hashlib.sha1()
+    digest.update(json.dumps(PLOT_CONF, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    for name in sorted(os.listdir(_base_dir)):
+        if name.endswith(".py"):
+            with open(os.path.join(_base_dir, name), "rb") as fp:
+                digest.update(fp.read())
+    digest.update(matplotlib.__version__.encode("ascii"))
+    return digest.hexdigest()[:16]
+
+
+# 描画結果の版 ※画像のETagに含める
+RENDER_VERSION: str = _render_version()
+
 # フィールド定義
 # pandas.DataFrameのインデックス列
 # 共通ラベル
@@ -23,6 +46,30 @@ Y_LABEL_TEMP_OUT: str = '外気温 (℃)'
 
 
 
+def convert_png_bytes(fig: Figure, logger=None, log_debug=False) -> bytes:
+    """
+    プロット(Figure)オブジェクトのPNG画像を取得する
+    :param fig: Figure
+    :param logger: app_logger
+    :param log_debug: デバック出力可否
+    :return: PNG画像のバイト列
+    """
+    buf = BytesIO()
+    fig.savefig(buf, format="png", bbox_inches="tight")
+    if logger is not None and log_debug:
+        logger.debug(f"png.len: {buf.tell()}")
+    return buf.getvalue()
+
+
+def png_to_html_image_src(png: bytes) -> str:
+    """
+    PNG画像をHTMLのimg要素のsrc(base64エンコード文字列)に変換する
+    :param png: PNG画像のバイト列
+    :return: 画像のbase64エンコード文字列
+    """
+    return "data:image/png;base64," + base64.b64encode(png).decode("ascii")
+
+
 def convert_html_image_src(fig: Figure, logger=None, log_debug=False) -> str:
     """
     プロット(Figure)オブジェクトのbase64エンコードを取得する
@@ -31,9 +78,7 @@ def convert_html_image_src(fig: Figure, logger=None, log_debug=False) -> str:
     :param log_debug: デバック出力可否
     :return: 画像のbase64エンコード文字列
     """
-    buf = BytesIO()
-    fig.savefig(buf, format="png", bbox_inches="tight")
-    data = base64.b64encode(buf.getbuffer()).decode("ascii")
+    data = png_to_html_image_src(convert_png_bytes(fig, logger=logger, log_debug=log_debug))
     if logger is not None and log_debug:
         logger.debug(f"data.len: {len(data)}")
-    return "data:image/png;base64," + data
+    return data
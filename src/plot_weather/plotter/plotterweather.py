@@ -2,7 +2,7 @@ import enum
 import logging
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Union
+from typing import Dict, List, Optional, Tuple, Union
 
 from pandas.core.frame import DataFrame
 
@@ -16,13 +16,15 @@ from matplotlib.patches import Patch
 from matplotlib.text import Text
 from matplotlib.pyplot import setp
 
+from .decimation import figureWidthPixels, minMaxDecimate
+from .figuretemplate import FigureTemplatePool
 from .plottercommon import (
     PLOT_CONF, Y_LABEL_TEMP, Y_LABEL_HUMID, Y_LABEL_PRESSURE,
-    convert_html_image_src
+    convert_png_bytes, png_to_html_image_src
 )
 from plot_weather.loader.pandas_statistics import TempOutStat, get_temp_out_stat
 from plot_weather.loader.dataframeloader import (
-    COL_TIME, COL_TEMP_OUT, COL_TEMP_IN, COL_HUMID, COL_PRESSURE,
+    COL_TEMP_OUT, COL_TEMP_IN, COL_HUMID, COL_PRESSURE,
 )
 from plot_weather.util.date_util import (
     FMT_ISO8601, FMT_DATETIME, JP_WEEK_DAY_NAMES
@@ -160,112 +162,6 @@ def _set_x_axis_format(
             )
 
 
-def _temperature_plotting(
-        ax: Axes, df: DataFrame, title_date: str,
-        plot_date_type: PlotDateType, temp_out_stat: TempOutStat
-) -> None:
-    """
-    温度サブプロット(axes)にタイトル、軸・軸ラベルを設定し、
-    DataFrameオプジェクトの外気温・室内気温データをプロットする
-    :param ax:温度サブプロット(axes)
-    :param df:DataFrameオプジェクト
-    :param title_date: タイトル ※日付
-    :param plot_date_type: PlotDateType
-    :param temp_out_stat: 外気温統計情報
-    """
-    def make_patch(
-            label: str, appear_time: Optional[str], temper: float, s_color: str
-    ) -> Patch:
-        """ 指定されたラベルと外気温統計の凡例を生成 """
-        if appear_time is not None:
-            patch_label: str = f"{label} {temper:4.1f}℃ [{appear_time}]"
-        else:
-            # 出現時刻がない場合は平均値
-            patch_label: str = f"{label} {temper:4.1f}℃"
-        return Patch(color=s_color, label=patch_label)
-
-    def plot_horizontal_line(
-            axes: Axes, temper: float, s_color: str, linestyle: Optional[str] = None
-    ):
-        """ 指定された統計情報の外気温の横線を生成する """
-        line_style: str = "dashed" if linestyle is None else linestyle
-        axes.axhline(temper, color=s_color, linestyle=line_style, linewidth=1.)
-
-    # 外気温・室内気温のプロット
-    #  Y軸ラベルフォント
-    label_font_size: int = PLOT_CONF["label.sizes"][0]
-    # 凡例フォント
-    legend_font_size: int = PLOT_CONF["legend-fontsize"]
-    # {list: 1} [<matplotlib.lines.Line2D object at オブジェクトアドレス>]
-    plot_temp_out_list: List[Line2D] = ax.plot(df[COL_TIME], df[COL_TEMP_OUT],
-                                               color="blue", marker="", label="外気温")
-    plot_temp_in_list: List[Line2D] = ax.plot(df[COL_TIME], df[COL_TEMP_IN],
-                                              color="red", marker="", label="室内気温")
-    ax.set_ylim(PLOT_CONF["ylim"]["temp"])
-    ax.set_ylabel(Y_LABEL_TEMP, fontsize=label_font_size)
-    ax.set_title(f"気象データ：{title_date}")
-    # Hide xlabel
-    ax.label_outer()
-    # 外気温・室内気温の凡例: 常に左上端
-    #  当日なら凡例のPatchに日付部分がないのでカラムを1行に2列とする, 期間なら 2行1列
-    first_legend: Legend = ax.legend(
-        handles=[plot_temp_out_list[0], plot_temp_in_list[0]],
-        ncol=(2 if plot_date_type == plot_date_type.TODAY else 1),
-        loc="upper left"
-    )
-    text: Text
-    for text in first_legend.get_texts():
-        # フォントサイズ設定
-        text.set_fontsize(str(legend_font_size))
-    ax.add_artist(first_legend)
-
-    # 外気温統計情報を追加
-    # 凡例に追加する最低・最高・平均気温の統計情報(Patch)を生成する
-    # 出現時刻は日付データ型に応じて
-    min_appear_time: str
-    max_appear_time: str
-    if plot_date_type == PlotDateType.TODAY:
-        # 当日データの場合: 時分秒
-        min_appear_time = temp_out_stat.min.appear_time[11:]
-        max_appear_time = temp_out_stat.max.appear_time[11:]
-    else:
-        # 当日データ以外の場合: 年月日 + 時分秒
-        min_appear_time = temp_out_stat.min.appear_time
-        max_appear_time = temp_out_stat.max.appear_time
-    mim_temper_patch: Patch = make_patch(
-        "最低", min_appear_time, temp_out_stat.min.temper, COLOR_MIN_TEMPER
-    )
-    max_temper_patch: Patch = make_patch(
-        "最高", max_appear_time, temp_out_stat.max.temper, COLOR_MAX_TEMPER
-    )
-    avg_temper_patch: Patch = make_patch(
-        "平均", None, temp_out_stat.average_temper, COLOR_AVG_TEMPER
-    )
-    # 最低気温の横線
-    plot_horizontal_line(ax, temp_out_stat.min.temper, COLOR_MIN_TEMPER)
-    # 最高気温の横線
-    plot_horizontal_line(ax, temp_out_stat.max.temper, COLOR_MAX_TEMPER)
-    # 平均気温の横線
-    #  最低気温と最高気温の差が既定値以下なら平均線を出力しない ※線が接近して非常に見づらい
-    appear_threthold: float = PLOT_CONF["appear_avg_line.threthold_diff_temper"]
-    diff_temper: float = abs(temp_out_stat.max.temper - temp_out_stat.min.temper)
-    if diff_temper > appear_threthold:
-        # しきい値より大きかったら出力
-        plot_horizontal_line(
-            ax, temp_out_stat.average_temper, COLOR_AVG_TEMPER, linestyle="dashdot"
-        )
-    # Create TempOutStat legend
-    stat_legend: Legend = ax.legend(
-        handles=[mim_temper_patch, max_temper_patch, avg_temper_patch],
-        title="外気温統計",
-        loc="best"
-    )
-    # 統計情報は日本語固定フォントを設定
-    for text in stat_legend.get_texts():
-        text.set_fontfamily("monospace")
-        text.set_fontsize(str(legend_font_size))
-
-
 def gen_figure(phone_size: str = None, logger=None, log_debug=False) -> Figure:
     """
     リクエスト端末に応じたサイズのプロット領域枠(Figure)を生成する
@@ -301,6 +197,203 @@ def gen_figure(phone_size: str = None, logger=None, log_debug=False) -> Figure:
     return fig
 
 
+def _stat_patch_label(label: str, appear_time: Optional[str], temper: float) -> str:
+    """ 指定されたラベルと外気温統計の凡例の文字列を生成 """
+    if appear_time is not None:
+        return f"{label} {temper:4.1f}℃ [{appear_time}]"
+    # 出現時刻がない場合は平均値
+    return f"{label} {temper:4.1f}℃"
+
+
+class WeatherFigure:
+    """
+    観測データのグラフの枠組み(Figure, サブプロット, 軸, 凡例, 統計情報の横線)
+    生成時にデータに依存しない設定を全て済ませ, update() ではデータと統計情報のみ差し替える
+    ※同じ図のサイズ・グラフ種別の描画で再利用する
+    """
+
+    def __init__(
+            self, plot_param: PlotParam, phone_image_size: Optional[str] = None,
+            logger: Optional[logging.Logger] = None, log_debug: bool = False
+    ):
+        """
+        :param plot_param: PlotParam ※グラフ種別(日付データ型, N日前)のみ参照する
+        :param phone_image_size: スマホの場合は表示領域サイズ情報
+        :param logger: app_logger
+        :param log_debug: DEBUG出力するかどうか
+        """
+        self.plot_date_type: PlotDateType = plot_param.plote_date_type
+        # 図の生成
+        fig: Figure = gen_figure(phone_image_size, logger=logger, log_debug=log_debug)
+        self.fig: Figure = fig
+        # x軸を共有する3行1列のサブプロット生成
+        ax_temp: Axes
+        ax_humid: Axes
+        ax_pressure: Axes
+        (ax_temp, ax_humid, ax_pressure) = fig.subplots(
+            nrows=3, ncols=1, sharex=True,
+            gridspec_kw={'height_ratios': PLOT_CONF["axes_height_ratio"]}
+        )
+        self.axes: List[Axes] = [ax_temp, ax_humid, ax_pressure]
+        for ax in self.axes:
+            ax.grid(**GRID_STYLES)
+        # X軸は測定時刻 ※データを設定する前に日付の変換・目盛りを有効にする
+        ax_pressure.xaxis_date()
+
+        # 軸ラベルのフォントサイズを設定
+        #  ラベルフォントサイズ, y軸ラベルフォントサイズ, x軸(日付)ラベルフォントサイズ
+        label_font_size: int = PLOT_CONF["label.sizes"][0]
+        y_tick_labels_font_size: int = PLOT_CONF["label.sizes"][1]
+        x_tick_lables_font_size: int = PLOT_CONF["label.sizes"][2]
+        # 気圧プロット領域
+        setp(ax_pressure.get_xticklabels(), fontsize=x_tick_lables_font_size)
+        # 全プロット領域
+        for ax in self.axes:
+            setp(ax.get_yticklabels(), fontsize=y_tick_labels_font_size)
+
+        # 間引き用の図の幅
+        self.width_px: int = figureWidthPixels(fig) \
+            if PLOT_CONF.get("decimation.enabled", True) else 0
+        # 1.外気温と室内気温、外気温統計情報
+        self._init_temperature(ax_temp, label_font_size)
+        # 2.室内湿度
+        self.line_humid: Line2D = ax_humid.plot([], [], color="green", marker="")[0]
+        ax_humid.set_ylim(ymin=0., ymax=100.)
+        ax_humid.set_ylabel(Y_LABEL_HUMID, fontsize=label_font_size)
+        # Hide xlabel
+        ax_pressure.label_outer()
+        # 3.気圧
+        # X軸のフォーマット
+        _set_x_axis_format(ax_pressure, plot_param, x_tick_lables_font_size)
+        self.line_pressure: Line2D = ax_pressure.plot(
+            [], [], color="fuchsia", marker="")[0]
+        ax_pressure.set_ylim(PLOT_CONF["ylim"]["pressure"])
+        ax_pressure.set_ylabel(Y_LABEL_PRESSURE, fontsize=label_font_size)
+
+    def _init_temperature(self, ax: Axes, label_font_size: int) -> None:
+        """
+        温度サブプロット(axes)に軸・軸ラベル, 外気温・室内気温の線と凡例, 外気温統計情報の横線と凡例を設定する
+        :param ax:温度サブプロット(axes)
+        :param label_font_size: Y軸ラベルフォントサイズ
+        """
+        # 凡例フォント
+        legend_font_size: int = PLOT_CONF["legend-fontsize"]
+        self.line_temp_out: Line2D = ax.plot(
+            [], [], color="blue", marker="", label="外気温")[0]
+        self.line_temp_in: Line2D = ax.plot(
+            [], [], color="red", marker="", label="室内気温")[0]
+        ax.set_ylim(PLOT_CONF["ylim"]["temp"])
+        ax.set_ylabel(Y_LABEL_TEMP, fontsize=label_font_size)
+        # Hide xlabel
+        ax.label_outer()
+        # 外気温・室内気温の凡例: 常に左上端
+        #  当日なら凡例のPatchに日付部分がないのでカラムを1行に2列とする, 期間なら 2行1列
+        first_legend: Legend = ax.legend(
+            handles=[self.line_temp_out, self.line_temp_in],
+            ncol=(2 if self.plot_date_type == PlotDateType.TODAY else 1),
+            loc="upper left"
+        )
+        text: Text
+        for text in first_legend.get_texts():
+            # フォントサイズ設定
+            text.set_fontsize(str(legend_font_size))
+        ax.add_artist(first_legend)
+
+        # 外気温統計情報の横線: 最低気温, 最高気温, 平均気温 ※値は update() で設定
+        self.line_min: Line2D = ax.axhline(
+            0., color=COLOR_MIN_TEMPER, linestyle="dashed", linewidth=1.)
+        self.line_max: Line2D = ax.axhline(
+            0., color=COLOR_MAX_TEMPER, linestyle="dashed", linewidth=1.)
+        self.line_avg: Line2D = ax.axhline(
+            0., color=COLOR_AVG_TEMPER, linestyle="dashdot", linewidth=1.)
+        # 外気温統計情報の凡例 ※文字列は update() で設定
+        stat_legend: Legend = ax.legend(
+            handles=[Patch(color=COLOR_MIN_TEMPER, label="最低"),
+                     Patch(color=COLOR_MAX_TEMPER, label="最高"),
+                     Patch(color=COLOR_AVG_TEMPER, label="平均")],
+            title="外気温統計",
+            loc="best"
+        )
+        # 統計情報は日本語固定フォントを設定
+        for text in stat_legend.get_texts():
+            text.set_fontfamily("monospace")
+            text.set_fontsize(str(legend_font_size))
+        self.stat_texts: List[Text] = stat_legend.get_texts()
+
+    def update(self, df: DataFrame, plot_param: PlotParam, temp_out_stat: TempOutStat) -> Figure:
+        """
+        観測データと統計情報を差し替える
+        :param df: DataFrame
+        :param plot_param: PlotParam ※グラフ種別は生成時と同じであること
+        :param temp_out_stat: 外気温統計情報 ※間引く前のデータで計算したもの
+        :return: 観測データをプロットした描画領域
+        """
+        ax_temp: Axes = self.axes[0]
+        ax_pressure: Axes = self.axes[2]
+        # タイトルの日付部分
+        title_date: str = _make_title(
+            plot_param.plote_date_type, plot_param.start_date, plot_param.end_date
+        )
+        ax_temp.set_title(f"気象データ：{title_date}")
+        # 1.外気温と室内気温
+        self.line_temp_out.set_data(
+            *minMaxDecimate(df.index, df[COL_TEMP_OUT], self.width_px))
+        self.line_temp_in.set_data(
+            *minMaxDecimate(df.index, df[COL_TEMP_IN], self.width_px))
+        # 外気温統計情報: 出現時刻は日付データ型に応じて
+        min_appear_time: str
+        max_appear_time: str
+        if plot_param.plote_date_type == PlotDateType.TODAY:
+            # 当日データの場合: 時分秒
+            min_appear_time = temp_out_stat.min.appear_time[11:]
+            max_appear_time = temp_out_stat.max.appear_time[11:]
+        else:
+            # 当日データ以外の場合: 年月日 + 時分秒
+            min_appear_time = temp_out_stat.min.appear_time
+            max_appear_time = temp_out_stat.max.appear_time
+        self.stat_texts[0].set_text(
+            _stat_patch_label("最低", min_appear_time, temp_out_stat.min.temper))
+        self.stat_texts[1].set_text(
+            _stat_patch_label("最高", max_appear_time, temp_out_stat.max.temper))
+        self.stat_texts[2].set_text(
+            _stat_patch_label("平均", None, temp_out_stat.average_temper))
+        self.line_min.set_ydata([temp_out_stat.min.temper] * 2)
+        self.line_max.set_ydata([temp_out_stat.max.temper] * 2)
+        self.line_avg.set_ydata([temp_out_stat.average_temper] * 2)
+        # 平均気温の横線
+        #  最低気温と最高気温の差が既定値以下なら平均線を出力しない ※線が接近して非常に見づらい
+        appear_threthold: float = PLOT_CONF["appear_avg_line.threthold_diff_temper"]
+        diff_temper: float = abs(temp_out_stat.max.temper - temp_out_stat.min.temper)
+        self.line_avg.set_visible(diff_temper > appear_threthold)
+        # 2.室内湿度
+        self.line_humid.set_data(*minMaxDecimate(df.index, df[COL_HUMID], self.width_px))
+        # 3.気圧
+        self.line_pressure.set_data(
+            *minMaxDecimate(df.index, df[COL_PRESSURE], self.width_px))
+        # X軸の範囲
+        if plot_param.plote_date_type == PlotDateType.YEAR_MONTH:
+            # 年月データはデータの範囲から自動設定する
+            for ax in self.axes:
+                ax.relim()
+            ax_pressure.autoscale_view(scalex=True, scaley=False)
+        else:
+            x_tick_lables_font_size: int = PLOT_CONF["label.sizes"][2]
+            _set_x_axis_format(ax_pressure, plot_param, x_tick_lables_font_size)
+        return self.fig
+
+
+def _template_key(plot_param: PlotParam, phone_image_size: Optional[str]) -> Tuple:
+    """ テンプレートのキー: 図のサイズとグラフ種別 ※期間データはN日前でX軸の書式が変わる """
+    return (phone_image_size if phone_image_size is not None else "pc",
+            plot_param.plote_date_type, plot_param.before_days)
+
+
+# 図のサイズ・グラフ種別ごとのテンプレートプール
+figure_template_pool: FigureTemplatePool[WeatherFigure] = FigureTemplatePool(
+    max_idle=PLOT_CONF.get("figure_template.max_idle", 8)
+)
+
+
 def make_graph(
         df: DataFrame,
         plot_param: PlotParam,
@@ -309,7 +402,7 @@ def make_graph(
         log_debug: bool = False
 ) -> Figure:
     """
-    観測データのDataFrameからグラフを生成し描画領域を取得する
+    観測データのDataFrameからグラフを生成し描画領域を取得する ※テンプレートを使わずに毎回生成する
     :param df DataFrame ※必須
     :param plot_param: PlotParam ※必須
     :param phone_image_size: スマホの場合は表示領域サイズ情報
@@ -317,72 +410,29 @@ def make_graph(
     :param log_debug: DEBUG出力するかどうか ※デフォルト False
     :return: 観測データをプロットした描画領域
     """
-    # 図の生成
-    fig: Figure = gen_figure(phone_image_size, logger=logger, log_debug=log_debug)
-    # x軸を共有する3行1列のサブプロット生成
-    ax_temp: Axes
-    ax_humid: Axes
-    ax_pressure: Axes
-    (ax_temp, ax_humid, ax_pressure) = fig.subplots(
-        nrows=3, ncols=1, sharex=True,
-        gridspec_kw={'height_ratios': PLOT_CONF["axes_height_ratio"]}
-    )
-    for ax in [ax_temp, ax_humid, ax_pressure]:
-        ax.grid(**GRID_STYLES)
-
-    # 軸ラベルのフォントサイズを設定
-    #  ラベルフォントサイズ, y軸ラベルフォントサイズ, x軸(日付)ラベルフォントサイズ
-    label_font_size: int = PLOT_CONF["label.sizes"][0]
-    y_tick_labels_font_size: int = PLOT_CONF["label.sizes"][1]
-    x_tick_lables_font_size: int = PLOT_CONF["label.sizes"][2]
-    # 気圧プロット領域
-    setp(ax_pressure.get_xticklabels(), fontsize=x_tick_lables_font_size)
-    # 全プロット領域
-    for ax in [ax_temp, ax_humid, ax_pressure]:
-        setp(ax.get_yticklabels(), fontsize=y_tick_labels_font_size)
-
-    # サブプロットの設定
-    # 外気温統計情報を取得する
+    # 外気温統計情報を取得する ※間引く前のデータで計算する
     temp_out_stat: TempOutStat = get_temp_out_stat(df)
     if logger is not None and log_debug:
         logger.debug(temp_out_stat)
-    # タイトルの日付部分
-    title_date: str = _make_title(
-        plot_param.plote_date_type, plot_param.start_date, plot_param.end_date
+    weather_fig: WeatherFigure = WeatherFigure(
+        plot_param, phone_image_size=phone_image_size, logger=logger, log_debug=log_debug
     )
-    # 1.外気温と室内気温、外気温統計情報
-    _temperature_plotting(
-        ax_temp, df, title_date, plot_param.plote_date_type, temp_out_stat
-    )
-    # 2.室内湿度
-    ax_humid.plot(df[COL_TIME], df[COL_HUMID], color="green", marker="")
-    ax_humid.set_ylim(ymin=0., ymax=100.)
-    ax_humid.set_ylabel(Y_LABEL_HUMID, fontsize=label_font_size)
-    # Hide xlabel
-    ax.label_outer()
-    # 3.気圧
-    # X軸のフォーマット
-    _set_x_axis_format(ax_pressure, plot_param, x_tick_lables_font_size)
-    # 気圧データプロット
-    ax_pressure.plot(df[COL_TIME], df[COL_PRESSURE], color="fuchsia", marker="")
-    ax_pressure.set_ylim(PLOT_CONF["ylim"]["pressure"])
-    ax_pressure.set_ylabel(Y_LABEL_PRESSURE, fontsize=label_font_size)
-    return fig
+    return weather_fig.update(df, plot_param, temp_out_stat)
 
 
-def gen_plot_image(
+def gen_plot_png(
         df: DataFrame,
         plot_param: PlotParam,
         phone_image_size: Optional[str] = None,
         logger: Optional[logging.Logger] = None
-) -> str:
+) -> bytes:
     """
-    観測データの画像を生成する
+    観測データのPNG画像を生成する
     :param df DataFrame ※必須
     :param plot_param: PlotParam ※必須
     :param phone_image_size: スマホの場合は表示領域サイズ情報
     :param logger: app_logger
-    :return: 画像(base64エンコード文字列)
+    :return: PNG画像のバイト列
     """
     log_debug: bool
     if logger is not None:
@@ -390,10 +440,35 @@ def gen_plot_image(
     else:
         log_debug = False
 
-    # グラフ生成
-    fig: Figure = make_graph(
-        df, plot_param, phone_image_size=phone_image_size,
-        logger=logger, log_debug=log_debug
-    )
+    # 外気温統計情報を取得する ※間引く前のデータで計算する
+    temp_out_stat: TempOutStat = get_temp_out_stat(df)
+    if logger is not None and log_debug:
+        logger.debug(temp_out_stat)
+    # 同じ図のサイズ・グラフ種別のテンプレートのデータを差し替えて描画する
+    with figure_template_pool.borrow(
+            _template_key(plot_param, phone_image_size),
+            lambda: WeatherFigure(plot_param, phone_image_size=phone_image_size,
+                                  logger=logger, log_debug=log_debug)
+    ) as weather_fig:
+        fig: Figure = weather_fig.update(df, plot_param, temp_out_stat)
+        return convert_png_bytes(fig, logger=logger, log_debug=log_debug)
+
+
+def gen_plot_image(
+        df: DataFrame,
+        plot_param: PlotParam,
+        phone_image_size: Optional[str] = None,
+        logger: Optional[logging.Logger] = None
+) -> str:
+    """
+    観測データの画像を生成する
+    :param df DataFrame ※必須
+    :param plot_param: PlotParam ※必須
+    :param phone_image_size: スマホの場合は表示領域サイズ情報
+    :param logger: app_logger
+    :return: 画像(base64エンコード文字列)
+    """
     # 画像をバイトストリームに溜め込みそれをbase64エンコードしてレスポンスとして返す
-    return convert_html_image_src(fig, logger=logger, log_debug=log_debug)
+    return png_to_html_image_src(
+        gen_plot_png(df, plot_param, phone_image_size=phone_image_size, logger=logger)
+    )
@@ -1,6 +1,6 @@
 import logging
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from matplotlib import rcParams
 import matplotlib.dates as mdates
@@ -12,11 +12,12 @@ import numpy as np
 from pandas.core.frame import DataFrame, Series
 
 from plot_weather.loader.dataframeloader import (
-    COL_TIME, COL_TEMP_OUT, COL_HUMID, COL_PRESSURE,
+    COL_TEMP_OUT, COL_HUMID, COL_PRESSURE,
 )
+from .decimation import figureWidthPixels, minMaxDecimate
 from .plottercommon import (
     PLOT_CONF, Y_LABEL_HUMID, Y_LABEL_PRESSURE,
-    convert_html_image_src
+    convert_png_bytes, png_to_html_image_src
 )
 
 """ 前年と比較した気象データ画像のbase64エンコードテキストデータを出力する """
@@ -59,20 +60,21 @@ LEGEND_STYLE: Dict = {'fontsize': 10, }
 TITLE_STYLE: Dict = {'fontsize': 11, }
 
 
-def plusOneYear(prev_datetime: datetime) -> datetime:
+def plusOneYear(prev_times) -> Tuple[np.ndarray, np.ndarray]:
     """
-    前年のdatetimeオブジェクトに1年プラスしたdatetimeオブジェクトを取得する
-    :param prev_datetime: 前年のdatetimeオブジェクト
-    @return: 1年プラスしたdatetimeオブジェクト
+    前年の測定時刻に1年プラスした測定時刻を一括で取得する ※月単位の加算 (datetime64)
+    [うるう日] 翌年に2月29日がない場合は3月1日になるため, プロット対象外とする
+    :param prev_times: 前年の測定時刻 (datetime64 に変換可能な配列, Series)
+    @return: (1年プラスした測定時刻: datetime64[ns], プロット対象のマスク)
     """
-    next_val: datetime = datetime(prev_datetime.year + 1,
-                                  prev_datetime.month,
-                                  prev_datetime.day,
-                                  prev_datetime.hour,
-                                  prev_datetime.minute,
-                                  prev_datetime.second
-                                  )
-    return next_val
+    times: np.ndarray = np.asarray(prev_times, dtype="datetime64[ns]")
+    months: np.ndarray = times.astype("datetime64[M]")
+    # 月初からの経過時間を保ったまま12ヶ月後の月初に加算する
+    next_months: np.ndarray = months + np.timedelta64(12, "M")
+    shifted: np.ndarray = next_months.astype("datetime64[ns]") + (
+        times - months.astype("datetime64[ns]"))
+    keep: np.ndarray = shifted.astype("datetime64[M]") == next_months
+    return shifted, keep
 
 
 def makeLegendLabel(s_year_month: str) -> str:
@@ -133,27 +135,31 @@ def _temperature_plotting(
         ax_temp: Axes,
         df_curr: DataFrame, df_prev: DataFrame,
         curr_temp_ser: Series, prev_temp_ser: Series,
-        main_title: str, curr_plot_label: str, prev_plot_label: str) -> None:
+        main_title: str, curr_plot_label: str, prev_plot_label: str,
+        width_px: int = 0) -> None:
     """
     外気温領域のプロット
     :param ax_temp:外気温サブプロット(axes)
     :param df_curr:今年の年月DataFrame
-    :param df_prev:前年の年月DataFrame
+    :param df_prev:前年の年月のプロット用DataFrame ※1年プラスした測定時刻列を含む
     :param curr_temp_ser: 現在の年月外気温データ
     :param prev_temp_ser: 前年の年月外気温データ
     :param main_title: タイトル
     :param curr_plot_label: 今年ラベル
     :param prev_plot_label: 前年ラベル
+    :param width_px: 間引き用の図の幅(ピクセル数) ※0なら間引かない
     """
     # 最低・最高
     setYLimWithAxes(ax_temp, curr_temp_ser, prev_temp_ser, curr_temp_ser, prev_temp_ser)
     # 最新年月の外気温
-    ax_temp.plot(df_curr[COL_TIME], curr_temp_ser, color=CURR_COLOR, marker="")
+    ax_temp.plot(*minMaxDecimate(df_curr.index, curr_temp_ser, width_px),
+                 color=CURR_COLOR, marker="")
     val_ave = curr_temp_ser.mean()
     curr_patch = makeAvePatch(curr_plot_label, val_ave, CURR_COLOR, DICT_AVE_TEMP)
     ax_temp.axhline(val_ave, **CURR_AVEG_LINE_STYLE)
     # 前年月の外気温
-    ax_temp.plot(df_prev[COL_PREV_PLOT_TIME], prev_temp_ser, color=PREV_COLOR, marker="")
+    ax_temp.plot(*minMaxDecimate(df_prev[COL_PREV_PLOT_TIME], df_prev[COL_TEMP_OUT], width_px),
+                 color=PREV_COLOR, marker="")
     val_ave = prev_temp_ser.mean()
     prev_patch = makeAvePatch(prev_plot_label, val_ave, PREV_COLOR, DICT_AVE_TEMP)
     ax_temp.axhline(val_ave, **PREV_AVEG_LINE_STYLE)
@@ -168,25 +174,29 @@ def _temperature_plotting(
 def _humid_plotting(ax_humid: Axes,
                     df_curr: DataFrame, df_prev: DataFrame,
                     curr_humid_ser: Series, prev_humid_ser: Series,
-                    curr_plot_label: str, prev_plot_label: str) -> None:
+                    curr_plot_label: str, prev_plot_label: str,
+                    width_px: int = 0) -> None:
     """
     湿度サブプロット(axes)に軸・軸ラベルを設定し、DataFrameオプジェクトの室内湿度データをプロットする
     :param ax_humid:湿度サブプロット(axes)
     :param df_curr:今年の年月DataFrame
-    :param df_prev:前年の年月DataFrame
+    :param df_prev:前年の年月のプロット用DataFrame ※1年プラスした測定時刻列を含む
     :param curr_humid_ser: 現在の室内湿度データ
     :param prev_humid_ser: 前年の室内湿度データ
     :param curr_plot_label: 今年ラベル
     :param prev_plot_label: 前年ラベル
+    :param width_px: 間引き用の図の幅(ピクセル数) ※0なら間引かない
     """
     ax_humid.set_ylim(ymin=0., ymax=100.)
     # 最新年月
-    ax_humid.plot(df_curr[COL_TIME], curr_humid_ser, color=CURR_COLOR, marker="")
+    ax_humid.plot(*minMaxDecimate(df_curr.index, curr_humid_ser, width_px),
+                  color=CURR_COLOR, marker="")
     val_ave = curr_humid_ser.mean()
     curr_patch = makeAvePatch(curr_plot_label, val_ave, CURR_COLOR, DICT_AVEG_HUMID)
     ax_humid.axhline(val_ave, **CURR_AVEG_LINE_STYLE)
     # 前年月
-    ax_humid.plot(df_prev[COL_PREV_PLOT_TIME], prev_humid_ser, color=PREV_COLOR, marker="")
+    ax_humid.plot(*minMaxDecimate(df_prev[COL_PREV_PLOT_TIME], df_prev[COL_HUMID], width_px),
+                  color=PREV_COLOR, marker="")
     val_ave = prev_humid_ser.mean()
     prev_patch = makeAvePatch(prev_plot_label, val_ave, PREV_COLOR, DICT_AVEG_HUMID)
     ax_humid.axhline(val_ave, **PREV_AVEG_LINE_STYLE)
@@ -201,25 +211,30 @@ def _pressure_plotting(
         ax_pressure: Axes,
         df_curr: DataFrame, df_prev: DataFrame,
         curr_pressure_ser: Series, prev_pressure_ser: Series,
-        curr_plot_label: str, prev_plot_label: str) -> None:
+        curr_plot_label: str, prev_plot_label: str,
+        width_px: int = 0) -> None:
     """
     気圧サブプロット(axes)に軸・軸ラベルを設定し、DataFrameオプジェクトの気圧データをプロットする
     :param ax_pressure:気圧サブプロット(axes)
     :param df_curr:今年の年月DataFrame
-    :param df_prev:前年の年月DataFrame
+    :param df_prev:前年の年月のプロット用DataFrame ※1年プラスした測定時刻列を含む
     :param curr_pressure_ser: 現在の気圧データ
     :param prev_pressure_ser: 前年の気圧データ
     :param curr_plot_label: 今年ラベル
     :param prev_plot_label: 前年ラベル
+    :param width_px: 間引き用の図の幅(ピクセル数) ※0なら間引かない
     """
     ax_pressure.set_ylim(PLOT_CONF["ylim"]["pressure"])
     # 最新年月
-    ax_pressure.plot(df_curr[COL_TIME], curr_pressure_ser, color=CURR_COLOR, marker="")
+    ax_pressure.plot(*minMaxDecimate(df_curr.index, curr_pressure_ser, width_px),
+                     color=CURR_COLOR, marker="")
     val_ave = curr_pressure_ser.mean()
     curr_patch = makeAvePatch(curr_plot_label, val_ave, CURR_COLOR, DICT_AVEG_PRESSURE)
     ax_pressure.axhline(val_ave, **CURR_AVEG_LINE_STYLE)
     # 前年月
-    ax_pressure.plot(df_prev[COL_PREV_PLOT_TIME], prev_pressure_ser, color=PREV_COLOR, marker="")
+    ax_pressure.plot(
+        *minMaxDecimate(df_prev[COL_PREV_PLOT_TIME], df_prev[COL_PRESSURE], width_px),
+        color=PREV_COLOR, marker="")
     val_ave = prev_pressure_ser.mean()
     prev_patch = makeAvePatch(prev_plot_label, val_ave, PREV_COLOR, DICT_AVEG_PRESSURE)
     ax_pressure.axhline(val_ave, **PREV_AVEG_LINE_STYLE)
@@ -263,8 +278,13 @@ def make_graph(
     # (3) 気圧データ(今年・前年)
     curr_pressure_ser: Series = df_curr[COL_PRESSURE]
     prev_pressure_ser: Series = df_prev[COL_PRESSURE]
-    # 前年データをX軸にプロットするために測定時刻列にを1年プラスする
-    df_prev[COL_PREV_PLOT_TIME] = df_prev[COL_TIME].apply(plusOneYear)
+    # 前年データをX軸にプロットするために測定時刻列に1年プラスする
+    #  呼び出し元(キャッシュ共有)のDataFrameは変更しない ※平均値は全データで計算する
+    prev_plot_times: np.ndarray
+    prev_plot_keep: np.ndarray
+    prev_plot_times, prev_plot_keep = plusOneYear(df_prev.index)
+    df_prev_plot: DataFrame = df_prev.loc[prev_plot_keep].assign(
+        **{COL_PREV_PLOT_TIME: prev_plot_times[prev_plot_keep]})
 
     fig: Figure
     ax_temp: Axes
@@ -279,32 +299,34 @@ def make_graph(
     # Y方向のグリッド線のみ表示
     for ax in [ax_temp, ax_humid, ax_pressure]:
         ax.grid(**GRID_STYLE)
+    # 間引き用の図の幅 ※平均値は間引く前のデータで計算する
+    width_px: int = figureWidthPixels(fig) if PLOT_CONF.get("decimation.enabled", True) else 0
 
     # (1) 外気温領域のプロット
     _temperature_plotting(ax_temp,
-                          df_curr, df_prev, curr_temp_ser, prev_temp_ser,
-                          title, curr_plot_label, prev_plot_label)
+                          df_curr, df_prev_plot, curr_temp_ser, prev_temp_ser,
+                          title, curr_plot_label, prev_plot_label, width_px=width_px)
     # (2) 湿度領域のプロット
     _humid_plotting(ax_humid,
-                    df_curr, df_prev, curr_humid_ser, prev_humid_ser,
-                    curr_plot_label, prev_plot_label)
+                    df_curr, df_prev_plot, curr_humid_ser, prev_humid_ser,
+                    curr_plot_label, prev_plot_label, width_px=width_px)
     # (3) 気圧領域のプロット
     _pressure_plotting(ax_pressure,
-                       df_curr, df_prev, curr_pressure_ser, prev_pressure_ser,
-                       curr_plot_label, prev_plot_label)
+                       df_curr, df_prev_plot, curr_pressure_ser, prev_pressure_ser,
+                       curr_plot_label, prev_plot_label, width_px=width_px)
     return fig
 
 
-def gen_plot_image(
+def gen_plot_png(
         df_curr: DataFrame, df_prev: DataFrame, year_month: str, logger=None
-) -> str:
+) -> bytes:
     """
-    比較年月用の観測データの画像を生成する
+    比較年月用の観測データのPNG画像を生成する
     :param df_curr: 今年の年月データ
     :param df_prev: 前年の年月データ
     :param year_month: 今年の年月
     :param logger: app_logger
-    :return: 比較年月データ画像(base64エンコード文字列)
+    :return: 比較年月データのPNG画像のバイト列
     """
     log_debug: bool
     if logger is not None:
@@ -324,6 +346,22 @@ def gen_plot_image(
         df_curr, df_prev, year_month, prev_year_month,
         logger=logger, log_debug=log_debug
     )
+    return convert_png_bytes(fig, logger=logger, log_debug=log_debug)
+
+
+def gen_plot_image(
+        df_curr: DataFrame, df_prev: DataFrame, year_month: str, logger=None
+) -> str:
+    """
+    比較年月用の観測データの画像を生成する
+    :param df_curr: 今年の年月データ
+    :param df_prev: 前年の年月データ
+    :param year_month: 今年の年月
+    :param logger: app_logger
+    :return: 比較年月データ画像(base64エンコード文字列)
+    """
     # 画像をバイトストリームに溜め込みそれをbase64エンコードしてレスポンスとして返す
-    img_src: str = convert_html_image_src(fig, logger=logger, log_debug=log_debug)
+    img_src: str = png_to_html_image_src(
+        gen_plot_png(df_curr, df_prev, year_month, logger=logger)
+    )
     return img_src
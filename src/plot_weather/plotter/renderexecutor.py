@@ -0,0 +1,221 @@
+import logging
+import multiprocessing
+import threading
+from dataclasses import dataclass, asdict
+from multiprocessing.pool import AsyncResult, Pool
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from plot_weather.loader.dataframeloader import (
+    COL_TEMP_OUT, COL_TEMP_IN, COL_HUMID, COL_PRESSURE
+)
+from .plotterweather import PlotDateType, PlotParam, figure_template_pool, gen_plot_png
+from .plotterweather_prevcomp import gen_plot_png as gen_prev_comp_plot_png
+
+"""
+グラフ描画用のワーカープロセスプール
+[仕様]
+ (1) matplotlibの描画はGILを保持するため, 描画をワーカープロセスで実行し全コアを使う
+ (2) ワーカーには DataFrame ではなく列ごとのNumPy配列(測定時刻: datetime64[ns], 測定値: float32)を渡し,
+     PNGのバイト列を受け取る
+ (3) ワーカーは起動時にダミーデータを描画してフォント・テンプレートを準備しておく
+ (4) 描画が指定秒数以内に終わらない場合は TimeoutError とし, プールを作り直す
+     古いプールは新規の受付を停止し, 他のスレッドの描画結果の待ち時間(タイムアウト)経過後に終了する
+ (5) ワーカーは指定回数描画したら新しいプロセスに入れ替える ※メモリ使用量の増加を抑える
+[前提条件]
+ Linux (forkserver) ※ワーカーは本モジュールを読み込み済みのフォークサーバーから fork する
+  (1) フォークサーバーはシングルスレッドで起動するため, ワーカーはアプリのロック・データベース接続を継承しない
+      ※ワーカーの入れ替え(5)とプールの作り直し(4)もアプリのプロセスから fork しない
+  (2) パッケージの初期化(plot_weather/__init__.py)はFlaskアプリ・コネクションプールを生成しない
+  (3) ワーカーは起動時にテンプレートプールを作り直す ※描画モジュールの状態は親プロセスと共有しない
+"""
+
+# ワーカープロセスの起動方法
+_MP_CONTEXT = multiprocessing.get_context("forkserver")
+
+# 列データの測定時刻のキー ※DataFrameのインデックス
+COL_INDEX: str = "__index__"
+
+
+@dataclass
+class RenderExecutorStats:
+    """ 描画ワーカープロセスプールの統計情報 """
+    # 描画を依頼した回数
+    submitted: int = 0
+    # 描画が完了した回数
+    completed: int = 0
+    # タイムアウト回数
+    timeouts: int = 0
+    # ワーカーで例外が発生した回数
+    errors: int = 0
+    # プールを作り直した回数
+    restarts: int = 0
+
+
+def frameToColumns(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    DataFrameをワーカーに渡す列データに変換する
+    :param df: 測定時刻をインデックスとするDataFrame
+    :return: カラム名とNumPy配列の辞書 ※測定時刻は COL_INDEX
+    """
+    columns: Dict[str, np.ndarray] = {
+        COL_INDEX: np.asarray(df.index.values, dtype="datetime64[ns]")
+    }
+    for name in df.columns:
+        columns[name] = df[name].to_numpy()
+    return columns
+
+
+def columnsToFrame(columns: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """
+    ワーカーに渡された列データをDataFrameに戻す
+    :param columns: frameToColumns() の戻り値
+    :return: 測定時刻をインデックスとするDataFrame
+    """
+    values: Dict[str, np.ndarray] = {
+        name: array for name, array in columns.items() if name != COL_INDEX
+    }
+    return pd.DataFrame(values, index=pd.DatetimeIndex(columns[COL_INDEX]))
+
+
+def _render_weather(columns: Dict[str, np.ndarray], plot_param: PlotParam,
+                    phone_image_size: Optional[str]) -> bytes:
+    """ [ワーカー] 観測データのPNG画像を生成する """
+    return gen_plot_png(columnsToFrame(columns), plot_param, phone_image_size=phone_image_size)
+
+
+def _render_prev_comp(curr_columns: Dict[str, np.ndarray], prev_columns: Dict[str, np.ndarray],
+                      year_month: str) -> bytes:
+    """ [ワーカー] 比較年月用の観測データのPNG画像を生成する """
+    return gen_prev_comp_plot_png(
+        columnsToFrame(curr_columns), columnsToFrame(prev_columns), year_month
+    )
+
+
+def _warm_up() -> None:
+    """ [ワーカー] 起動時にダミーデータを描画する ※フォントの読み込みとPC用テンプレートの生成 """
+    figure_template_pool.reset()
+    index: pd.DatetimeIndex = pd.date_range("2000-01-01", periods=2, freq="10min")
+    df: pd.DataFrame = pd.DataFrame({
+        COL_TEMP_OUT: np.array([0., 1.], dtype=np.float32),
+        COL_TEMP_IN: np.array([0., 1.], dtype=np.float32),
+        COL_HUMID: np.array([50., 50.], dtype=np.float32),
+        COL_PRESSURE: np.array([1000., 1000.], dtype=np.float32),
+    }, index=index)
+    plot_param: PlotParam = PlotParam(
+        plote_date_type=PlotDateType.TODAY, start_date="2000-01-01",
+        end_date=None, before_days=None
+    )
+    try:
+        _render_weather(frameToColumns(df), plot_param, None)
+    except Exception:
+        # 準備に失敗しても描画時に同じ処理を行う
+        pass
+
+
+class RenderExecutor:
+    def __init__(self, workers: int, timeout_seconds: float = 30.,
+                 max_tasks_per_worker: int = 100, logger: Optional[logging.Logger] = None):
+        """
+        :param workers: ワーカープロセス数
+        :param timeout_seconds: 1回の描画のタイムアウト(秒)
+        :param max_tasks_per_worker: ワーカーを入れ替えるまでの描画回数 ※0なら入れ替えない
+        :param logger: app_logger
+        """
+        self.workers: int = workers
+        self.timeout_seconds: float = timeout_seconds
+        self.max_tasks_per_worker: int = max_tasks_per_worker
+        self.logger: Optional[logging.Logger] = logger
+        self._lock: threading.Lock = threading.Lock()
+        self._stats: RenderExecutorStats = RenderExecutorStats()
+        # フォークサーバーの起動前に設定する ※描画モジュールの読み込みをワーカーごとに行わない
+        _MP_CONTEXT.set_forkserver_preload([__name__])
+        self._pool: Pool = self._create_pool()
+
+    def _create_pool(self) -> Pool:
+        return _MP_CONTEXT.Pool(
+            processes=self.workers, initializer=_warm_up,
+            maxtasksperchild=(self.max_tasks_per_worker if self.max_tasks_per_worker > 0 else None)
+        )
+
+    def _run(self, func, *args) -> bytes:
+        with self._lock:
+            pool: Pool = self._pool
+            self._stats.submitted += 1
+        result: AsyncResult = pool.apply_async(func, args)
+        try:
+            png: bytes = result.get(timeout=self.timeout_seconds)
+        except multiprocessing.TimeoutError:
+            with self._lock:
+                self._stats.timeouts += 1
+            self._restart(pool)
+            raise TimeoutError(f"Rendering timed out ({self.timeout_seconds} seconds)")
+        except Exception:
+            with self._lock:
+                self._stats.errors += 1
+            raise
+
+        with self._lock:
+            self._stats.completed += 1
+        return png
+
+    def _restart(self, pool: Pool) -> None:
+        """ 応答しないワーカーを含むプールを作り直す ※他のスレッドが作り直し済みなら何もしない """
+        with self._lock:
+            if self._pool is not pool:
+                return
+            self._pool = self._create_pool()
+            self._stats.restarts += 1
+        if self.logger is not None:
+            self.logger.warning("RenderExecutor: worker pool restarted")
+        # 他のスレッドが古いプールの描画結果を待っているため, 待ち時間経過後に終了する
+        pool.close()
+        terminator: threading.Timer = threading.Timer(self.timeout_seconds, pool.terminate)
+        terminator.daemon = True
+        terminator.start()
+
+    def render_weather(self, df: pd.DataFrame, plot_param: PlotParam,
+                       phone_image_size: Optional[str] = None) -> bytes:
+        """
+        観測データのPNG画像をワーカーで生成する ※plotterweather.gen_plot_png()と同じ
+        :param df: DataFrame
+        :param plot_param: PlotParam
+        :param phone_image_size: スマホの場合は表示領域サイズ情報
+        :return: PNG画像のバイト列
+        :raise: TimeoutError
+        """
+        return self._run(_render_weather, frameToColumns(df), plot_param, phone_image_size)
+
+    def render_prev_comp(self, df_curr: pd.DataFrame, df_prev: pd.DataFrame,
+                         year_month: str) -> bytes:
+        """
+        比較年月用の観測データのPNG画像をワーカーで生成する ※plotterweather_prevcomp.gen_plot_png()と同じ
+        :param df_curr: 今年の年月データ
+        :param df_prev: 前年の年月データ
+        :param year_month: 今年の年月
+        :return: PNG画像のバイト列
+        :raise: TimeoutError
+        """
+        return self._run(_render_prev_comp, frameToColumns(df_curr), frameToColumns(df_prev),
+                         year_month)
+
+    def shutdown(self) -> None:
+        """ ワーカープロセスを終了する """
+        with self._lock:
+            pool: Pool = self._pool
+        pool.close()
+        pool.join()
+
+    def get_stats(self) -> Dict:
+        """
+        統計情報を取得する
+        :return: 統計情報の辞書 ※ワーカー数(workers), タイムアウト(timeout_seconds)を含む
+        """
+        with self._lock:
+            result: Dict = asdict(self._stats)
+        result["workers"] = self.workers
+        result["timeout_seconds"] = self.timeout_seconds
+        result["max_tasks_per_worker"] = self.max_tasks_per_worker
+        return result
@@ -0,0 +1,72 @@
+import os
+import socket
+from typing import Dict
+
+from plot_weather.util.file_util import read_json
+
+"""
+環境変数による設定とデータベース接続情報
+※アプリの初期化(Flaskアプリ, コネクションプール, バックグラウンド処理)を行わないため,
+  スクリプト(ロールアップ等)からはこのモジュールを読み込む
+"""
+
+# PostgreSQL connection information json file.
+CONF_PATH: str = os.path.expanduser("~/bin/pigpio/conf")
+DB_CONF_PATH: str = os.path.join(CONF_PATH, "dbconf.json")
+DB_CONN_MAX: int = int(os.environ.get("DB_CONN_MAX", "5"))
+# 起動時に確立する接続数
+DB_CONN_MIN: int = int(os.environ.get("DB_CONN_MIN", "2"))
+# 接続数が最大の場合の取得待ちタイムアウト(秒)
+DB_CONN_TIMEOUT: float = float(os.environ.get("DB_CONN_TIMEOUT", "10"))
+# 未使用時間がこの秒数を超えたコネクションは取得時に疎通確認する
+DB_CONN_CHECK_IDLE: float = float(os.environ.get("DB_CONN_CHECK_IDLE", "60"))
+# 期間データ取得時のサーバーサイドカーソルの1回あたりの取得件数
+DB_STREAM_ITERSIZE: int = int(os.environ.get("DB_STREAM_ITERSIZE", "1000"))
+# DAOのクエリーをプリペアドステートメントで実行するか (0: 無効)
+DB_PREPARED_STATEMENTS: bool = os.environ.get("DB_PREPARED_STATEMENTS", "1") != "0"
+# デバイスキャッシュの有効期限(秒) ※0なら期限なし
+DEVICE_CACHE_TTL: float = float(os.environ.get("DEVICE_CACHE_TTL", "3600"))
+# 最新観測データキャッシュの再確認間隔(秒) ※0ならキャッシュしない
+LATEST_READING_RECHECK: float = float(os.environ.get("LATEST_READING_RECHECK", "30"))
+# 観測年月カタログの最終登録日の再確認間隔(秒)
+MONTH_CATALOG_RECHECK: float = float(os.environ.get("MONTH_CATALOG_RECHECK", "60"))
+# 確定済み年月のDataFrameキャッシュのメモリ上限(MB) ※0ならキャッシュしない
+MONTH_FRAME_CACHE_MB: float = float(os.environ.get("MONTH_FRAME_CACHE_MB", "32"))
+# 確定済み年月の観測データを保存するアーカイブディレクトリ ※未設定ならアーカイブしない
+MONTH_ARCHIVE_DIR: str = os.environ.get("MONTH_ARCHIVE_DIR", "")
+# 確定済み年月をアーカイブに保存するまでの猶予日数 ※遅れて登録される観測データを取り込む
+MONTH_ARCHIVE_GRACE_DAYS: int = int(os.environ.get("MONTH_ARCHIVE_GRACE_DAYS", "7"))
+# 全期間の観測データをメモリに保持し画像用データをデータベースから取得しない (1: 有効)
+SERIES_STORE: bool = os.environ.get("SERIES_STORE", "0") == "1"
+# インメモリ列ストアの追加データ取得間隔(秒)
+SERIES_STORE_REFRESH: float = float(os.environ.get("SERIES_STORE_REFRESH", "60"))
+# 描画済みグラフ画像(PNG)キャッシュのメモリ上限(MB) ※0ならキャッシュしない
+RENDER_CACHE_MB: float = float(os.environ.get("RENDER_CACHE_MB", "16"))
+# グラフ描画のワーカープロセス数 ※0ならリクエストのスレッドで描画する
+RENDER_WORKERS: int = int(os.environ.get("RENDER_WORKERS", "0"))
+# ワーカープロセスの1回の描画のタイムアウト(秒)
+RENDER_TIMEOUT: float = float(os.environ.get("RENDER_TIMEOUT", "30"))
+# ワーカープロセスを入れ替えるまでの描画回数 ※0なら入れ替えない
+RENDER_MAX_TASKS: int = int(os.environ.get("RENDER_MAX_TASKS", "100"))
+# 全デバイスの当日画像の事前描画間隔(秒) ※0または描画済み画像キャッシュが無効なら事前描画しない
+PRERENDER_INTERVAL: float = float(os.environ.get("PRERENDER_INTERVAL", "30"))
+# 事前描画するスマホの表示領域サイズの数 (リクエストの多い順)
+PRERENDER_PHONE_SIZES: int = int(os.environ.get("PRERENDER_PHONE_SIZES", "2"))
+
+
+def load_dbconf() -> Dict[str, str]:
+    """
+    データベース接続情報を読み込む
+    ※ホスト名は環境変数 DB_HOST, 未設定ならこのマシンのホスト名
+    :return: psycopg2.connect() の接続パラメータ
+    """
+    dbconf: Dict[str, str] = read_json(DB_CONF_PATH)
+    # Other Database host
+    db_host: str = os.environ.get("DB_HOST", None)
+    if db_host is None:
+        # Production: deault Database host
+        dbconf["host"] = dbconf["host"].format(hostname=socket.gethostname())
+    else:
+        # Development
+        dbconf["host"] = dbconf["host"].format(hostname=db_host)
+    return dbconf
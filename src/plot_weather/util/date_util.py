@@ -51,6 +51,14 @@ def datetimeToJpDateWithWeek(cur_datetime: datetime) -> str:
     return FMT_JP_DATE_WITH_WEEK.format(s_date, JP_WEEK_DAY_NAMES[idx_week])
 
 
+def getTodayIsoDate() -> str:
+    """
+    本日の日付文字列(ISO8601形式)を取得する
+    :return: 本日の日付文字列
+    """
+    return date.today().strftime(FMT_ISO8601)
+
+
 def strDateToDatetimeTime000000(s_date: str) -> datetime:
     """
     日付文字列の "00:00:00"のdatetimeブジェクトを返却する
@@ -1,5 +1,8 @@
+import hashlib
+import math
+from dataclasses import asdict
 from datetime import date, datetime
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
 from flask import (
     abort, g, jsonify, render_template, request, make_response, Response
@@ -12,31 +15,64 @@ from werkzeug.exceptions import (
 from pandas.core.frame import DataFrame
 
 import psycopg2
-from psycopg2.pool import SimpleConnectionPool
 from psycopg2.extensions import connection
 
-from plot_weather import (BAD_REQUEST_IMAGE_DATA,
-                          INTERNAL_SERVER_ERROR_IMAGE_DATA,
-                          NO_IMAGE_DATA,
-                          DebugOutRequest,
-                          app, app_logger, app_logger_debug)
+from plot_weather.webapp import (BAD_REQUEST_IMAGE_DATA,
+                                 INTERNAL_SERVER_ERROR_IMAGE_DATA,
+                                 NO_IMAGE_DATA,
+                                 DebugOutRequest,
+                                 app, app_logger, app_logger_debug)
+from plot_weather.cache.currentframe import CurrentFrameCache
+from plot_weather.cache.deviceregistry import DeviceRegistry
+from plot_weather.cache.latestreading import LatestReadingCache
+from plot_weather.cache.montharchive import MonthArchive
+from plot_weather.cache.monthcatalog import MonthCatalog
+from plot_weather.cache.monthframe import MonthFrameCache, isClosedMonth
+from plot_weather.cache.prerender import PC_IMAGE_SIZE, TodayImagePrerenderer
+from plot_weather.cache.renderedimage import RenderedImageCache, Watermark, frameWatermark
+from plot_weather.cache.seriesstore import SeriesStore
+from plot_weather.db.connpool import BlockingConnectionPool
+from plot_weather.db.prepared import default_registry as prepared_registry
 from plot_weather.dao.weatherdao import WeatherDao
-from plot_weather.dao.weatherstatdao import TempOutStatDao
+from plot_weather.dao.weatherstatdao import LastDataWithTempOutStat, TempOut
 from plot_weather.dao.devicedao import DeviceDao, DeviceRecord
 from plot_weather.db.sqlite3conv import DateFormatError, strdate2timestamp
 from plot_weather.loader.dataframeloader import (
     loadTodayDataFrame, loadMonthDataFrame, loadBeforeDaysRangeDataFrame
 )
 from plot_weather.loader.dataframeloader_prevcomp import loadPrevCompDataFrames
+from plot_weather.plotter.plottercommon import RENDER_VERSION, png_to_html_image_src
 from plot_weather.plotter.plotterweather import (
-    gen_plot_image, PlotDateType, PlotParam
+    figure_template_pool, gen_plot_png, PlotDateType, PlotParam
 )
 from plot_weather.plotter.plotterweather_prevcomp import (
-    gen_plot_image as gen_comp_prev_plot_image
+    gen_plot_png as gen_comp_prev_plot_png
 )
+from plot_weather.plotter.renderexecutor import RenderExecutor
+from plot_weather.settings import DB_STREAM_ITERSIZE
 import plot_weather.util.date_util as date_util
 
 APP_ROOT: str = app.config["APPLICATION_ROOT"]
+# デバイス名からデバイスIDへの変換キャッシュ
+device_registry: DeviceRegistry = app.config["device_registry"]
+# デバイスごとの最新観測データキャッシュ
+latest_reading_cache: LatestReadingCache = app.config["latest_reading_cache"]
+# デバイスごとの観測年月カタログ (年月リスト, 初回・最終登録日)
+month_catalog: MonthCatalog = app.config["month_catalog"]
+# 確定済み年月の観測データDataFrameキャッシュ
+month_frame_cache: MonthFrameCache = app.config["month_frame_cache"]
+# 当日・当月の観測データの差分更新キャッシュ
+current_frame_cache: CurrentFrameCache = app.config["current_frame_cache"]
+# 確定済み年月の観測データのディスク上のアーカイブ ※無効ならNone
+month_archive: Optional[MonthArchive] = app.config["month_archive"]
+# 全デバイスの観測データのインメモリ列ストア ※無効ならNone
+series_store: Optional[SeriesStore] = app.config["series_store"]
+# 描画済みグラフ画像(PNG)キャッシュ
+rendered_image_cache: RenderedImageCache = app.config["rendered_image_cache"]
+# グラフ描画のワーカープロセスプール ※無効ならNone
+render_executor: Optional[RenderExecutor] = app.config["render_executor"]
+# 全デバイスの当日画像の事前描画スケジューラ ※無効ならNone
+today_prerenderer: Optional[TodayImagePrerenderer] = app.config["today_prerenderer"]
 
 # エラーメッセージの内容 ※messages.confで定義
 MSG_REQUIRED: str = app.config["MSG_REQUIRED"]
@@ -51,6 +87,7 @@ REQUIRED_PHONE_IMG: str = f"401,{MSG_PHONE_IMG} {MSG_REQUIRED}"
 INVALID_PHONE_IMG: str = f"402,{MSG_PHONE_IMG} {MSG_INVALID}"
 # リクエストパラメータ
 PARAM_DEVICE: str = "device_name"
+PARAM_DEVICE_NAMES: str = "device_names"
 PARAM_START_DAY: str = "start_day"
 PARAM_BOFORE_DAYS: str = "before_days"
 PARAM_YEAR_MONTH: str = "year_month"
@@ -62,6 +99,9 @@ DEVICE_LENGTH: int = 20
 REQUIRED_DEVICE: str = f"421,{PARAM_DEVICE} {MSG_REQUIRED}"
 INVALIDD_DEVICE: str = f"422,{PARAM_DEVICE} {MSG_INVALID}"
 DEVICE_NOT_FOUND: str = f"423,{PARAM_DEVICE} {MSG_NOT_FOUND}"
+#  複数デバイスの最新データ取得リクエスト: 任意 ※未指定なら全デバイス, カンマ区切り
+INVALIDD_DEVICE_NAMES: str = f"424,{PARAM_DEVICE_NAMES} {MSG_INVALID}"
+DEVICE_NAMES_NOT_FOUND: str = f"425,{PARAM_DEVICE_NAMES} {MSG_NOT_FOUND}"
 # 期間指定画像取得リクエスト
 #  (1)検索開始日["start_day"]: 任意 ※未指定ならシステム日付を検索開始日とする
 #     日付形式(ISO8601: YYYY-mm-dd), 10文字一致
@@ -82,17 +122,48 @@ ABORT_DICT_UNMATCH_TOKEN: Dict[str, str] = {
 # 可変メッセージエラー辞書オブジェクト: ""部分を置き換える
 ABORT_DICT_BLANK_MESSAGE: Dict[str, str] = {MSG_DESCRIPTION: ""}
 
+# 画像レスポンスの形式 ※Acceptヘッダーで選択
+MIME_JSON: str = "application/json"
+MIME_PNG: str = "image/png"
+# PNG形式のレスポンスヘッダー: レコード件数
+HEADER_RECORD_COUNT: str = "X-Record-Count"
+# PNG形式の確定済み期間(前月以前, 前日以前)の画像のブラウザキャッシュ有効期間(秒)
+IMAGE_MAX_AGE_CLOSED: int = 86400
+# 描画済み画像キャッシュの画像種別
+IMAGE_KIND_TODAY: str = "today"
+IMAGE_KIND_MONTH: str = "month"
+IMAGE_KIND_PREV_COMP: str = "prevcomp"
+IMAGE_KIND_RANGE: str = "range"
+# 画像レスポンスの描画データの読み込み関数: (レコード件数, 描画するDataFrameのタプル) ※レコードなしは (0, ())
+FrameLoader = Callable[[], Tuple[int, Tuple[DataFrame, ...]]]
+
 
 def get_connection() -> connection:
     if 'db' not in g:
-        conn_pool: SimpleConnectionPool = app.config["postgreSQL_pool"]
+        conn_pool: BlockingConnectionPool = app.config["postgreSQL_pool"]
+        # セッション設定(readonly, autocommit)はプールの接続確立時に設定済み
         g.db: connection = conn_pool.getconn()
-        g.db.set_session(readonly=True, autocommit=True)
         if app_logger_debug:
             app_logger.debug(f"g.db:{g.db}")
     return g.db
 
 
+def get_loader_connection() -> Optional[connection]:
+    """ DataFrameローダー用のコネクション ※インメモリ列ストア有効時は取得しない """
+    if series_store is not None:
+        return None
+    return get_connection()
+
+
+def get_last_register_day(
+        device_id: int, get_conn: Callable[[], connection] = get_connection
+) -> Optional[str]:
+    """ 最終登録日 ※インメモリ列ストア有効時はストアの最終測定時刻の日付 """
+    if series_store is not None:
+        return series_store.get_last_day(device_id)
+    return month_catalog.get_last_register_day(get_conn, device_id)
+
+
 @app.teardown_appcontext
 def close_connection(exception=None) -> None:
     db: connection = g.pop('db', None)
@@ -115,10 +186,8 @@ def index() -> str:
             f"{request.path}, cookie.device_name: {device_in_cookie}")
 
     try:
-        conn: connection = get_connection()
-        # センサーデバイスリスト取得
-        device_dao: DeviceDao = DeviceDao(conn, logger=app_logger)
-        devices: List[DeviceRecord] = device_dao.get_devices()
+        # センサーデバイスリスト取得 ※キャッシュから取得
+        devices: List[DeviceRecord] = device_registry.get_devices(get_connection)
         device_dict_list: List[Dict[str, str]
                                ] = DeviceDao.to_dict_without_id(devices)
         if app_logger_debug:
@@ -129,26 +198,30 @@ def index() -> str:
         prev_ym_list: Optional[List[str]] = None
         rec_count: Optional[int] = None
         img_base64_encoded: Optional[str] = None
+        device_id: Optional[int] = None
         if device_in_cookie is not None:
+            device_id = device_registry.get_id(get_connection, device_in_cookie)
+            if device_id is None:
+                # 削除済みのデバイス名: 年月リストは空
+                ym_list, prev_ym_list = [], []
+        if device_id is not None:
             # 当日: ブラウザ版は開発環境利用も考慮し最終日付とする
-            conn: connection = get_connection()
-            dao: WeatherDao = WeatherDao(conn, logger=app_logger)
-            last_register_day: Optional[str] = dao.getLastRegisterDay(
-                device_in_cookie)
+            last_register_day: Optional[str] = get_last_register_day(device_id)
             today_date: str
             if last_register_day is not None:
                 today_date = last_register_day
             else:
                 today_date = date.today().strftime(date_util.FMT_ISO8601)
             # 年月リスト
-            ym_list = dao.getGroupByMonths(device_in_cookie)
-            prev_ym_list = dao.getPrevYearMonthList(device_in_cookie)
+            ym_list = month_catalog.get_group_by_months(get_connection, device_id)
+            prev_ym_list = month_catalog.get_prev_year_month_list(get_connection, device_id)
             # DataFrameの取得
             rec_count: int
             df: Optional[DataFrame]
             rec_count, df = loadTodayDataFrame(
-                conn, device_in_cookie, today_date,
-                logger=app_logger, logger_debug=app_logger_debug
+                get_loader_connection(), device_id, today_date,
+                logger=app_logger, logger_debug=app_logger_debug,
+                current_cache=current_frame_cache, series_store=series_store
             )
             if rec_count > 0:
                 # 当日データのパラメータ生成
@@ -156,8 +229,8 @@ def index() -> str:
                     plote_date_type=PlotDateType.TODAY,
                     start_date=today_date, end_date=None, before_days=None
                 )
-                img_base64_encoded: str = gen_plot_image(
-                    df, plot_param, phone_image_size=None, logger=app_logger
+                img_base64_encoded: str = _plotImageSrc(
+                    IMAGE_KIND_TODAY, device_id, today_date, df, plot_param
                 )
         if rec_count is None or rec_count == 0:
             # No image
@@ -201,12 +274,14 @@ def getYearMonthListWithDevice(device_name) -> Response:
         app_logger.debug(f"{request.path}, device_name: {device_name}")
 
     try:
-        conn: connection = get_connection()
-        dao: WeatherDao = WeatherDao(conn, logger=app_logger)
-        # 年月リスト取得
-        ym_list: List[str] = dao.getGroupByMonths(device_name)
-        # 前年比較用年月リスト
-        prev_ym_list: List[str] = dao.getPrevYearMonthList(device_name)
+        ym_list: List[str] = []
+        prev_ym_list: List[str] = []
+        device_id: Optional[int] = device_registry.get_id(get_connection, device_name)
+        if device_id is not None:
+            # 年月リスト取得
+            ym_list = month_catalog.get_group_by_months(get_connection, device_id)
+            # 前年比較用年月リスト
+            prev_ym_list = month_catalog.get_prev_year_month_list(get_connection, device_id)
         result: Dict = {
             "status": "success",
             "data": {"ymList": ym_list, "prevYmList": prev_ym_list}
@@ -232,40 +307,42 @@ def getTodayImage(device_name: str) -> Response:
     :param device_name: デバイス名 ※必須
     :return: JSON形式(matplotlibでプロットした画像データ(形式: png)のbase64エンコード済み文字列)
             (出力例) {"data":"image/png;base64,... base64encoded data ...", "rec_count": 件数}
+            ※Acceptヘッダーで image/png を優先した場合は PNG画像 (ETag, Cache-Control付き, 0件は 204)
     """
     if app_logger_debug:
         app_logger.debug(f"{request.path}, device_name: {device_name}")
 
     # デバイス名 ※必須
     try:
-        conn: connection = get_connection()
+        device_id: Optional[int] = device_registry.get_id(get_connection, device_name)
+        if device_id is None:
+            return _noImageResponse(_createImageResponse)
+
         # 本日データプロット画像取得
-        dao: WeatherDao = WeatherDao(conn, logger=app_logger)
-        last_day: Optional[str] = dao.getLastRegisterDay(device_name)
+        last_day: Optional[str] = get_last_register_day(device_id)
         today_date: str
         if last_day is not None:
             today_date = last_day
         else:
             today_date = date.today().strftime(date_util.FMT_ISO8601)
-        # DataFrameの取得
-        rec_count: int
-        df: Optional[DataFrame]
-        rec_count, df = loadTodayDataFrame(
-            conn, device_name, today_date,
-            logger=app_logger, logger_debug=app_logger_debug
+
+        def load_frames() -> Tuple[int, Tuple[DataFrame, ...]]:
+            # DataFrameの取得
+            return _singleFrame(loadTodayDataFrame(
+                get_loader_connection(), device_id, today_date,
+                logger=app_logger, logger_debug=app_logger_debug,
+                current_cache=current_frame_cache, series_store=series_store
+            ))
+
+        # 当日データのパラメータ生成
+        plot_param: PlotParam = PlotParam(
+            plote_date_type=PlotDateType.TODAY,
+            start_date=today_date, end_date=None, before_days=None
+        )
+        return _plotImageResponse(
+            IMAGE_KIND_TODAY, device_id, today_date, "", load_frames,
+            lambda frames: _renderPlotPng(frames[0], plot_param, None), _createImageResponse
         )
-        if rec_count > 0:
-            # 当日データのパラメータ生成
-            plot_param: PlotParam = PlotParam(
-                plote_date_type=PlotDateType.TODAY,
-                start_date=today_date, end_date=None, before_days=None
-            )
-            img_base64_encoded: str = gen_plot_image(
-                df, plot_param, phone_image_size=None, logger=app_logger
-            )
-            return _createImageResponse(rec_count, img_base64_encoded)
-        else:
-            return _createImageResponse(0, None)
     except psycopg2.Error as db_err:
         app_logger.error(db_err)
         abort(InternalServerError.code, _set_errormessage(f"559,{db_err}"))
@@ -281,6 +358,7 @@ def getMonthImage(device_name: str, year_month: str) -> Response:
     :param device_name: デバイス名
     :param yearmonth: 年月 (例) 2022-01
     :return: JSON形式(matplotlibでプロットした画像データ)
+            ※Acceptヘッダーで image/png を優先した場合は PNG画像 (ETag, Cache-Control付き, 0件は 204)
     """
     if app_logger_debug:
         app_logger.debug(f"{request.path}, {device_name}, {year_month}")
@@ -289,27 +367,30 @@ def getMonthImage(device_name: str, year_month: str) -> Response:
         chk_yyyymmdd = year_month + "-01"
         # 日付チェック(YYYY-mm-dd): 日付不正の場合例外スロー
         strdate2timestamp(chk_yyyymmdd, raise_error=True)
-        conn: connection = get_connection()
-        # DataFrameの取得
-        rec_count: int
-        df: Optional[DataFrame]
-        rec_count, df = loadMonthDataFrame(
-            conn, device_name, year_month,
-            logger=app_logger, logger_debug=app_logger_debug
+        device_id: Optional[int] = device_registry.get_id(get_connection, device_name)
+        if device_id is None:
+            return _noImageResponse(_createImageResponse)
+
+        def load_frames() -> Tuple[int, Tuple[DataFrame, ...]]:
+            # DataFrameの取得
+            return _singleFrame(loadMonthDataFrame(
+                get_loader_connection(), device_id, year_month,
+                logger=app_logger, logger_debug=app_logger_debug,
+                frame_cache=month_frame_cache, current_cache=current_frame_cache,
+                series_store=series_store, month_archive=month_archive
+            ))
+
+        # 年月データのパラメータ生成
+        start_date: str = f"{year_month}-01"
+        plot_param: PlotParam = PlotParam(
+            plote_date_type=PlotDateType.YEAR_MONTH,
+            start_date=start_date, end_date=None, before_days=None
+        )
+        return _plotImageResponse(
+            IMAGE_KIND_MONTH, device_id, year_month, "", load_frames,
+            lambda frames: _renderPlotPng(frames[0], plot_param, None), _createImageResponse,
+            closed=isClosedMonth(year_month)
         )
-        if rec_count > 0:
-            # 年月データのパラメータ生成
-            start_date: str = f"{year_month}-01"
-            plot_param: PlotParam = PlotParam(
-                plote_date_type=PlotDateType.YEAR_MONTH,
-                start_date=start_date, end_date=None, before_days=None
-            )
-            img_base64_encoded: str = gen_plot_image(
-                df, plot_param, phone_image_size=None, logger=app_logger
-            )
-            return _createImageResponse(rec_count, img_base64_encoded)
-        else:
-            return _createImageResponse(0, None)
     except DateFormatError as dfe:
         # BAD Request
         app_logger.warning(dfe)
@@ -331,28 +412,35 @@ def getcompprevyearimage(device_name, year_month) -> Response:
     :param device_name: デバイス名
     :param yearmonth: 年月 (例) 2022-01
     :return: JSON形式(matplotlibでプロットした画像データ)
+            ※Acceptヘッダーで image/png を優先した場合は PNG画像 (ETag, Cache-Control付き, 0件は 204)
     """
     if app_logger_debug:
         app_logger.debug(f"{request.path}, {device_name}, {year_month}")
     try:
         chk_yyyymmdd = year_month + "-01"
         strdate2timestamp(chk_yyyymmdd, raise_error=True)
-        conn: connection = get_connection()
-        # DataFrameの取得
-        df_curr: Optional[DataFrame]
-        df_prev: Optional[DataFrame]
-        df_curr, df_prev = loadPrevCompDataFrames(
-            conn, device_name, year_month,
-            logger=app_logger, logger_debug=app_logger_debug
-        )
-        if df_curr is not None and df_prev is not None:
-            img_base64_encoded: str = gen_comp_prev_plot_image(
-                df_curr, df_prev, year_month, logger=app_logger
+        device_id: Optional[int] = device_registry.get_id(get_connection, device_name)
+        if device_id is None:
+            return _noImageResponse(_createImageResponse)
+
+        def load_frames() -> Tuple[int, Tuple[DataFrame, ...]]:
+            # DataFrameの取得
+            df_curr: Optional[DataFrame]
+            df_prev: Optional[DataFrame]
+            df_curr, df_prev = loadPrevCompDataFrames(
+                get_loader_connection(), device_id, year_month,
+                logger=app_logger, logger_debug=app_logger_debug, frame_cache=month_frame_cache,
+                series_store=series_store, month_archive=month_archive
             )
-            rec_count: int = df_curr.shape[0]
-            return _createImageResponse(rec_count, img_base64_encoded)
-        else:
-            return _createImageResponse(0, None)
+            if df_curr is None or df_prev is None:
+                return 0, ()
+            return df_curr.shape[0], (df_curr, df_prev)
+
+        return _plotImageResponse(
+            IMAGE_KIND_PREV_COMP, device_id, year_month, "", load_frames,
+            lambda frames: _renderPrevCompPng(frames[0], frames[1], year_month),
+            _createImageResponse, closed=isClosedMonth(year_month)
+        )
     except DateFormatError as dfe:
         # BAD Request
         app_logger.warning(dfe)
@@ -389,43 +477,29 @@ def getLastDataForPhone() -> Response:
         abort(Forbidden.code, ABORT_DICT_UNMATCH_TOKEN)
 
     # デバイス名必須
-    device_name: str = _checkDeviceName(request.args)
+    device: DeviceRecord = _checkDeviceName(request.args)
     try:
-        conn: connection = get_connection()
         # 現在時刻時点の最新の気象データ取得
-        dao = WeatherDao(conn, logger=app_logger)
         rec_count: int
-        row: Optional[Tuple[str, float, float, float, float]]
-        # デバイス名に対応する最新のレコード取得
-        row = dao.getLastData(device_name=device_name)
-        if row:
+        # 最新レコードと検索日(最新レコードの日付)・前日の外気温の統計情報を1回のクエリーで取得
+        #  ※キャッシュから取得
+        last_data: Optional[LastDataWithTempOutStat] = latest_reading_cache.get(
+            get_connection, device.id)
+        if last_data is not None:
             rec_count = 1
-            measurement_time, temp_out, temp_in, humid, pressure = row
-            # 検索日の外気温の統計情報を取得
-            #   上記の測定時刻から検索日付を取得
-            find_date: str = measurement_time[:10]
-            temp_out_stat: TempOutStatDao = TempOutStatDao(
-                conn, logger=app_logger, is_debug_out=app_logger_debug)
-            min_temp: Dict
-            max_temp: Dict
-            min_temp, max_temp = temp_out_stat.get_statistics(
-                device_name, find_date)
             if app_logger_debug:
-                app_logger.debug(f"min_temp: {min_temp}, max_temp: {max_temp}")
+                app_logger.debug(f"last_data: {last_data}")
             # 検索日の統計情報Dict
-            stat_today_dict: Dict = _makeTempOutStatDict(min_temp, max_temp)
+            stat_today_dict: Dict = _makeTempOutStatDict(last_data.today_min, last_data.today_max)
             # 検索日を追加
-            stat_today_dict["measurement_date"] = find_date
-            # 前日の外気温の統計情報を取得
-            before_date: str = date_util.addDayToString(find_date, add_days=-1)
-            min_temp, max_temp = temp_out_stat.get_statistics(
-                device_name, before_date)
-            if app_logger_debug:
-                app_logger.debug(f"min_temp: {min_temp}, max_temp: {max_temp}")
-            stat_before_dict: Dict = _makeTempOutStatDict(min_temp, max_temp)
-            stat_before_dict["measurement_date"] = before_date
+            stat_today_dict["measurement_date"] = last_data.find_date
+            # 前日の統計情報Dict
+            stat_before_dict: Dict = _makeTempOutStatDict(
+                last_data.before_min, last_data.before_max)
+            stat_before_dict["measurement_date"] = last_data.before_date
             return _responseLastDataForPhone(
-                measurement_time, temp_out, temp_in, humid, pressure,
+                last_data.measurement_time, last_data.temp_out, last_data.temp_in,
+                last_data.humid, last_data.pressure,
                 rec_count, stat_today_dict=stat_today_dict, stat_before_dict=stat_before_dict)
         else:
             # デバイス名に対応するレコード無し
@@ -442,6 +516,61 @@ def getLastDataForPhone() -> Response:
         abort(InternalServerError.code, description=str(exp))
 
 
+@app.route("/plot_weather/getlastdatalistforphone", methods=["GET"])
+def getLastDataListForPhone() -> Response:
+    """複数デバイスの最新の気象データを取得する (スマートホン・ダッシュボード用)
+       [仕様追加] デバイスごとの getlastdataforphone のポーリングを1リクエストにまとめる
+         (1) 最新データと最新データの日付の外気温の統計情報 (前日の統計情報は含まない)
+         (2) 全デバイスの最新データを1回のクエリーで取得する
+
+    :param: request parameter: device_names="xxxxx,yyyyy" ※任意, 未指定なら全デバイス
+    :return: JSON形式
+         (出力内容) JSON({"data":{"devices":[{"device_name":"xxxxx", "measurement_time":..., ...}]}})
+    """
+    if app_logger_debug:
+        app_logger.debug(request.path)
+        _debugOutRequestObj(request, debugout=DebugOutRequest.BOTH)
+
+    # トークン必須
+    if not _matchToken(request.headers):
+        abort(Forbidden.code, ABORT_DICT_UNMATCH_TOKEN)
+
+    devices: List[DeviceRecord] = _checkDeviceNames(request.args)
+    try:
+        dao: WeatherDao = WeatherDao(get_connection(), logger=app_logger)
+        rows: List[Tuple] = dao.getLastDataList([device.id for device in devices])
+        rows_by_id: Dict[int, Tuple] = {row[0]: row for row in rows}
+        data_list: List[Dict] = []
+        for device in devices:
+            row: Optional[Tuple] = rows_by_id.get(device.id)
+            data: Dict
+            if row is not None:
+                (_, measurement_time, temp_out, temp_in, humid, pressure,
+                 find_date, min_time, min_temp, max_time, max_temp) = row
+                stat_today_dict: Dict = _makeTempOutStatDict(
+                    asdict(TempOut(min_time, min_temp)), asdict(TempOut(max_time, max_temp)))
+                stat_today_dict["measurement_date"] = find_date
+                data = _makeLastDataDict(
+                    measurement_time, temp_out, temp_in, humid, pressure,
+                    1, stat_today_dict=stat_today_dict, stat_before_dict=None)
+            else:
+                # デバイスに対応するレコード無し
+                data = _makeLastDataDict(None, None, None, None, None, 0,
+                                         stat_today_dict=None, stat_before_dict=None)
+            data_list.append({"device_name": device.name, **data})
+        resp_obj: Dict[str, Dict] = {
+            "data": {"devices": data_list},
+            "status": {"code": 0, "message": "OK"}
+        }
+        return _make_respose(resp_obj, 200)
+    except psycopg2.Error as db_err:
+        app_logger.error(db_err)
+        abort(InternalServerError.code, _set_errormessage(f"559,{db_err}"))
+    except Exception as exp:
+        app_logger.error(exp)
+        abort(InternalServerError.code, description=str(exp))
+
+
 @app.route("/plot_weather/getfirstregisterdayforphone", methods=["GET"])
 def getFirstRegisterDayForPhone() -> Response:
     """デバイスの観測データの初回登録日を取得する (スマートホン専用)
@@ -460,13 +589,11 @@ def getFirstRegisterDayForPhone() -> Response:
         abort(Forbidden.code, ABORT_DICT_UNMATCH_TOKEN)
 
     # デバイス名必須
-    param_device_name: str = _checkDeviceName(request.args)
+    device: DeviceRecord = _checkDeviceName(request.args)
     try:
-        conn: connection = get_connection()
-        dao = WeatherDao(conn, logger=app_logger)
-        # デバイス名に対応する初回登録日取得
-        first_register_day: Optional[str] = dao.getFisrtRegisterDay(
-            param_device_name)
+        # デバイスに対応する初回登録日取得
+        first_register_day: Optional[str] = month_catalog.get_first_register_day(
+            get_connection, device.id)
         if app_logger_debug:
             app_logger.debug(
                 f"first_register_day[{type(first_register_day)}]: {first_register_day}")
@@ -495,6 +622,7 @@ def getTodayImageForPhone() -> Response:
     :return: jSON形式(matplotlibでプロットした画像データ(形式: png)のbase64エンコード済み文字列)
          (出力内容) JSON('data:': 'img_src':'image/png;base64,... base64encoded data ...',
                          'rec_count':xxx)
+         ※Acceptヘッダーで image/png を優先した場合は PNG画像 (ETag, Cache-Control付き, 0件は 204)
     """
     if app_logger_debug:
         app_logger.debug(request.path)
@@ -506,33 +634,35 @@ def getTodayImageForPhone() -> Response:
         abort(Forbidden.code, ABORT_DICT_UNMATCH_TOKEN)
 
     # デバイス名必須
-    device_name: str = _checkDeviceName(request.args)
+    device: DeviceRecord = _checkDeviceName(request.args)
 
     # 表示領域サイズ+密度は必須: 形式(横x縦x密度)
     str_img_size: str = _checkPhoneImageSize(headers)
+    if today_prerenderer is not None:
+        # 多く使われている表示領域サイズを事前描画の対象とする
+        today_prerenderer.record_phone_size(str_img_size)
     try:
-        conn: connection = get_connection()
         # 当日はシステム日付
         today_date = date.today().strftime(date_util.FMT_ISO8601)
-        # DataFrameの取得
-        rec_count: int
-        df: Optional[DataFrame]
-        rec_count, df = loadTodayDataFrame(
-            conn, device_name, today_date,
-            logger=app_logger, logger_debug=app_logger_debug
+
+        def load_frames() -> Tuple[int, Tuple[DataFrame, ...]]:
+            # DataFrameの取得
+            return _singleFrame(loadTodayDataFrame(
+                get_loader_connection(), device.id, today_date,
+                logger=app_logger, logger_debug=app_logger_debug,
+                current_cache=current_frame_cache, series_store=series_store
+            ))
+
+        # 当日データのパラメータ生成
+        plot_param: PlotParam = PlotParam(
+            plote_date_type=PlotDateType.TODAY,
+            start_date=today_date, end_date=None, before_days=None
+        )
+        return _plotImageResponse(
+            IMAGE_KIND_TODAY, device.id, today_date, str_img_size, load_frames,
+            lambda frames: _renderPlotPng(frames[0], plot_param, str_img_size),
+            _responseImageForPhone
         )
-        if rec_count > 0:
-            # 当日データのパラメータ生成
-            plot_param: PlotParam = PlotParam(
-                plote_date_type=PlotDateType.TODAY,
-                start_date=today_date, end_date=None, before_days=None
-            )
-            img_base64_encoded: str = gen_plot_image(
-                df, plot_param, phone_image_size=str_img_size, logger=app_logger
-            )
-            return _responseImageForPhone(rec_count, img_base64_encoded)
-        else:
-            return _responseImageForPhone(0, None)
     except psycopg2.Error as db_err:
         app_logger.error(db_err)
         abort(InternalServerError.code, _set_errormessage(f"559,{db_err}"))
@@ -554,6 +684,7 @@ def getBeforeDateImageForPhone() -> Response:
     :return: jSON形式(matplotlibでプロットした画像データ(形式: png)のbase64エンコード済み文字列)
          (出力内容) jSON('data:': 'img_src':'image/png;base64,... base64encoded data ...',
                          'rec_count':xxx)
+         ※Acceptヘッダーで image/png を優先した場合は PNG画像 (ETag, Cache-Control付き, 0件は 204)
     """
     if app_logger_debug:
         app_logger.debug(request.path)
@@ -565,7 +696,7 @@ def getBeforeDateImageForPhone() -> Response:
         abort(Forbidden.code, ABORT_DICT_UNMATCH_TOKEN)
 
     # デバイス名 ※必須チェック
-    device_name: str = _checkDeviceName(request.args)
+    device: DeviceRecord = _checkDeviceName(request.args)
     # 検索開始日 ※任意、指定されている場合はISO8601形式チェック
     end_date: Optional[str] = _checkStartDay(request.args)
     if end_date is None:
@@ -577,17 +708,17 @@ def getBeforeDateImageForPhone() -> Response:
     # 表示領域サイズ+密度は必須: 形式(横x縦x密度)
     str_img_size: str = _checkPhoneImageSize(headers)
     try:
-        conn: connection = get_connection()
-        # DataFrameの取得
-        rec_count: int
-        df: Optional[DataFrame]
-        rec_count, df = loadBeforeDaysRangeDataFrame(
-            conn, device_name, end_date, before_days,
-            logger=app_logger, logger_debug=True
-        )
-        if rec_count > 0:
+        def load_frames() -> Tuple[int, Tuple[DataFrame, ...]]:
+            # DataFrameの取得
+            return _singleFrame(loadBeforeDaysRangeDataFrame(
+                get_loader_connection(), device.id, end_date, before_days,
+                logger=app_logger, logger_debug=True, itersize=DB_STREAM_ITERSIZE,
+                series_store=series_store
+            ))
+
+        def render(frames: Tuple[DataFrame, ...]) -> bytes:
             # DataFrameの先頭から開始日を取得
-            dt_first: datetime = df.index[0].to_pydatetime()
+            dt_first: datetime = frames[0].index[0].to_pydatetime()
             # 当日の日付文字列 ※一旦 dateオブジェクトに変換して"年月日"を取得
             first_date: str = dt_first.date().isoformat()
             # 検索終了日からN日前のデータ取得パラメータ生成
@@ -595,12 +726,14 @@ def getBeforeDateImageForPhone() -> Response:
                 plote_date_type=PlotDateType.RANGE,
                 start_date=first_date, end_date=end_date, before_days=before_days
             )
-            img_base64_encoded: str = gen_plot_image(
-                df, plot_param, phone_image_size=str_img_size, logger=app_logger
-            )
-            return _responseImageForPhone(rec_count, img_base64_encoded)
-        else:
-            return _responseImageForPhone(0, None)
+            return _renderPlotPng(frames[0], plot_param, str_img_size)
+
+        # 開始日はデータに依存するためキーは検索終了日とN日前 ※データの変更はウォーターマークで判定する
+        return _plotImageResponse(
+            IMAGE_KIND_RANGE, device.id, f"{end_date}/{before_days}", str_img_size,
+            load_frames, render, _responseImageForPhone,
+            closed=(end_date < date_util.getTodayIsoDate())
+        )
     except psycopg2.Error as db_err:
         app_logger.error(db_err)
         abort(InternalServerError.code, _set_errormessage(f"559,{db_err}"))
@@ -621,9 +754,8 @@ def getDevices() -> Response:
 
     devices_with_dict: List[Dict]
     try:
-        conn: connection = get_connection()
-        dao: DeviceDao = DeviceDao(conn, logger=app_logger)
-        devices: List[DeviceRecord] = dao.get_devices()
+        # キャッシュから取得
+        devices: List[DeviceRecord] = device_registry.get_devices(get_connection)
         devices_with_dict = DeviceDao.to_dict_without_id(devices)
         resp_obj: Dict[str, Dict] = {
             "data": {"devices": devices_with_dict},
@@ -638,6 +770,45 @@ def getDevices() -> Response:
         abort(InternalServerError.code, description=str(exp))
 
 
+@app.route("/plot_weather/getserverstats", methods=["GET"])
+def getServerStats() -> Response:
+    """サーバー内部の統計情報取得リクエスト (運用監視用)
+
+    :return: JSON形式(コネクションプールの待機時間・使用率, プリペアドステートメントの実行時間など)
+         (出力内容) JSON({"data":{"connection_pool":{...}, "prepared_statements":{...}}})
+    """
+    if app_logger_debug:
+        app_logger.debug(request.path)
+
+    # トークン必須
+    if not _matchToken(request.headers):
+        abort(Forbidden.code, ABORT_DICT_UNMATCH_TOKEN)
+
+    conn_pool: BlockingConnectionPool = app.config["postgreSQL_pool"]
+    resp_obj: Dict[str, Dict] = {
+        "data": {
+            "connection_pool": conn_pool.get_stats(),
+            "prepared_statements": prepared_registry.get_stats(),
+            "device_registry": device_registry.get_stats(),
+            "latest_reading": latest_reading_cache.get_stats(),
+            "month_catalog": month_catalog.get_stats(),
+            "month_frame_cache": month_frame_cache.get_stats(),
+            "current_frame_cache": current_frame_cache.get_stats(),
+            "series_store": series_store.get_stats() if series_store is not None else None,
+            "month_archive": month_archive.get_stats() if month_archive is not None else None,
+            "rendered_image_cache": rendered_image_cache.get_stats(),
+            # ワーカープロセスで描画する場合はアプリのテンプレートプールを使用しない
+            "figure_templates": (figure_template_pool.get_stats()
+                                 if render_executor is None else None),
+            "render_executor": render_executor.get_stats() if render_executor is not None else None,
+            "today_prerenderer": (today_prerenderer.get_stats()
+                                  if today_prerenderer is not None else None)
+        },
+        "status": {"code": 0, "message": "OK"}
+    }
+    return _make_respose(resp_obj, 200)
+
+
 def _debugOutRequestObj(request, debugout=DebugOutRequest.ARGS) -> None:
     if debugout == DebugOutRequest.ARGS or debugout == DebugOutRequest.BOTH:
         app_logger.debug(f"reqeust.args: {request.args}")
@@ -668,7 +839,7 @@ def _checkPhoneImageSize(headers: Headers) -> str:
     ※1.トークンチェックを通過しているのでセットされている前提で処理
     ※2.途中でエラー (Androidアプリ側のBUG) ならExceptionで補足されJSONでメッセージが返却される
     :param headers: request header
-    :return: (imageWidth, imageHeight, density)
+    :return: 正規化した表示領域サイズ情報 ※幅x高さx密度 (密度は末尾の0を除く)
     """
     img_size: str = headers.get(
         app.config.get("HEADER_REQUEST_IMAGE_SIZE_KEY", ""), type=str, default=""
@@ -680,13 +851,18 @@ def _checkPhoneImageSize(headers: Headers) -> str:
 
     sizes: List[str] = img_size.split("x")
     try:
+        if len(sizes) != 3:
+            raise ValueError(f"invalid format: {img_size}")
         img_wd: int = int(sizes[0])
         img_ht: int = int(sizes[1])
         density: float = float(sizes[2])
+        if img_wd <= 0 or img_ht <= 0 or not (math.isfinite(density) and density > 0):
+            raise ValueError(f"not positive: {img_size}")
         if app_logger_debug:
             app_logger.debug(
                 f"imgWd: {img_wd}, imgHt: {img_ht}, density: {density}")
-        return img_size
+        # 同じサイズの表記の違い(2.75, 2.750など)を統一する ※画像キャッシュのキー
+        return f"{img_wd}x{img_ht}x{density:g}"
     except Exception as exp:
         # ログには例外メッセージ
         app_logger.warning(f"[phone image size] {exp}")
@@ -708,11 +884,11 @@ def _checkBeforeDays(args: MultiDict) -> int:
     return before_days
 
 
-def _checkDeviceName(args: MultiDict) -> str:
+def _checkDeviceName(args: MultiDict) -> DeviceRecord:
     """デバイス名チェック
         パラメータなし: abort(BadRequest)
         該当レコードなし: abort(NotFound)
-    return デバイス名    
+    return デバイス名に対応するデバイス (キャッシュから取得)
     """
     # 必須チェック
     if len(args.keys()) == 0 or PARAM_DEVICE not in args.keys():
@@ -728,21 +904,53 @@ def _checkDeviceName(args: MultiDict) -> str:
     if app_logger_debug:
         app_logger.debug("requestParam.device_name: " + param_device_name)
 
-    exists: bool = False
+    device: Optional[DeviceRecord] = None
     try:
-        conn: connection = get_connection()
-        dao: DeviceDao = DeviceDao(conn, logger=app_logger)
-        exists = dao.exists(param_device_name)
+        device = device_registry.get(get_connection, param_device_name)
     except Exception as exp:
         app_logger.error(exp)
         abort(InternalServerError.code, description=str(exp))
 
-    if exists is True:
-        return param_device_name
+    if device is not None:
+        return device
     else:
         abort(BadRequest.code, _set_errormessage(DEVICE_NOT_FOUND))
 
 
+def _checkDeviceNames(args: MultiDict) -> List[DeviceRecord]:
+    """デバイス名リストチェック (カンマ区切り)
+        パラメータなし: 全デバイス
+        不正なデバイス名: abort(BadRequest)
+        未登録のデバイス名を含む: abort(BadRequest)
+    return デバイス名に対応するデバイスリスト (キャッシュから取得)
+    """
+    devices: List[DeviceRecord] = []
+    try:
+        if PARAM_DEVICE_NAMES not in args.keys():
+            return device_registry.get_devices(get_connection)
+
+        param_device_names: str = args.get(PARAM_DEVICE_NAMES, default="", type=str)
+        if app_logger_debug:
+            app_logger.debug("requestParam.device_names: " + param_device_names)
+        device_names: List[str] = param_device_names.split(",")
+        for device_name in device_names:
+            # 長さチェック: 1 - 20
+            if len(device_name) < 1 or len(device_name) > DEVICE_LENGTH:
+                abort(BadRequest.code, _set_errormessage(INVALIDD_DEVICE_NAMES))
+            device: Optional[DeviceRecord] = device_registry.get(get_connection, device_name)
+            if device is None:
+                abort(BadRequest.code, _set_errormessage(DEVICE_NAMES_NOT_FOUND))
+            if device not in devices:
+                devices.append(device)
+    except HTTPException:
+        raise
+    except Exception as exp:
+        app_logger.error(exp)
+        abort(InternalServerError.code, description=str(exp))
+
+    return devices
+
+
 def _checkStartDay(args: MultiDict) -> Optional[str]:
     """検索開始日の形式チェック
         パラメータなし: OK
@@ -764,6 +972,225 @@ def _checkStartDay(args: MultiDict) -> Optional[str]:
         abort(BadRequest.code, _set_errormessage(INVALID_START_DAY))
 
 
+def _plotImageSrc(kind: str, device_id: int, params: str, df: DataFrame,
+                  plot_param: PlotParam, phone_image_size: Optional[str] = None) -> str:
+    """
+    観測データの画像を取得する ※描画済み画像キャッシュになければ描画する
+    :param kind: 画像種別
+    :param device_id: デバイスID
+    :param params: 日付パラメータ
+    :param df: 観測データのDataFrame
+    :param plot_param: PlotParam
+    :param phone_image_size: スマホの場合は表示領域サイズ情報
+    :return: 画像(base64エンコード文字列)
+    """
+    png: bytes = rendered_image_cache.get_or_render(
+        kind, device_id, params, phone_image_size if phone_image_size is not None else "",
+        frameWatermark(df),
+        lambda: _renderPlotPng(df, plot_param, phone_image_size)
+    )
+    return png_to_html_image_src(png)
+
+
+def _acceptsPng() -> bool:
+    """ Acceptヘッダーで JSON より PNG が優先されているか ※未指定(*/*)は JSON """
+    return request.accept_mimetypes.best_match([MIME_JSON, MIME_PNG]) == MIME_PNG
+
+
+def _imageETag(kind: str, device_id: int, params: str, image_size: str, closed: bool) -> str:
+    """
+    画像のETagを生成する ※DataFrameを読み込まずに生成する
+    (1) 確定済み期間: 描画済み画像キャッシュのキーと描画結果の版 (強いETag)
+    (2) 上記以外: (1)とデバイスの観測データの版 (弱いETag)
+        ※観測データの版は描画するDataFrameと同時点に取得したものではないため
+    描画結果の版(RENDER_VERSION)によりデプロイ・プロット設定の変更後は再取得させる
+    """
+    version: Tuple = () if closed else _deviceDataVersion(device_id)
+    source: str = repr((kind, device_id, params, image_size, closed, RENDER_VERSION) + version)
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+
+def _deviceDataVersion(device_id: int) -> Tuple:
+    """
+    デバイスの観測データの版 ※観測データは時系列順に追加されるため最終測定時刻が変われば画像も変わる
+    (1) インメモリ列ストア有効時: ストアの (最終測定時刻, 件数)
+    (2) 上記以外: 最新観測データキャッシュの最終測定時刻
+        ※キャッシュの再確認間隔(LATEST_READING_RECHECK)だけ遅れて変わる
+    """
+    if series_store is not None:
+        return series_store.get_version(device_id)
+    last_data: Optional[LastDataWithTempOutStat] = latest_reading_cache.get(
+        get_connection, device_id)
+    return (last_data.measurement_time,) if last_data is not None else ()
+
+
+def _singleFrame(result: Tuple[int, Optional[DataFrame]]) -> Tuple[int, Tuple[DataFrame, ...]]:
+    """ DataFrameローダーの戻り値を描画データの読み込み関数(FrameLoader)の戻り値に変換する """
+    rec_count: int
+    df: Optional[DataFrame]
+    rec_count, df = result
+    if rec_count == 0 or df is None:
+        return 0, ()
+    return rec_count, (df,)
+
+
+def _plotImageResponse(
+        kind: str, device_id: int, params: str, image_size: str,
+        load_frames: FrameLoader, render: Callable[[Tuple[DataFrame, ...]], bytes],
+        json_response: Callable[[int, Optional[str]], Response], closed: bool = False
+) -> Response:
+    """
+    観測データの画像レスポンスを返却する ※描画済み画像キャッシュになければ描画する
+    (1) Acceptヘッダーで image/png が優先されている場合: PNG画像 (ETag, Cache-Control付き)
+        If-None-Match がETagと一致(弱い比較)すればDataFrameを読み込まずに 304 を返却する
+        ※304 にはレコード件数ヘッダーを付けない (ブラウザキャッシュのヘッダーを使う)
+    (2) 上記以外: 従来のJSON形式 (base64エンコード文字列)
+    レコードなしは _noImageResponse() と同じ
+    :param kind: 画像種別
+    :param device_id: デバイスID
+    :param params: 日付パラメータ
+    :param image_size: 画像サイズ ※ブラウザは空文字
+    :param load_frames: 描画するDataFrameの読み込み関数
+    :param render: PNGの描画関数 ※引数は読み込んだDataFrameのタプル
+    :param json_response: JSON形式のレスポンス生成関数 (レコード件数, 画像)
+    :param closed: 観測データが追加されない期間か ※ブラウザのキャッシュ有効期間を設定する
+    :return: レスポンス
+    """
+    etag: Optional[str] = None
+    if _acceptsPng():
+        etag = _imageETag(kind, device_id, params, image_size, closed)
+        if request.if_none_match.contains_weak(etag):
+            return _setImageCacheHeaders(make_response("", 304), etag, closed)
+
+    rec_count: int
+    frames: Tuple[DataFrame, ...]
+    rec_count, frames = load_frames()
+    if rec_count == 0:
+        return _noImageResponse(json_response, etag=etag)
+
+    png: bytes = rendered_image_cache.get_or_render(
+        kind, device_id, params, image_size, frameWatermark(*frames), lambda: render(frames))
+    resp: Response
+    if etag is None:
+        resp = json_response(rec_count, png_to_html_image_src(png))
+        # 同じURLでAcceptヘッダーによりPNGとJSONを返却する
+        resp.vary.add("Accept")
+        return resp
+
+    resp = make_response(png, 200)
+    resp.mimetype = MIME_PNG
+    resp.headers[HEADER_RECORD_COUNT] = str(rec_count)
+    return _setImageCacheHeaders(resp, etag, closed)
+
+
+def _setImageCacheHeaders(resp: Response, etag: Optional[str], closed: bool) -> Response:
+    """
+    PNG形式の画像レスポンスにキャッシュ制御ヘッダーを設定する
+    :param resp: レスポンス (200, 304, 204)
+    :param etag: ETag ※None なら設定しない
+    :param closed: 観測データが追加されない期間か ※False なら弱いETagとする
+    :return: ヘッダー設定済みのレスポンス
+    """
+    # 同じURLでAcceptヘッダーによりPNGとJSONを返却するため, ブラウザキャッシュをAcceptで区別させる
+    resp.vary.add("Accept")
+    if etag is not None:
+        resp.set_etag(etag, weak=not closed)
+    # スマホ版はトークン必須のため共有キャッシュには保存させない
+    resp.cache_control.private = True
+    if closed:
+        resp.cache_control.max_age = IMAGE_MAX_AGE_CLOSED
+    else:
+        # 観測データが追加されるため毎回ETagで再検証させる
+        resp.cache_control.no_cache = True
+    return resp
+
+
+def _noImageResponse(json_response: Callable[[int, Optional[str]], Response],
+                     etag: Optional[str] = None) -> Response:
+    """
+    レコードなしのレスポンスを返却する ※PNG形式の場合は 204 (No Content)
+    ※レコードが追加される可能性があるため, 204 は確定済み期間でも毎回再検証させる
+    :param json_response: JSON形式のレスポンス生成関数 (レコード件数, 画像)
+    :param etag: ETag ※None なら設定しない
+    :return: レスポンス
+    """
+    resp: Response
+    if _acceptsPng():
+        resp = make_response("", 204)
+        resp.headers[HEADER_RECORD_COUNT] = "0"
+        return _setImageCacheHeaders(resp, etag, closed=False)
+    resp = json_response(0, None)
+    resp.vary.add("Accept")
+    return resp
+
+
+def prerender_today_images(
+        conn: Optional[connection], device_id: int, image_sizes: List[str]
+) -> int:
+    """
+    デバイスの当日画像を描画済み画像キャッシュに格納する ※事前描画スケジューラから呼び出す
+    ビューと同じ当日日付・キー・ウォーターマークで描画するため, 新しい測定データがなければ描画しない
+    :param conn: psycopg2 connection
+    :param device_id: デバイスID
+    :param image_sizes: 画像サイズリスト ※PCは空文字(PC_IMAGE_SIZE)
+    :return: 描画した画像の数
+    """
+    loader_conn: Optional[connection] = conn if series_store is None else None
+    # 当日: ブラウザ版は最終登録日, スマホ版はシステム日付
+    last_day: Optional[str] = get_last_register_day(device_id, get_conn=lambda: conn)
+    system_date: str = date.today().strftime(date_util.FMT_ISO8601)
+    frames: Dict[str, Optional[DataFrame]] = {}
+    rendered: int = 0
+    for image_size in image_sizes:
+        today_date: str = system_date
+        if image_size == PC_IMAGE_SIZE and last_day is not None:
+            today_date = last_day
+        if today_date not in frames:
+            rec_count: int
+            df: Optional[DataFrame]
+            rec_count, df = loadTodayDataFrame(
+                loader_conn, device_id, today_date,
+                logger=app_logger, logger_debug=app_logger_debug,
+                current_cache=current_frame_cache, series_store=series_store
+            )
+            frames[today_date] = df if rec_count > 0 else None
+        df_today: Optional[DataFrame] = frames[today_date]
+        if df_today is None:
+            continue
+
+        watermark: Watermark = frameWatermark(df_today)
+        if rendered_image_cache.contains(
+                IMAGE_KIND_TODAY, device_id, today_date, image_size, watermark):
+            continue
+
+        phone_image_size: Optional[str] = image_size if image_size != PC_IMAGE_SIZE else None
+        plot_param: PlotParam = PlotParam(
+            plote_date_type=PlotDateType.TODAY,
+            start_date=today_date, end_date=None, before_days=None
+        )
+        rendered_image_cache.get_or_render(
+            IMAGE_KIND_TODAY, device_id, today_date, image_size, watermark,
+            lambda: _renderPlotPng(df_today, plot_param, phone_image_size)
+        )
+        rendered += 1
+    return rendered
+
+
+def _renderPlotPng(df: DataFrame, plot_param: PlotParam,
+                   phone_image_size: Optional[str]) -> bytes:
+    """ 観測データのPNG画像を描画する ※ワーカープロセスプールが有効ならワーカーで描画する """
+    if render_executor is not None:
+        return render_executor.render_weather(df, plot_param, phone_image_size=phone_image_size)
+    return gen_plot_png(df, plot_param, phone_image_size=phone_image_size, logger=app_logger)
+
+
+def _renderPrevCompPng(df_curr: DataFrame, df_prev: DataFrame, year_month: str) -> bytes:
+    """ 比較年月用のPNG画像を描画する ※ワーカープロセスプールが有効ならワーカーで描画する """
+    if render_executor is not None:
+        return render_executor.render_prev_comp(df_curr, df_prev, year_month)
+    return gen_comp_prev_plot_png(df_curr, df_prev, year_month, logger=app_logger)
+
+
 def _createImageResponse(rec_count: int, img_src: Optional[str]) -> Response:
     """画像レスポンスを返却する (JavaScript用)"""
     resp_obj = {"status": "success",
@@ -799,20 +1226,37 @@ def _responseLastDataForPhone(
     resp_obj: Dict[str, Dict[str, Union[str, float]]] = {
         "status":
             {"code": 0, "message": "OK"},
-        "data": {
-            "measurement_time": mesurement_time,
-            "temp_out": temp_out,
-            "temp_in": temp_in,
-            "humid": humid,
-            "pressure": pressure,
-            "rec_count": rec_count,
-            "temp_out_stat_today": stat_today_dict,
-            "temp_out_stat_before": stat_before_dict
-        }
+        "data": _makeLastDataDict(
+            mesurement_time, temp_out, temp_in, humid, pressure, rec_count,
+            stat_today_dict=stat_today_dict, stat_before_dict=stat_before_dict
+        )
     }
     return _make_respose(resp_obj, 200)
 
 
+def _makeLastDataDict(
+        mesurement_time: Optional[str],
+        temp_out: Optional[float],
+        temp_in: Optional[float],
+        humid: Optional[float],
+        pressure: Optional[float],
+        rec_count: int,
+        stat_today_dict: Optional[Dict],
+        stat_before_dict: Optional[Dict]
+) -> Dict:
+    """気象データの最終レコードの辞書"""
+    return {
+        "measurement_time": mesurement_time,
+        "temp_out": temp_out,
+        "temp_in": temp_in,
+        "humid": humid,
+        "pressure": pressure,
+        "rec_count": rec_count,
+        "temp_out_stat_today": stat_today_dict,
+        "temp_out_stat_before": stat_before_dict
+    }
+
+
 def _makeTempOutStatDict(minDict: Dict, maxDict: Dict) -> Dict:
     stat_dict: Dict = {
         "min": minDict, "max": maxDict
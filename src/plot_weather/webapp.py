@@ -0,0 +1,215 @@
+import enum
+import logging
+import os
+import uuid
+from typing import Dict, List, Optional
+
+from flask import Flask
+
+from plot_weather.cache.currentframe import CurrentFrameCache
+from plot_weather.cache.deviceregistry import DeviceRegistry
+from plot_weather.cache.latestreading import LatestReadingCache
+from plot_weather.cache.montharchive import MonthArchive
+from plot_weather.cache.monthcatalog import MonthCatalog
+from plot_weather.cache.monthframe import MonthFrameCache
+from plot_weather.cache.prerender import TodayImagePrerenderer
+from plot_weather.cache.renderedimage import RenderedImageCache
+from plot_weather.cache.seriesstore import SeriesStore
+from plot_weather.db.connpool import BlockingConnectionPool
+from plot_weather.db.prepared import default_registry as prepared_registry
+from plot_weather.log import logsetting
+from plot_weather.plotter.renderexecutor import RenderExecutor
+from plot_weather.settings import (
+    DB_CONN_MAX, DB_CONN_MIN, DB_CONN_TIMEOUT, DB_CONN_CHECK_IDLE, DB_PREPARED_STATEMENTS,
+    DEVICE_CACHE_TTL, LATEST_READING_RECHECK, MONTH_CATALOG_RECHECK, MONTH_FRAME_CACHE_MB,
+    MONTH_ARCHIVE_DIR, MONTH_ARCHIVE_GRACE_DAYS, SERIES_STORE, SERIES_STORE_REFRESH,
+    RENDER_CACHE_MB, RENDER_WORKERS, RENDER_TIMEOUT, RENDER_MAX_TASKS, PRERENDER_INTERVAL,
+    PRERENDER_PHONE_SIZES, load_dbconf
+)
+from plot_weather.util.image_util import image_to_base64encoded
+
+"""
+Webアプリ(Flask)と共有オブジェクト(コネクションプール, キャッシュ)の初期化
+※サーバー(run.py)のみが読み込む, スクリプトは plot_weather.settings を使う
+"""
+
+
+class DebugOutRequest(enum.Enum):
+    ARGS = 0
+    HEADERS = 1
+    BOTH = 2
+
+
+app = Flask(__name__)
+# ロガーを本アプリ用のものに設定する
+app_logger: logging.Logger = logsetting.get_logger("app_main")
+app_logger_debug: bool = (app_logger.getEffectiveLevel() <= logging.DEBUG)
+app.config.from_object("plot_weather.config")
+# HTMLテンプレートに使うメッセージキーをapp.configに読み込み
+app.config.from_pyfile(os.path.join(".", "messages/messages.conf"), silent=False)
+# リクエストヘッダに設定するキーをapp.configに読み込み
+app.config.from_pyfile(os.path.join(".", "messages/requestkeys.conf"), silent=False)
+# セッション用の秘密キー
+app.secret_key = uuid.uuid4().bytes
+# Strip newline
+app.jinja_env.lstrip_blocks = True
+app.jinja_env.trim_blocks = True
+
+# サーバホストとセッションのドメインが一致しないとブラウザにセッションIDが設定されない
+IP_HOST: str = os.environ.get("IP_HOST", "localhost")
+FLASK_PROD_PORT: str = os.environ.get("FLASK_PROD_PORT", "8080")
+has_prod: bool = os.environ.get("FLASK_ENV", "development") == "production"
+SERVER_HOST: str
+if has_prod:
+    # Production mode
+    SERVER_HOST = IP_HOST + ":" + FLASK_PROD_PORT
+else:
+    SERVER_HOST = IP_HOST + ":5000"
+app_logger.info("SERVER_HOST: {}".format(SERVER_HOST))
+
+app.config["SERVER_NAME"] = SERVER_HOST
+app.config["APPLICATION_ROOT"] = "/plot_weather"
+# use flask jsonify with japanese message
+app.config["JSON_AS_ASCII"] = False
+# Cookie config
+app.config.update(
+    SESSION_COOKIE_SECURE=False, # ローカル運用
+    SESSION_COOKIE_HTTPONLY=True,
+    SESSION_COOKIE_SAMESITE='Strict',
+    SESSION_COOKIE_NAME='plot_weather_cookie_name',
+)
+if app_logger_debug:
+    app_logger.debug(f"{app.config}")
+# "BAD REQUEST"用画像のbase64エンコード文字列ファイル
+curr_dir: str = os.path.dirname(__file__)
+cotent_path: str = os.path.join(curr_dir, "static", "content")
+file_bad_request: str = os.path.join(
+   cotent_path, "BadRequest_png_base64encoded.txt")
+BAD_REQUEST_IMAGE_DATA: str = image_to_base64encoded(file_bad_request)
+# "Internal Server Error"用画像のbase64エンコード文字列ファイル
+file_internal_error: str = os.path.join(
+    cotent_path, "InternalServerError_png_base64encoded.txt"
+)
+INTERNAL_SERVER_ERROR_IMAGE_DATA: str = image_to_base64encoded(
+   file_internal_error
+)
+# No Image (初期画面 or レコードなし)
+file_no_image: str = os.path.join(
+    cotent_path, "NoImage_980x600_png_base64encoded.txt"
+)
+NO_IMAGE_DATA: str = image_to_base64encoded(
+    file_no_image
+)
+
+
+# グラフ描画のワーカープロセスプール ※Raspberry Pi の全コアで描画する
+#  ワーカーはフォークサーバーから起動するため, アプリのロック・データベース接続を継承しない
+render_executor: Optional[RenderExecutor] = None
+if RENDER_WORKERS > 0:
+    render_executor = RenderExecutor(
+        RENDER_WORKERS, timeout_seconds=RENDER_TIMEOUT,
+        max_tasks_per_worker=RENDER_MAX_TASKS, logger=app_logger
+    )
+    app_logger.info(f"render executor: {render_executor.get_stats()}")
+app.config["render_executor"] = render_executor
+
+# Database connection pool
+dbconf: Dict[str, str] = load_dbconf()
+if app_logger_debug:
+    app_logger.debug(f"dbconf: {dbconf}")
+# waitressのマルチスレッドから利用するためスレッドセーフなプールとする
+conn_pool = BlockingConnectionPool(
+    min(DB_CONN_MIN, DB_CONN_MAX), DB_CONN_MAX,
+    timeout=DB_CONN_TIMEOUT, check_idle_seconds=DB_CONN_CHECK_IDLE,
+    logger=app_logger, **dbconf
+)
+app_logger.info(f"postgreSQL_pool(max={DB_CONN_MAX}): {conn_pool}")
+app.config["postgreSQL_pool"] = conn_pool
+# プリペアドステートメントはコネクション単位のため破棄時に管理情報を削除する
+prepared_registry.enabled = DB_PREPARED_STATEMENTS
+prepared_registry.logger = app_logger
+conn_pool.add_discard_listener(prepared_registry.discard)
+app_logger.info(f"prepared statements: {DB_PREPARED_STATEMENTS}")
+# デバイス名からデバイスIDへの変換キャッシュ ※起動時に読み込む
+device_registry = DeviceRegistry(ttl_seconds=DEVICE_CACHE_TTL, logger=app_logger)
+startup_conn = conn_pool.getconn()
+try:
+    device_registry.refresh(startup_conn)
+finally:
+    conn_pool.putconn(startup_conn)
+app.config["device_registry"] = device_registry
+# デバイスごとの最新観測データキャッシュ
+app.config["latest_reading_cache"] = LatestReadingCache(
+    recheck_seconds=LATEST_READING_RECHECK, logger=app_logger
+)
+# デバイスごとの観測年月カタログ
+app.config["month_catalog"] = MonthCatalog(
+    recheck_seconds=MONTH_CATALOG_RECHECK, logger=app_logger
+)
+# 確定済み年月の観測データDataFrameキャッシュ
+app.config["month_frame_cache"] = MonthFrameCache(
+    max_bytes=int(MONTH_FRAME_CACHE_MB * 1024 * 1024), logger=app_logger
+)
+# 当日・当月の観測データの差分更新キャッシュ
+app.config["current_frame_cache"] = CurrentFrameCache(logger=app_logger)
+# 確定済み年月の観測データのディスク上のアーカイブ ※再起動後もデータベースから再取得しない
+month_archive: Optional[MonthArchive] = None
+if len(MONTH_ARCHIVE_DIR) > 0:
+    month_archive = MonthArchive(
+        os.path.expanduser(MONTH_ARCHIVE_DIR), grace_days=MONTH_ARCHIVE_GRACE_DAYS,
+        logger=app_logger
+    )
+    app_logger.info(f"month archive: {month_archive.root_dir}")
+app.config["month_archive"] = month_archive
+
+
+def _active_device_ids(conn) -> List[int]:
+    """ バックグラウンド処理の対象デバイスIDリスト """
+    # デバイスキャッシュの再読み込みが必要な場合は取得済みのコネクションを使う
+    return [device.id for device in device_registry.get_devices(lambda: conn)]
+
+
+# 全デバイスの観測データのインメモリ列ストア ※起動時に全期間を読み込む
+series_store: Optional[SeriesStore] = None
+if SERIES_STORE:
+    series_store = SeriesStore(logger=app_logger)
+    startup_conn = conn_pool.getconn()
+    try:
+        series_store.refresh(startup_conn, _active_device_ids(startup_conn))
+    finally:
+        conn_pool.putconn(startup_conn)
+    app_logger.info(f"series store: {series_store.get_stats()}")
+app.config["series_store"] = series_store
+# 描画済みグラフ画像(PNG)キャッシュ
+app.config["rendered_image_cache"] = RenderedImageCache(
+    max_bytes=int(RENDER_CACHE_MB * 1024 * 1024), logger=app_logger
+)
+# 全デバイスの当日画像の事前描画スケジューラ ※起動は start_background_tasks()
+today_prerenderer: Optional[TodayImagePrerenderer] = None
+if PRERENDER_INTERVAL > 0 and RENDER_CACHE_MB > 0:
+    today_prerenderer = TodayImagePrerenderer(
+        max_phone_sizes=PRERENDER_PHONE_SIZES, logger=app_logger
+    )
+app.config["today_prerenderer"] = today_prerenderer
+
+# Application main program
+from plot_weather.views import app_main
+
+
+def start_background_tasks() -> None:
+    """
+    バックグラウンド処理(列ストアの定期更新, 当日画像の事前描画)のスレッドを開始する
+    ※サーバーの起動時(run.py)のみ呼び出す
+    """
+    if series_store is not None:
+        series_store.start_refresher(
+            conn_pool.getconn, conn_pool.putconn, _active_device_ids, SERIES_STORE_REFRESH
+        )
+        app_logger.info(f"series store refresher: interval={SERIES_STORE_REFRESH}")
+    if today_prerenderer is not None:
+        # 描画処理はビューと共通
+        today_prerenderer.start(
+            conn_pool.getconn, conn_pool.putconn, _active_device_ids,
+            app_main.prerender_today_images, PRERENDER_INTERVAL
+        )
+        app_logger.info(f"today image prerenderer: interval={PRERENDER_INTERVAL}")
@@ -0,0 +1,71 @@
+import argparse
+import logging
+import time
+from typing import List, Optional
+
+import psycopg2
+from psycopg2.extensions import connection
+
+from plot_weather.dao.devicedao import DeviceDao, DeviceRecord
+from plot_weather.dao.weatherrollupdao import RollupResult, WeatherRollupDao
+from plot_weather.log import logsetting
+from plot_weather.settings import load_dbconf
+
+"""
+気象データの時間別・日別集計(ロールアップ)テーブル更新スクリプト
+※アプリのコネクションプールは readonly のため書き込み可能なコネクションで実行する
+※アプリの初期化は行わない (plot_weather.settings のみ読み込む)
+[実行方法] src ディレクトリでアプリと同じ環境変数を設定して実行
+  (1) テーブル作成: python rollup_weather.py --create-tables
+  (2) 全デバイス更新: python rollup_weather.py
+  (3) 一定間隔で更新: python rollup_weather.py --interval 600
+"""
+
+app_logger: logging.Logger = logsetting.get_logger("app_main")
+
+
+def refresh_devices(conn: connection, device_name: Optional[str],
+                    logger: logging.Logger) -> List[RollupResult]:
+    """
+    デバイスのロールアップテーブルを更新する
+    :param conn: 書き込み可能な psycopg2 connection
+    :param device_name: デバイス名 ※None なら全デバイス
+    :param logger: app_logger
+    :return: デバイスごとの更新結果
+    """
+    devices: List[DeviceRecord] = DeviceDao(conn, logger=logger).get_devices()
+    # デバイス取得の読み取りトランザクションを終了
+    conn.rollback()
+    if device_name is not None:
+        devices = [device for device in devices if device.name == device_name]
+        if len(devices) == 0:
+            raise ValueError(f"Device not found: {device_name}")
+
+    dao: WeatherRollupDao = WeatherRollupDao(conn, logger=logger)
+    return [dao.refresh(device.id) for device in devices]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--create-tables", action="store_true", help="Create rollup tables")
+    parser.add_argument("--device-name", type=str, help="Device name (default: all devices)")
+    parser.add_argument("--interval", type=float, default=0.,
+                        help="Refresh interval seconds (default: run once)")
+    args: argparse.Namespace = parser.parse_args()
+
+    db_conn: connection = psycopg2.connect(**load_dbconf())
+    try:
+        if args.create_tables:
+            WeatherRollupDao(db_conn, logger=app_logger).createTables()
+            print("Rollup tables created.")
+        while True:
+            for result in refresh_devices(db_conn, args.device_name, app_logger):
+                print(f"did: {result.did}, from: {result.from_time}, to: {result.to_time},"
+                      f" hourly: {result.hourly_count}, daily: {result.daily_count}")
+            if args.interval <= 0:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        db_conn.close()
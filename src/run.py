@@ -1,9 +1,9 @@
 import os
 
-from plot_weather import app, app_logger
+from plot_weather.webapp import app, app_logger, start_background_tasks
 
 """
-This module load after app(==__init__.py)
+This module load after app(==plot_weather/webapp.py)
 """
 
 if __name__ == "__main__":
@@ -13,6 +13,7 @@ if __name__ == "__main__":
     srv_hosts = srv_host.split(":")
     host, port = srv_hosts[0], srv_hosts[1]
     app_logger.info("run.py in host: {}, port: {}".format(host, port))
+    start_background_tasks()
     if has_prod:
         # Production mode
         try: